@@ -0,0 +1,123 @@
+"""
+统一命令行入口
+用法：python -m src [性能选项] <命令> [参数 ...]
+      python -m src            列出所有命令
+只导入所运行命令需要的模块，强制使用 Agg 后端（不弹窗口、不调用 plt.show()），
+结束时在标准错误输出中报告导入和运行耗时
+性能选项（写在命令之前，通过环境变量传给子进程，见 src/utils/profiling.py）：
+      --profile 路径           保存各阶段的耗时和内存，以 .trace.json 结尾时保存为 Chrome trace
+      --profile-memory         同时统计每个阶段的 Python 内存分配峰值
+      --cprofile 路径          用 cProfile 采样，结果可生成火焰图
+      --cprofile-stage 阶段名  只采样指定阶段（如 major、render_chart）
+"""
+
+import os
+import sys
+import time
+
+_start = time.perf_counter()
+
+# 必须在任何模块导入 matplotlib 之前设置
+os.environ["MPLBACKEND"] = "Agg"
+
+# {命令: (模块, 说明)}
+COMMANDS = {
+    "admit_distribution": ("src.service.admit_distribution", "一志愿去向统计"),
+    "adjustment_distribution": (
+        "src.service.adjustment_distribution",
+        "各专业调剂录取统计",
+    ),
+    "score_distribution": ("src.service.score_distribution", "问卷成绩分布统计"),
+    "analyze_with_school": ("src.service.analyze_with_school", "问卷分类与成绩分析"),
+    "calculate_exam_stats": (
+        "src.service.calculate_exam_stats",
+        "问卷各科目成绩统计",
+    ),
+    "category_pie": ("src.service.category_pie", "问卷分类统计饼图"),
+    "school_distribution": ("src.service.school_distribution", "生源院校分布"),
+    "school_major_distribution": (
+        "src.service.school_major_distribution",
+        "本科学校类别与跨考类别交叉统计",
+    ),
+    "school_word_cloud": ("src.service.school_word_cloud", "本科学校心形词云"),
+    "score_rank": ("src.service.score_rank", "成绩排名查询"),
+    "results": ("src.service.results_query", "多年份结果库导入与查询"),
+    "pipeline": ("src.service.report_pipeline", "报表流水线（增量重建）"),
+    "correct": ("src.utils.correct", "问卷成绩纠正与合并"),
+    "watermark": ("src.utils.watermark_generator", "图片水印"),
+    "synthetic": ("src.benchmark.synthetic", "生成合成测试数据"),
+    "benchmark": ("src.benchmark.run", "合成数据基准测试"),
+}
+
+
+# 性能选项: {选项: (环境变量, 是否带值)}
+PROFILE_OPTIONS = {
+    "--profile": ("REPORT_PROFILE", True),
+    "--profile-memory": ("REPORT_PROFILE_MEMORY", False),
+    "--cprofile": ("REPORT_CPROFILE", True),
+    "--cprofile-stage": ("REPORT_CPROFILE_STAGE", True),
+}
+
+
+def print_commands():
+    print("用法：python -m src [性能选项] <命令> [参数 ...]\n\n命令：")
+    for name, (_, description) in COMMANDS.items():
+        print(f"  {name:<28}{description}")
+
+
+def main():
+    argv = sys.argv[1:]
+    while argv and argv[0] in PROFILE_OPTIONS:
+        env, has_value = PROFILE_OPTIONS[argv[0]]
+        if has_value and len(argv) < 2:
+            print(f"{argv[0]} 需要一个参数")
+            sys.exit(2)
+        os.environ[env] = argv[1] if has_value else "1"
+        argv = argv[2:] if has_value else argv[1:]
+
+    if not argv or argv[0] in ("-h", "--help"):
+        print_commands()
+        return
+    name, args = argv[0], argv[1:]
+    if name not in COMMANDS:
+        print(f"未知命令: {name}\n")
+        print_commands()
+        sys.exit(2)
+
+    # 把项目根目录添加到系统路径
+    project_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    if project_dir not in sys.path:
+        sys.path.insert(0, project_dir)
+
+    import importlib
+
+    # 按性能选项开启记录，退出时自动保存
+    from src.utils import profiling
+
+    profiling.enable_from_env()
+
+    module = importlib.import_module(COMMANDS[name][0])
+    imported = time.perf_counter()
+
+    # 子命令按自己的参数解析
+    sys.argv = [f"python -m src {name}", *args]
+    code = 0
+    try:
+        with profiling.stage(name):
+            module.main()
+    except SystemExit as e:
+        code = e.code
+    finally:
+        finished = time.perf_counter()
+        print(
+            f"[{name}] 启动+导入 {imported - _start:.2f}s  "
+            f"运行 {finished - imported:.2f}s  共 {finished - _start:.2f}s",
+            file=sys.stderr,
+        )
+        if profiling.is_enabled():
+            profiling.print_summary()
+    sys.exit(code)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,404 @@
+"""
+基准测试
+功能：在合成数据上测量各阶段（加载、聚合、图表渲染、水印、Excel 输出）的耗时、CPU 时间和内存峰值，
+可选端到端运行各统计脚本；结果连同 git 提交记录追加到历史文件，便于跨提交对比、发现性能回退
+用法：python -m src benchmark [--rows 1k 100k 1m] [--services] [--compare] [--threshold 1.2]
+"""
+
+import argparse
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+# 把项目根目录添加到系统路径
+project_dir = str(Path(__file__).resolve().parents[2])
+sys.path.append(project_dir)
+from src.benchmark.synthetic import (
+    QUESTIONNAIRE_NAME,
+    SCORES_NAME,
+    parse_rows,
+    workspace_path,
+    write_dataset,
+)
+
+HISTORY_PATH = os.path.join(project_dir, "data", "benchmark", "history.jsonl")
+
+# 默认规模
+DEFAULT_ROWS = ["1k", "100k"]
+
+# 超过上次结果的倍数视为回退
+REGRESSION_THRESHOLD = 1.2
+
+# 端到端测试的统计脚本：{名称: python -m src 的参数}
+SERVICES = {
+    "admit_distribution": ["admit_distribution"],
+    "adjustment_distribution": ["adjustment_distribution"],
+    "score_distribution": ["score_distribution"],
+    "analyze_with_school": ["analyze_with_school", "--rebuild"],
+    "calculate_exam_stats": [
+        "calculate_exam_stats",
+        "data/哈工计算机25考研复试信息表_纠正后_合并.xlsx",
+    ],
+    "category_pie": ["category_pie", "--all"],
+    "school_distribution": ["school_distribution", "--top", "50"],
+    "school_major_distribution": ["school_major_distribution"],
+    "school_word_cloud": ["school_word_cloud"],
+}
+
+
+def measure(func, memory=True):
+    """
+    运行 func 并测量
+    :param memory: 是否用 tracemalloc 统计 Python 内存分配峰值（会拖慢运行）
+    :return: (func 的返回值, {"wall": 秒, "cpu": 秒, "peak_mb": MB 或 None})
+    """
+    if memory:
+        tracemalloc.start()
+    wall, cpu = time.perf_counter(), time.process_time()
+    try:
+        result = func()
+    finally:
+        wall = time.perf_counter() - wall
+        cpu = time.process_time() - cpu
+        peak = None
+        if memory:
+            peak = tracemalloc.get_traced_memory()[1] / 2**20
+            tracemalloc.stop()
+    return result, {"wall": wall, "cpu": cpu, "peak_mb": peak}
+
+
+def stage_functions():
+    """
+    各阶段的测量函数，依次运行，后面的阶段使用前面阶段的结果
+    :return: [(阶段名, func(context))]
+    """
+    from src.benchmark.synthetic import QUESTIONNAIRE_CHOICES
+    from src.service.admit_distribution import build_count_tensor, major_table
+    from src.service.admit_distribution import chart_spec as admit_chart_spec
+    from src.service.calculate_exam_stats import numeric_block, subject_mapping
+    from src.service.category_pie import count_categories
+    from src.service.score_distribution import score_histograms
+    from src.utils.chart_renderer import render_chart
+    from src.utils.cube import REGROUPS, build_cube
+    from src.utils.dataset import load_questionnaire, load_scores
+    from src.utils.excel_output import StreamingExcelWriter
+    from src.utils.major_slices import ALL_CAMPUSES
+    from src.utils.online_stats import new_stats, update
+    from src.utils.rank_index import build_rank_index
+
+    scores_path = os.path.join("data", SCORES_NAME)
+    questionnaire_path = os.path.join("data", QUESTIONNAIRE_NAME)
+    categories = list(QUESTIONNAIRE_CHOICES)
+    columns = list(subject_mapping.values())
+
+    def admit_spec(context, watermark_text):
+        tensors, ranges, base = context["count_tensor"]
+        table = major_table(tensors[ALL_CAMPUSES], ranges[ALL_CAMPUSES], base)
+        table = table[["复试不及格", "复试及格未录取", "调剂录取", "一志愿录取"]]
+        return admit_chart_spec(
+            table, ALL_CAMPUSES, "output/benchmark", watermark_text=watermark_text
+        )
+
+    def render(spec):
+        result = render_chart(spec)
+        if result["error"]:
+            raise RuntimeError(result["error"])
+
+    def write_excel(context):
+        tensors, ranges, base = context["count_tensor"]
+        with StreamingExcelWriter("output/benchmark/benchmark.xlsx") as writer:
+            for code in tensors:
+                writer.write_frame(
+                    major_table(tensors[code], ranges[code], base), code, index=True
+                )
+            writer.write_frame(context["questionnaire"], "问卷")
+
+    return [
+        ("load_scores_cold", lambda c: load_scores(scores_path)),
+        ("load_scores_warm", lambda c: load_scores(scores_path)),
+        ("load_questionnaire_cold", lambda c: load_questionnaire(questionnaire_path)),
+        ("load_questionnaire_warm", lambda c: load_questionnaire(questionnaire_path)),
+        ("count_tensor", lambda c: build_count_tensor(c["load_scores_warm"])),
+        (
+            "score_histograms",
+            lambda c: score_histograms(
+                c["questionnaire"], "复试机试成绩（总分160）（必填）"
+            ),
+        ),
+        (
+            "cube",
+            lambda c: build_cube(c["questionnaire"], categories + list(REGROUPS)),
+        ),
+        (
+            "online_stats",
+            lambda c: update(
+                new_stats(columns), numeric_block(c["questionnaire"], columns)
+            ),
+        ),
+        ("rank_index", lambda c: build_rank_index(c["load_scores_warm"])),
+        ("category_counts", lambda c: count_categories(c["questionnaire"], categories)),
+        ("render_chart", lambda c: render(admit_spec(c, None))),
+        ("render_chart_watermark", lambda c: render(admit_spec(c, "葵妈考研"))),
+        ("excel_output", write_excel),
+    ]
+
+
+def run_stages(memory=True):
+    """在当前目录（合成数据工作目录）中依次运行各阶段"""
+    # 冷启动：删除列式缓存
+    shutil.rmtree(os.path.join("data", ".cache"), ignore_errors=True)
+
+    context, results = {}, {}
+    for name, func in stage_functions():
+        try:
+            context[name], results[name] = measure(lambda: func(context), memory)
+        except Exception as e:
+            results[name] = {"error": f"{type(e).__name__}: {e}"}
+            print(f"  {name:<34}出错: {e}")
+            continue
+        if name == "load_questionnaire_warm":
+            context["questionnaire"] = context[name]
+        print(f"  {name:<34}{format_result(results[name])}")
+    shutil.rmtree("output", ignore_errors=True)
+    return results
+
+
+# 子进程入口：运行 python -m src，退出前把主进程的内存峰值写到标准错误最后一行。
+# fork 出的子进程的 ru_maxrss 会继承父进程的峰值，而 /proc 中的 VmHWM 在 exec 后重新计算
+_CHILD = """
+import runpy, sys
+sys.argv = ["src", *sys.argv[1:]]
+try:
+    runpy.run_module("src", run_name="__main__", alter_sys=True)
+finally:
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    except ImportError:
+        # Windows 没有 resource 模块，不记录内存峰值
+        peak = None
+    try:
+        with open("/proc/self/status") as f:
+            peak = next(int(l.split()[1]) for l in f if l.startswith("VmHWM:"))
+    except (OSError, StopIteration):
+        pass
+    if peak is not None:
+        print(f"{PEAK_MARKER} {peak}", file=sys.stderr)
+"""
+
+PEAK_MARKER = "[benchmark-peak-kb]"
+
+
+def run_service(args):
+    """
+    在子进程中运行一个统计脚本
+    :return: {"wall": 秒, "cpu": 子进程及其进程池的 CPU 秒数, "peak_mb": 子进程主进程的最大常驻内存 MB}
+             没有 os.wait4 的平台（Windows）上 cpu 为 None
+    """
+    env = dict(os.environ, PYTHONPATH=project_dir, MPLBACKEND="Agg")
+    child = _CHILD.replace("{PEAK_MARKER}", PEAK_MARKER)
+    # 标准错误写入临时文件，输出很多告警时不会因管道写满而阻塞
+    with tempfile.TemporaryFile() as stderr:
+        start = time.perf_counter()
+        process = subprocess.Popen(
+            [sys.executable, "-c", child, *args],
+            env=env,
+            stdout=subprocess.DEVNULL,
+            stderr=stderr,
+        )
+        if hasattr(os, "wait4"):
+            # wait4 返回该子进程（含已回收的进程池工作进程）的资源用量
+            _, status, usage = os.wait4(process.pid, 0)
+            process.returncode = os.waitstatus_to_exitcode(status)
+            cpu = usage.ru_utime + usage.ru_stime
+        else:
+            process.wait()
+            cpu = None
+        wall = time.perf_counter() - start
+        stderr.seek(0)
+        lines = stderr.read().decode(errors="replace").strip().splitlines()
+
+    peak = [line for line in lines if line.startswith(PEAK_MARKER)]
+    lines = [line for line in lines if not line.startswith(PEAK_MARKER)]
+    if process.returncode != 0:
+        return {"error": lines[-1] if lines else f"退出码 {process.returncode}"}
+    return {
+        "wall": wall,
+        "cpu": cpu,
+        # 单位为 KB
+        "peak_mb": int(peak[-1].split()[1]) / 1024 if peak else None,
+    }
+
+
+def run_services():
+    results = {}
+    for name, args in SERVICES.items():
+        results[f"service:{name}"] = run_service(args)
+        print(f"  {'service:' + name:<34}{format_result(results[f'service:{name}'])}")
+    shutil.rmtree("output", ignore_errors=True)
+    return results
+
+
+def format_result(result):
+    if "error" in result:
+        return f"出错: {result['error']}"
+    text = f"耗时 {result['wall']:8.3f}s"
+    if result.get("cpu") is not None:
+        text += f"  CPU {result['cpu']:8.3f}s"
+    if result.get("peak_mb") is not None:
+        text += f"  内存峰值 {result['peak_mb']:8.1f}MB"
+    return text
+
+
+def git_revision():
+    """当前提交和工作区是否有未提交的修改"""
+
+    def git(*args):
+        return subprocess.run(
+            ["git", *args], cwd=project_dir, capture_output=True, text=True
+        ).stdout.strip()
+
+    try:
+        return {
+            "commit": git("rev-parse", "--short", "HEAD") or None,
+            "dirty": bool(git("status", "--porcelain", "--untracked-files=no")),
+        }
+    except OSError:
+        return {"commit": None, "dirty": False}
+
+
+def load_history(path=HISTORY_PATH):
+    if not os.path.exists(path):
+        return []
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def append_history(record, path=HISTORY_PATH):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+
+def compare(record, history, threshold=REGRESSION_THRESHOLD):
+    """
+    与同一规模、同一随机种子、同样是否统计内存的上一次结果对比耗时
+    :return: 回退的阶段列表 [(阶段名, 上次耗时, 本次耗时)]
+    """
+    previous = [
+        r
+        for r in history
+        if (r["rows"], r.get("seed", 0), r.get("memory"))
+        == (record["rows"], record["seed"], record["memory"])
+    ]
+    if not previous:
+        print(f"  没有 {record['rows']} 行、种子 {record['seed']} 的历史结果可对比")
+        return []
+    baseline = previous[-1]
+    print(f"  对比 {baseline['commit']} ({baseline['timestamp']}):")
+
+    regressions = []
+    for name, result in record["stages"].items():
+        before = baseline["stages"].get(name, {})
+        if "wall" not in result or "wall" not in before:
+            continue
+        ratio = result["wall"] / before["wall"] if before["wall"] > 0 else 1.0
+        flag = ""
+        if ratio > threshold:
+            flag = "  ← 回退"
+            regressions.append((name, before["wall"], result["wall"]))
+        print(
+            f"    {name:<34}{before['wall']:8.3f}s → {result['wall']:8.3f}s"
+            f"  ×{ratio:.2f}{flag}"
+        )
+    return regressions
+
+
+def benchmark(rows, services=False, memory=True, seed=0):
+    """生成（或复用）一个规模的合成数据并运行所有阶段"""
+    workspace = workspace_path(rows, seed)
+    data_dir = os.path.join(workspace, "data")
+    if not os.path.exists(os.path.join(data_dir, SCORES_NAME)):
+        print(f"生成 {rows} 行合成数据: {data_dir}")
+        write_dataset(data_dir, rows, seed)
+
+    cwd = os.getcwd()
+    os.chdir(workspace)
+    try:
+        print(f"{rows} 行:")
+        stages = run_stages(memory)
+        if services:
+            stages.update(run_services())
+    finally:
+        os.chdir(cwd)
+
+    return {
+        **git_revision(),
+        "timestamp": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "rows": rows,
+        "seed": seed,
+        "memory": memory,
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "stages": stages,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="基准测试")
+    parser.add_argument(
+        "-n",
+        "--rows",
+        nargs="+",
+        default=DEFAULT_ROWS,
+        help=f"成绩单行数, 如 1k 100k 1m, 默认: {' '.join(DEFAULT_ROWS)}",
+    )
+    parser.add_argument("--seed", type=int, default=0, help="随机种子, 默认: 0")
+    parser.add_argument(
+        "--services", action="store_true", help="同时端到端运行各统计脚本"
+    )
+    parser.add_argument(
+        "--no-memory",
+        action="store_true",
+        help="不统计内存峰值（tracemalloc 会拖慢运行）",
+    )
+    parser.add_argument(
+        "--history", default=HISTORY_PATH, help=f"历史结果文件, 默认: {HISTORY_PATH}"
+    )
+    parser.add_argument(
+        "--no-save", action="store_true", help="不把本次结果写入历史文件"
+    )
+    parser.add_argument(
+        "--compare", action="store_true", help="与历史文件中同规模的上一次结果对比"
+    )
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=REGRESSION_THRESHOLD,
+        help=f"耗时超过上次的倍数视为回退, 默认: {REGRESSION_THRESHOLD}",
+    )
+    args = parser.parse_args()
+
+    history = load_history(args.history)
+    regressions = []
+    for rows in map(parse_rows, args.rows):
+        record = benchmark(rows, args.services, not args.no_memory, args.seed)
+        if args.compare:
+            regressions += compare(record, history, args.threshold)
+        if not args.no_save:
+            append_history(record, args.history)
+
+    if regressions:
+        print(f"\n{len(regressions)} 个阶段耗时超过上次的 {args.threshold} 倍")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,356 @@
+"""
+合成数据生成
+功能：按真实数据的列名、完整专业代码格式和分类取值生成任意行数的
+总复试成绩单和问卷表（含纠正合并后的问卷），用于基准测试和 CI，不包含任何真实考生信息
+用法：python -m src synthetic --rows 100k [--seed 0] [-o 输出目录]
+默认输出到 data/synthetic/<行数>/data，与真实数据的相对路径一致，在 data/synthetic/<行数> 下即可直接运行各脚本
+"""
+
+import argparse
+import os
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# 把项目根目录添加到系统路径
+project_dir = str(Path(__file__).resolve().parents[2])
+sys.path.append(project_dir)
+from src.utils.correct import merge_scores
+from src.utils.excel_output import StreamingExcelWriter
+
+# 合成数据工作目录，每种行数一个子目录
+WORKSPACE_DIR = "data/synthetic"
+
+SCORES_NAME = "总复试成绩单.xlsx"
+QUESTIONNAIRE_RAW_NAME = "哈工计算机25考研复试信息表_纠正后.xlsx"
+QUESTIONNAIRE_NAME = "哈工计算机25考研复试信息表_纠正后_合并.xlsx"
+
+# 问卷人数占成绩单人数的比例
+QUESTIONNAIRE_FRACTION = 0.1
+
+CAMPUSES = {
+    "013": ("013-计算学部", "校本部"),
+    "903": ("903-哈尔滨工业大学（深圳）", "深圳校区"),
+    "902": ("902-哈尔滨工业大学（威海）", "威海校区"),
+}
+
+SUBJECTS = {
+    "081200": "081200-计算机科学与技术",
+    "083500": "083500-软件工程",
+    "083900": "083900-网络空间安全",
+    "085400": "085400-电子信息",
+    "087600": "087600-智能科学与技术",
+}
+
+DIRECTIONS = {
+    "00": "00-不区分研究方向",
+    "11": "11-计算机技术",
+    "12": "12-软件工程",
+    "13": "13-网络与信息安全",
+    "24": "24-计算机技术",
+    "31": "31-计算机技术",
+    "40": "40-计算机技术（苏州基地）",
+    "41": "41-计算机技术（郑州基地）",
+    "42": "42-软件工程（郑州基地）",
+    "43": "43-网络与信息安全（郑州基地）",
+    "44": "44-计算机技术（重庆基地）",
+    "45": "45-软件工程（重庆基地）",
+    "46": "46-网络与信息安全（重庆基地）",
+    "60": "60-计算机技术（工程联培专项）",
+}
+
+# 完整专业代码 -> (相对报考人数, 录取专业简称)
+MAJORS = {
+    "013-081200-00": (70, "本计学"),
+    "013-083500-00": (3, "本软学"),
+    "013-083900-00": (13, "本网学"),
+    "013-085400-11": (102, "本计专"),
+    "013-085400-12": (16, "本软专"),
+    "013-085400-13": (8, "本网专"),
+    "013-085400-40": (15, "苏州计专"),
+    "013-085400-41": (16, "郑州计专"),
+    "013-085400-42": (2, "郑州软专"),
+    "013-085400-43": (2, "郑州网专"),
+    "013-085400-44": (7, "重庆计专"),
+    "013-085400-45": (2, "重庆软专"),
+    "013-085400-46": (2, "重庆网专"),
+    "013-085400-60": (8, "工程联培"),
+    "013-087600-00": (18, "本智科"),
+    "902-081200-00": (6, "威计学"),
+    "902-083900-00": (2, "威网安"),
+    "902-085400-24": (24, "威计专"),
+    "903-081200-00": (22, "深计学"),
+    "903-085400-31": (347, "深计专"),
+}
+
+# 问卷分类列的取值
+QUESTIONNAIRE_CHOICES = {
+    "本科学校类别（必填）": ["C9", "985（非C9）", "211", "一本", "二本"],
+    "跨考类别（必填）": [
+        "本专业：计算机类专业",
+        "跨专业：电子信息类等相近专业",
+        "跨专业：其他专业",
+    ],
+    "是否二战及以上（必填）": ["是", "否"],
+    "项目经历（必填）": [
+        "有高于课程设计水平的项目 (包括公司的实习项目)",
+        "有不高于课程设计水平的项目",
+        "没有任何计算机相关项目",
+    ],
+    "论文发表情况（必填）": ["没有发表论文", "发表过中文论文", "发表过英文论文"],
+    "数学建模获奖情况（必填）": ["没有获奖", "省级奖项", "国家级奖项", "美赛奖项"],
+    "ICPC竞赛经历（必填）": ["没参加过ICPC", "铜牌", "银牌", "金牌"],
+    "OI竞赛经历（必填）": [
+        "没参加过OI",
+        "NOIP提高组二等奖以下",
+        "NOIP提高组二等奖",
+        "NOIP提高组一等奖",
+    ],
+    "开始复习月份（必填）": [f"{month}月" for month in range(1, 13)],
+    "备考状态（必填）": [
+        "在校备考：大三下学期开始",
+        "全职备考：已毕业专心备考",
+        "在职备考：边工作边备考",
+    ],
+}
+
+SCHOOL_PREFIXES = list("东南西北中华新江河山海天长滨兴安宁远明德")
+SCHOOL_SUFFIXES = ["理工大学", "工业大学", "大学", "科技大学", "师范大学", "交通大学"]
+
+SURNAMES = list("王李张刘陈杨黄赵吴周徐孙马朱胡郭何高林罗郑梁谢宋唐")
+GIVEN_NAMES = list("伟芳娜敏静丽强磊军洋勇艳杰涛明超秀霞平刚桂英华玉兰峰浩宇博文")
+
+ADVICE_PHRASES = [
+    "数学一定要多做真题",
+    "408要重视操作系统和计网",
+    "机试多刷算法题",
+    "面试准备好英文自我介绍",
+    "心态很重要，坚持到最后",
+    "早点开始复习政治",
+    "英语阅读每天练习",
+    "项目经历要能讲清楚",
+]
+
+
+def _major_columns(code):
+    """由完整专业代码派生 院系所码与名称、专业代码与名称 和 研究方向"""
+    campus, subject, direction = code.split("-")
+    return CAMPUSES[campus][0], SUBJECTS[subject], DIRECTIONS[direction]
+
+
+def _clipped_normal(rng, mean, std, low, high, n):
+    return np.clip(rng.normal(mean, std, n), low, high)
+
+
+def generate_scores(rows, seed=0):
+    """
+    生成总复试成绩单
+    :param rows: 行数
+    :param seed: 随机种子，相同参数生成相同数据
+    :return: 与真实成绩单列名和类型一致的 DataFrame
+    """
+    rng = np.random.default_rng(seed)
+    codes = list(MAJORS)
+    weights = np.array([MAJORS[code][0] for code in codes], dtype=float)
+    major = rng.choice(len(codes), rows, p=weights / weights.sum())
+    columns = np.array([_major_columns(code) for code in codes], dtype=object)
+    campus, subject, direction = columns[major].T
+    short = np.array([MAJORS[code][1] for code in codes], dtype=object)
+    campus_code = np.array([code[:3] for code in codes])
+
+    politics = _clipped_normal(rng, 68, 6, 40, 88, rows).astype(np.int64)
+    english = _clipped_normal(rng, 70, 8, 40, 92, rows).astype(np.int64)
+    math = _clipped_normal(rng, 115, 15, 60, 150, rows).astype(np.int64)
+    cs = _clipped_normal(rng, 115, 14, 60, 150, rows).astype(np.int64)
+    veteran = rng.random(rows) < 0.002
+    total = politics + english + math + cs + np.where(veteran, 10, 0)
+
+    machine = np.round(_clipped_normal(rng, 110, 30, 0, 160, rows))
+    machine_scaled = np.round((machine / 160 * 100 + 80) * 4) / 4
+    interview = np.round(_clipped_normal(rng, 120, 8, 60, 150, rows), 2)
+    retest = np.round((machine_scaled + interview) / 3.4, 2)
+    final = np.round(total / 5 + retest, 2)
+
+    # 复试及格后，按专业内总成绩排名录取前 70%，其中约 85% 为一志愿录取
+    passed = interview >= 100
+    rank = pd.Series(np.where(passed, final, -1)).groupby(major).rank(pct=True)
+    admitted = passed & (rank.to_numpy() > 0.3)
+    first_choice = admitted & (rng.random(rows) < 0.85)
+
+    # 调剂录取的考生随机录到同校区的专业
+    admitted_major = major.copy()
+    transfer = np.flatnonzero(admitted & ~first_choice)
+    for prefix in CAMPUSES:
+        options = np.flatnonzero(campus_code == prefix)
+        moved = transfer[campus_code[major[transfer]] == prefix]
+        admitted_major[moved] = options[rng.integers(len(options), size=len(moved))]
+    campus_label = np.array([CAMPUSES[prefix][1] for prefix in campus_code])
+
+    names = (
+        np.array(SURNAMES)[rng.integers(len(SURNAMES), size=rows)].astype(object)
+        + np.array(GIVEN_NAMES)[rng.integers(len(GIVEN_NAMES), size=rows)]
+        + np.where(
+            rng.random(rows) < 0.6,
+            np.array(GIVEN_NAMES)[rng.integers(len(GIVEN_NAMES), size=rows)],
+            "",
+        )
+    )
+    exam_type = np.full(rows, np.nan, dtype=object)
+    special = rng.random(rows)
+    exam_type[special < 0.003] = "强军"
+    exam_type[(special >= 0.003) & (special < 0.006)] = "专项"
+    extra = np.where(rng.random(rows) < 0.003, 0.0, np.nan)
+
+    return pd.DataFrame(
+        {
+            "序号": np.arange(1, rows + 1),
+            "考生编号": 102135000000000 + rng.permutation(rows * 10)[:rows],
+            "姓名": pd.array(names, dtype="str"),
+            "政治": politics,
+            "外语": english,
+            "业务课一": math,
+            "业务课二": cs,
+            "初试总分": total,
+            "专业综合测试成绩": machine_scaled,
+            "面试成绩": interview,
+            "复试总成绩": retest,
+            "加试一成绩": extra,
+            "加试二成绩": extra.copy(),
+            "总成绩": final,
+            "备注": np.where(veteran, "退役大学生士兵，初试总成绩加10分", None),
+            "院系所码与名称": campus,
+            "专业代码与名称": subject,
+            "研究方向": direction,
+            "机试原始分": machine,
+            "录取校区": np.where(admitted, campus_label[admitted_major], None),
+            "录取专业": np.where(admitted, short[admitted_major], None),
+            "考试方式": exam_type,
+            "录取状态": np.where(admitted, "已录取", "未录取"),
+            "一志愿录取": np.where(first_choice, "是", "否"),
+            "复试及格": np.where(passed, "是", "否"),
+        }
+    )
+
+
+def generate_questionnaire(scores, fraction=QUESTIONNAIRE_FRACTION, seed=0):
+    """
+    从成绩单中抽样生成纠正后（未合并）的问卷表
+    初试各科成绩与成绩单一致，可以用 correct.merge_scores 关联回填
+    """
+    rng = np.random.default_rng(seed + 1)
+    rows = max(1, int(len(scores) * fraction))
+    sample = scores.iloc[rng.choice(len(scores), rows, replace=False)]
+
+    data = {
+        "初试政治成绩（必填）": sample["政治"].to_numpy(),
+        "初试英语成绩（必填）": sample["外语"].to_numpy(),
+        "初试数学成绩（必填）": sample["业务课一"].to_numpy(),
+        "初试专业课（408）成绩（必填）": sample["业务课二"].to_numpy(),
+        "初试总分（必填）": sample["初试总分"].to_numpy(),
+        # 问卷中自填的复试成绩，合并时由成绩单覆盖
+        "复试机试成绩（总分160）（必填）": sample["机试原始分"].to_numpy(),
+        "复试面试成绩（总分150）（必填）": np.round(
+            sample["面试成绩"].to_numpy() + rng.normal(0, 1, rows), 2
+        ),
+    }
+    for column, choices in QUESTIONNAIRE_CHOICES.items():
+        data[column] = np.array(choices, dtype=object)[
+            rng.integers(len(choices), size=rows)
+        ]
+
+    # 学校数随人数增长，头部学校人数多，长尾学校人数少
+    n_schools = max(20, int(np.sqrt(rows) * 4))
+    school_names = [
+        SCHOOL_PREFIXES[i % len(SCHOOL_PREFIXES)]
+        + SCHOOL_PREFIXES[(i // len(SCHOOL_PREFIXES)) % len(SCHOOL_PREFIXES)]
+        + SCHOOL_SUFFIXES[i % len(SCHOOL_SUFFIXES)]
+        + (str(i // 400) if i >= 400 else "")
+        for i in range(n_schools)
+    ]
+    popularity = 1 / np.arange(1, n_schools + 1)
+    data["本科学校（必填）"] = np.array(school_names, dtype=object)[
+        rng.choice(n_schools, rows, p=popularity / popularity.sum())
+    ]
+
+    phrases = np.array(ADVICE_PHRASES, dtype=object)
+    first = phrases[rng.integers(len(phrases), size=rows)]
+    second = phrases[rng.integers(len(phrases), size=rows)]
+    data["对26考生的备考建议"] = np.where(
+        rng.random(rows) < 0.5, first + "，" + second, first
+    )
+    return pd.DataFrame(data)
+
+
+def _write_xlsx(df, path):
+    """逐行写出，百万行也不会在内存中保留整个工作簿"""
+    with StreamingExcelWriter(path) as writer:
+        writer.write_frame(df, "Sheet1")
+
+
+def write_dataset(output_dir, rows, seed=0, fraction=QUESTIONNAIRE_FRACTION):
+    """
+    生成并写出成绩单、问卷和合并后的问卷
+    :return: {"scores": 路径, "questionnaire_raw": 路径, "questionnaire": 路径}
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    scores = generate_scores(rows, seed)
+    questionnaire = generate_questionnaire(scores, fraction, seed)
+    merged, _, _ = merge_scores(scores, questionnaire)
+
+    paths = {
+        "scores": os.path.join(output_dir, SCORES_NAME),
+        "questionnaire_raw": os.path.join(output_dir, QUESTIONNAIRE_RAW_NAME),
+        "questionnaire": os.path.join(output_dir, QUESTIONNAIRE_NAME),
+    }
+    _write_xlsx(scores, paths["scores"])
+    _write_xlsx(questionnaire, paths["questionnaire_raw"])
+    _write_xlsx(merged, paths["questionnaire"])
+    return paths
+
+
+def workspace_path(rows, seed=0):
+    """行数和随机种子对应的工作目录，数据在其 data 子目录下"""
+    return os.path.join(WORKSPACE_DIR, f"{rows}_seed{seed}")
+
+
+def parse_rows(text):
+    """支持 1k、100k、1m 这样的写法"""
+    text = text.strip().lower()
+    units = {"k": 1_000, "m": 1_000_000}
+    if text[-1:] in units:
+        return int(float(text[:-1]) * units[text[-1]])
+    return int(text)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="合成数据生成")
+    parser.add_argument(
+        "-n", "--rows", type=parse_rows, default=1000, help="成绩单行数, 如 1k/100k/1m"
+    )
+    parser.add_argument("--seed", type=int, default=0, help="随机种子, 默认: 0")
+    parser.add_argument(
+        "--fraction",
+        type=float,
+        default=QUESTIONNAIRE_FRACTION,
+        help=f"问卷人数占比, 默认: {QUESTIONNAIRE_FRACTION}",
+    )
+    parser.add_argument(
+        "-o",
+        "--output",
+        default=None,
+        help=f"输出目录, 默认: {WORKSPACE_DIR}/<行数>_seed<种子>/data",
+    )
+    args = parser.parse_args()
+
+    output_dir = args.output or os.path.join(
+        workspace_path(args.rows, args.seed), "data"
+    )
+    paths = write_dataset(output_dir, args.rows, args.seed, args.fraction)
+    for path in paths.values():
+        print(f"已生成: {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,17 @@
-import pandas as pd
+"""
+各专业调剂录取统计
+"""
+
 import os
+import sys
+from pathlib import Path
 
-output_folder = "output/调剂统计"
-os.makedirs(output_folder, exist_ok=True)
+# 把项目根目录添加到系统路径
+project_dir = str(Path(__file__).resolve().parents[2])
+sys.path.append(project_dir)
+from src.utils.dataset import load_scores
+from src.utils.major_slices import iter_major_slices
+from src.utils.excel_output import StreamingExcelWriter
 
 major_mapping = {
     "所有校区": "所有校区",
@@ -31,71 +40,59 @@ major_mapping = {
     "902-085400-24": "威海计专",
 }
 
-# 创建ExcelWriter对象
-excel_path = f"{output_folder}/各专业调剂录取统计.xlsx"
-with pd.ExcelWriter(excel_path, engine="openpyxl") as writer:
 
-    # 读取文件
-    excel_file = pd.ExcelFile("data/总复试成绩单.xlsx")
-    # 获取指定工作表中的数据
-    df = excel_file.parse("Sheet1")
+def main():
+    """统计各专业调剂录取到的专业及人数，每个专业一个sheet"""
+    output_folder = "output/调剂统计"
+    os.makedirs(output_folder, exist_ok=True)
 
-    # 构建完整的专业映射键（针对每一行数据）
-    df["完整专业代码"] = (
-        df["院系所码与名称"].str.split("-").str[0]
-        + "-"
-        + df["专业代码与名称"].str.split("-").str[0]
-        + "-"
-        + df["研究方向"].str.split("-").str[0]
-    )
+    # 创建Excel写入器（逐行写入，没有写入任何sheet时不生成文件）
+    excel_path = f"{output_folder}/各专业调剂录取统计.xlsx"
+    with StreamingExcelWriter(excel_path) as writer:
 
-    # 筛选录取状态为已录取且一志愿未录取的数据
-    df = df[(df["录取状态"] == "已录取") & (df["一志愿录取"] == "否")]
+        # 读取文件（已派生完整专业代码）
+        df = load_scores("data/总复试成绩单.xlsx")
 
-    # 记录有调剂数据的专业数量
-    valid_major_count = 0
+        # 筛选录取状态为已录取且一志愿未录取的数据
+        df = df[(df["录取状态"] == "已录取") & (df["一志愿录取"] == "否")]
 
-    # 循环遍历 major_mapping 中的每一个专业
-    for code, major in major_mapping.items():
-        # 筛选专业数据
-        if code == "所有校区":
-            major_df = df.copy()
-        elif (
-            code == "013-计算学部"
-            or code == "903-哈尔滨工业大学（深圳）"
-            or code == "902-哈尔滨工业大学（威海）"
-        ):
-            major_df = df[df["院系所码与名称"] == code].copy()
-        else:
-            major_df = df[df["完整专业代码"] == code].copy()
-        if len(major_df) == 0:
-            print(f"警告: 专业 {major} 没有数据")
-            continue
-        # 只处理有调剂数据的专业
-        if not major_df.empty:
-            # 统计录取专业的个数
-            stats_df = major_df["录取专业"].value_counts().reset_index()
-            stats_df.columns = ["录取专业", "个数"]
-            # 按照个数列进行升序排序
-            stats_df = stats_df.sort_values(by="个数")
-            transposed_major_count = stats_df.set_index("录取专业").T.reset_index(
-                drop=True
-            )
+        # 记录有调剂数据的专业数量
+        valid_major_count = 0
+
+        # 一次分区后遍历 major_mapping 中的每一个专业
+        for code, major, major_df in iter_major_slices(df, major_mapping):
+            if len(major_df) == 0:
+                print(f"警告: 专业 {major} 没有数据")
+                continue
+            # 只处理有调剂数据的专业
+            if not major_df.empty:
+                # 统计录取专业的个数
+                stats_df = major_df["录取专业"].value_counts().reset_index()
+                stats_df.columns = ["录取专业", "个数"]
+                # 按照个数列进行升序排序
+                stats_df = stats_df.sort_values(by="个数")
+                transposed_major_count = stats_df.set_index("录取专业").T.reset_index(
+                    drop=True
+                )
 
-            # 将统计结果写入Excel的不同sheet
-            sheet_name = major[:31]  # 限制sheet名称长度不超过31个字符
-            transposed_major_count.to_excel(writer, sheet_name=sheet_name, index=False)
+                # 将统计结果写入Excel的不同sheet（名称超过31个字符时自动截断）
+                writer.write_frame(transposed_major_count, major)
 
-            print(f"已统计专业: {major}，调剂人数: {stats_df['个数'].sum()}")
-            valid_major_count += 1
+                print(f"已统计专业: {major}，调剂人数: {stats_df['个数'].sum()}")
+                valid_major_count += 1
+            else:
+                print(f"专业 {major} 没有调剂数据，跳过生成sheet")
+
+        # 如果没有任何专业有调剂数据，删除上一次生成的文件，避免被当作最新结果
+        if valid_major_count == 0:
+            if os.path.exists(excel_path):
+                os.remove(excel_path)
+            print("所有专业均无调剂数据，未生成Excel文件")
         else:
-            print(f"专业 {major} 没有调剂数据，跳过生成sheet")
+            print(
+                f"\n已将 {valid_major_count} 个有调剂数据的专业统计结果保存至: {excel_path}"
+            )
+
 
-    # 如果没有任何专业有调剂数据，删除空文件
-    if valid_major_count == 0:
-        os.remove(excel_path)
-        print("所有专业均无调剂数据，未生成Excel文件")
-    else:
-        print(
-            f"\n已将 {valid_major_count} 个有调剂数据的专业统计结果保存至: {excel_path}"
-        )
+if __name__ == "__main__":
+    main()
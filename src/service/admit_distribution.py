@@ -3,7 +3,6 @@
 """
 
 import pandas as pd
-import matplotlib.pyplot as plt
 import numpy as np
 import os
 from pathlib import Path
@@ -12,71 +11,126 @@ import sys
 # 把项目根目录添加到系统路径
 project_dir = str(Path(__file__).resolve().parents[2])
 sys.path.append(project_dir)
-from src.utils.watermark_generator import add_watermark
-
-# 设置中文字体
-plt.rcParams["font.sans-serif"] = ["SimHei"]
-plt.rcParams["axes.unicode_minus"] = False
+from src.utils.dataset import load_scores
+from src.utils.profiling import profiled, stage
+from src.utils.major_slices import LEVEL_COLUMNS, partition_majors
+from src.utils.chart_renderer import render_charts
+from src.utils.excel_output import StreamingExcelWriter
 
 
 def load_data(excel_path):
     """加载Excel数据"""
-    data = pd.read_excel(excel_path)
-    data["完整专业代码"] = (
-        data["院系所码与名称"].str.split("-").str[0]
-        + "-"
-        + data["专业代码与名称"].str.split("-").str[0]
-        + "-"
-        + data["研究方向"].str.split("-").str[0]
-    )
-    return data
-
-
-def analyze_major_data(major_df, bin_size=10):
-    """分析单个专业的数据"""
-    # 生成分数段
-    max_score = (major_df["初试总分"].max() // bin_size + 1) * bin_size
-    min_score = (major_df["初试总分"].min() // bin_size) * bin_size
-    bins = list(range(min_score, max_score + bin_size, bin_size))
-    labels = [f"[{bins[i]},{bins[i+1]})" for i in range(len(bins) - 1)]
-
-    # 分析数据
-    major_df["分数段"] = pd.cut(
-        major_df["初试总分"], bins=bins, labels=labels, right=False
+    return load_scores(excel_path)
+
+
+# 计数张量各状态维度的取值顺序
+STATUS_VALUES = {
+    "复试及格": ["是", "否"],
+    "录取状态": ["已录取", "未录取"],
+    "一志愿录取": ["是", "否"],
+}
+
+
+def _status_codes(column):
+    """把状态列映射为 0/1，取值不在 STATUS_VALUES 中的记为 -1"""
+    lookup = {value: i for i, value in enumerate(STATUS_VALUES[column.name])}
+    return column.map(lookup).astype("float").fillna(-1).to_numpy(dtype=np.int64)
+
+
+@profiled()
+def build_count_tensor(data, bin_size=10):
+    """
+    一次遍历所有行，统计 [专业 × 分数段 × 复试及格 × 录取状态 × 一志愿录取] 的人数
+    :return: (各分组的计数, 各分组的分数段范围, 最低分数段序号)
+             计数为 {分组代码: ndarray[分数段, 2, 2, 2]}，第 0 个分数段为全体最低分数段
+             范围为 {分组代码: (起始分数段, 结束分数段)}，分数段序号即 分数 // bin_size
+    """
+    ordered, bounds = partition_majors(data)
+    n_rows = len(ordered)
+
+    # 排序后 (校区, 完整专业代码) 相同的行连续，按变化点编号得到叶子分组
+    keys = [ordered[col].to_numpy() for col in LEVEL_COLUMNS]
+    changed = np.zeros(n_rows, dtype=bool)
+    changed[0:1] = True
+    for key in keys:
+        changed[1:] |= pd.Series(key[1:]).ne(pd.Series(key[:-1])).to_numpy()
+    leaf = np.cumsum(changed) - 1
+    leaf_starts = np.flatnonzero(changed)
+    n_leaves = len(leaf_starts)
+
+    # 用整数运算得到分数段序号
+    scores = ordered["初试总分"].to_numpy(dtype=float)
+    scored = ~np.isnan(scores)
+    if not scored.any():
+        # 没有任何初试总分时没有分数段可统计
+        return {}, {}, 0
+    band = np.zeros(n_rows, dtype=np.int64)
+    band[scored] = scores[scored] // bin_size
+    base = band[scored].min()
+    n_bands = band[scored].max() - base + 1
+
+    passed, admitted, first_choice = (
+        _status_codes(ordered[col].astype(object)) for col in STATUS_VALUES
     )
-    grouped = major_df.groupby(
-        ["分数段", "复试及格", "录取状态", "一志愿录取"], observed=False
-    ).size()
-
-    # 填充缺失的组合
-    grouped = grouped.reindex(
-        pd.MultiIndex.from_product(
-            [labels, ["是", "否"], ["已录取", "未录取"], ["是", "否"]],
-            names=["分数段", "复试及格", "录取状态", "一志愿录取"],
-        ),
-        fill_value=0,
-    )
-
-    # 提取各部分数据
-    failed_interview = grouped.loc[(slice(None), "否", "未录取", "否")]
-    passed_not_admitted = grouped.loc[(slice(None), "是", "未录取", "否")]
-    transferred = grouped.loc[(slice(None), "是", "已录取", "否")]
-    first_choice = (
-        grouped.loc[(slice(None), "是", "已录取", "是")].groupby("分数段").sum()
+    valid = scored & (passed >= 0) & (admitted >= 0) & (first_choice >= 0)
+
+    # 单次 bincount 填充稠密计数张量
+    flat = (
+        ((leaf * n_bands + band - base) * 2 + passed) * 2 + admitted
+    ) * 2 + first_choice
+    counts = np.bincount(flat[valid], minlength=n_leaves * n_bands * 8).reshape(
+        n_leaves, n_bands, 2, 2, 2
     )
+    cumulative = np.concatenate([np.zeros_like(counts[:1]), counts.cumsum(axis=0)])
+
+    # 每个叶子分组的最低/最高分数段
+    band_low = np.where(scored, band, np.iinfo(np.int64).max)
+    band_high = np.where(scored, band, np.iinfo(np.int64).min)
+    leaf_low = np.minimum.reduceat(band_low, leaf_starts)
+    leaf_high = np.maximum.reduceat(band_high, leaf_starts)
+
+    tensors, ranges = {}, {}
+    for code, rows in bounds.items():
+        if not isinstance(rows, slice):
+            # 行不连续的分组：直接合计它覆盖的叶子分组
+            leaves = np.unique(leaf[rows])
+            tensors[code] = counts[leaves].sum(axis=0)
+            ranges[code] = (leaf_low[leaves].min(), leaf_high[leaves].max())
+            continue
+        if rows.stop <= rows.start:
+            continue
+        first, last = leaf[rows.start], leaf[rows.stop - 1] + 1
+        tensors[code] = cumulative[last] - cumulative[first]
+        ranges[code] = (leaf_low[first:last].min(), leaf_high[first:last].max())
+    return tensors, ranges, base
+
+
+def major_table(counts, band_range, base, bin_size=10):
+    """从计数张量中切出单个专业的分数段统计表"""
+    low, high = band_range
+    counts = counts[low - base : high - base + 1]
+    labels = [
+        f"[{band * bin_size},{(band + 1) * bin_size})" for band in range(low, high + 1)
+    ]
+
+    # 下标依次为 复试及格(是/否)、录取状态(已录取/未录取)、一志愿录取(是/否)
+    failed_interview = counts[:, 1, 1, 1]
+    passed_not_admitted = counts[:, 0, 1, 1]
+    transferred = counts[:, 0, 0, 1]
+    first_choice = counts[:, 0, 0, 0]
 
     # 计算总人数（假设复试及格为参与分配的唯一标准）
     total_applicants = (
         failed_interview + passed_not_admitted + transferred + first_choice
     )
 
-    # 计算一志愿录取率和总录取率
-    first_choice_rate = (first_choice / total_applicants).fillna(0)
-    overall_acceptance_rate = ((first_choice + transferred) / total_applicants).fillna(
-        0
-    )
+    # 计算一志愿录取率和总录取率，无人的分数段记为 0
+    with np.errstate(divide="ignore", invalid="ignore"):
+        first_choice_rate = np.nan_to_num(first_choice / total_applicants)
+        overall_acceptance_rate = np.nan_to_num(
+            (first_choice + transferred) / total_applicants
+        )
 
-    # 返回分析结果
     return pd.DataFrame(
         {
             "复试不及格": failed_interview,
@@ -87,134 +141,115 @@ def analyze_major_data(major_df, bin_size=10):
             "总录取率": overall_acceptance_rate,
         },
         index=labels,
-    ).fillna(0)
+    )
 
 
-def generate_chart(
+def chart_spec(
     data, major_name, output_dir, watermark_text="葵妈考研", figsize=(12, 6)
 ):
-    """生成并保存图表"""
-    fig, ax = plt.subplots(figsize=figsize)
-    colors = ["#1F77B4", "#FF7F0E", "#2CA02C", "#D62728"]
-    width = 0.8 / len(data.columns)
-    x = np.arange(len(data.index))
-
-    for i, col in enumerate(data.columns):
-        values = data[col]
-        ax.bar(x + (i - 1.5) * width, values, width, label=col, color=colors[i])
-        for j, val in enumerate(values):
-            if val > 0:
-                ax.text(
-                    x[j] + (i - 1.5) * width,
-                    val,
-                    str(int(val)),
-                    ha="center",
-                    va="bottom",
-                    fontsize=9,
-                )
-
-    ax.set_xticks(x)
-    ax.set_xticklabels(data.index, rotation=30, ha="center")
-    ax.set_xlabel("初试总分分数段")
-    ax.set_ylabel("人数")
-    ax.set_title(f"{major_name}一志愿去向")
-    ax.legend()
-    plt.tight_layout()
-
-    output_path = os.path.join(output_dir, f"{major_name}一志愿去向.png")
-    plt.savefig(output_path, bbox_inches="tight", dpi=300)
-    plt.close()
-
-    # 添加水印
-    try:
-        add_watermark(
-            output_path,
-            output_path,
-            watermark_text=watermark_text,
-            opacity=30,
-            scale=0.8,
-            angle=30,
-            color="gray",
-            compress=True,
-            quality=10,
-        )
-        print(f"图表已生成: {output_path}")
-    except Exception as e:
-        print(f"添加水印失败: {e}")
+    """生成图表描述，由渲染池统一渲染"""
+    return {
+        "kind": "grouped_bar",
+        "data": data,
+        "title": f"{major_name}一志愿去向",
+        "xlabel": "初试总分分数段",
+        "ylabel": "人数",
+        "output_path": os.path.join(output_dir, f"{major_name}一志愿去向.png"),
+        "figsize": figsize,
+        "watermark_text": watermark_text,
+    }
+
 
+def generate_charts(specs, max_workers=None):
+    """并行渲染所有图表并逐个报告结果"""
+    for result in render_charts(specs, max_workers=max_workers):
+        if result["error"] is None:
+            print(f"图表已生成: {result['output_path']}")
+        else:
+            print(f"生成图表失败: {result['output_path']}\n{result['error']}")
 
-def process_all_majors(excel_path, major_mapping, output_dir=".", bin_size=10):
-    """处理所有专业数据"""
+
+def process_all_majors(
+    excel_path,
+    major_mapping,
+    output_dir=".",
+    bin_size=10,
+    max_workers=None,
+    csv_dir=None,
+):
+    """
+    处理所有专业数据
+    :param csv_dir: 若指定，每个专业的统计表同时输出为 CSV
+    """
     os.makedirs(output_dir, exist_ok=True)
+    excel_path_out = os.path.join(output_dir, "analysis_results.xlsx")
+    specs = []
 
     try:
         # 加载数据
         data = load_data(excel_path)
 
-        # 准备Excel写入器
-        excel_writer = pd.ExcelWriter(os.path.join(output_dir, "analysis_results.xlsx"))
-
-        for major_code, major_name in major_mapping.items():
-            print(f"正在处理: {major_name}")
-
-            # 筛选专业数据
-            if major_code == "所有校区":
-                major_df = data.copy()
-            elif (
-                major_code == "013-计算学部"
-                or major_code == "903-哈尔滨工业大学（深圳）"
-                or major_code == "902-哈尔滨工业大学（威海）"
-            ):
-                major_df = data[data["院系所码与名称"] == major_code].copy()
-            else:
-                major_df = data[data["完整专业代码"] == major_code].copy()
-            if len(major_df) == 0:
-                print(f"警告: 专业 {major_name} 没有数据")
-                continue
-
-            # 分析数据
-            result = analyze_major_data(major_df, bin_size)
-
-            # 保存分析结果
-            summary = pd.DataFrame({"总计": result.sum()}).T
-            sum = (
-                summary["一志愿录取"]
-                + summary["调剂录取"]
-                + summary["复试及格未录取"]
-                + summary["复试不及格"]
-            )
-            summary["一志愿录取率"] = summary["一志愿录取"] / sum
-            summary["总录取率"] = (summary["一志愿录取"] + summary["调剂录取"]) / sum
-            # 先进行数据连接操作
-            combined_result = pd.concat([result, summary])
-
-            # 将需要百分比显示的列转换为字符串格式
-            if "一志愿录取率" in combined_result.columns:
-                combined_result["一志愿录取率"] = combined_result["一志愿录取率"].map(
-                    "{:.2%}".format
-                )
-
-            if "总录取率" in combined_result.columns:
-                combined_result["总录取率"] = combined_result["总录取率"].map(
-                    "{:.2%}".format
-                )
-            combined_result.to_excel(excel_writer, sheet_name=major_name[:31])
-
-            # 生成图表（如果有数据）
-            if result.sum().sum() > 0:
-                result = result[
-                    ["复试不及格", "复试及格未录取", "调剂录取", "一志愿录取"]
-                ]
-                generate_chart(result, major_name, output_dir)
-
-        # 保存Excel文件
-        excel_writer.close()
-        print(f"分析结果已保存到: {os.path.join(output_dir, 'analysis_results.xlsx')}")
+        # 一次遍历统计所有专业
+        tensors, ranges, base = build_count_tensor(data, bin_size)
+        if not tensors:
+            print("警告: 数据中没有初试总分，无法统计")
+
+        # 准备Excel写入器（逐行写入，不在内存中保留整个工作簿；出错时不保存）
+        with StreamingExcelWriter(excel_path_out, csv_dir=csv_dir) as excel_writer:
+            for major_code, major_name in major_mapping.items():
+                print(f"正在处理: {major_name}")
+
+                if major_code not in tensors:
+                    print(f"警告: 专业 {major_name} 没有数据")
+                    continue
+
+                with stage("major", major=major_name):
+                    # 从计数张量中切出该专业的统计表
+                    result = major_table(
+                        tensors[major_code], ranges[major_code], base, bin_size
+                    )
+
+                    # 保存分析结果
+                    summary = pd.DataFrame({"总计": result.sum()}).T
+                    sum = (
+                        summary["一志愿录取"]
+                        + summary["调剂录取"]
+                        + summary["复试及格未录取"]
+                        + summary["复试不及格"]
+                    )
+                    summary["一志愿录取率"] = summary["一志愿录取"] / sum
+                    summary["总录取率"] = (
+                        summary["一志愿录取"] + summary["调剂录取"]
+                    ) / sum
+                    # 先进行数据连接操作
+                    combined_result = pd.concat([result, summary])
+
+                    # 录取率写为数值，以单元格百分比格式显示
+                    excel_writer.write_frame(
+                        combined_result,
+                        major_name,
+                        index=True,
+                        percent_columns=["一志愿录取率", "总录取率"],
+                    )
+
+                    # 生成图表（如果有数据）
+                    if result.sum().sum() > 0:
+                        result = result[
+                            ["复试不及格", "复试及格未录取", "调剂录取", "一志愿录取"]
+                        ]
+                        specs.append(chart_spec(result, major_name, output_dir))
+
+        if excel_writer.sheet_names:
+            print(f"分析结果已保存到: {excel_path_out}")
+        elif os.path.exists(excel_path_out):
+            # 没有写入任何专业时删除上一次的结果，避免被当作最新结果
+            os.remove(excel_path_out)
+
+        # 所有专业的图表一起并行渲染
+        generate_charts(specs, max_workers=max_workers)
 
     except Exception as e:
         print(f"处理过程中出错: {e}")
-        if "excel_writer" in locals():
-            excel_writer.close()
 
 
 def main():
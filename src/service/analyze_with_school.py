@@ -1,9 +1,20 @@
-import pandas as pd
+"""
+问卷分类与成绩分析
+用法：python src/service/analyze_with_school.py [--statistic 列名] [--rebuild]
+"""
+
+import argparse
 import os
+import sys
+from pathlib import Path
+
+# 把项目根目录添加到系统路径
+project_dir = str(Path(__file__).resolve().parents[2])
+sys.path.append(project_dir)
+from src.utils.cube import REGROUPS, load_cube, query
 
 # 读取Excel文件
 file_path = "data/哈工计算机25考研复试信息表_纠正后_合并.xlsx"
-df = pd.read_excel(file_path)
 
 # statistic = "本科学校类别（必填）"
 # statistic = "跨考类别（必填）"
@@ -14,72 +25,59 @@ df = pd.read_excel(file_path)
 # statistic = "ICPC竞赛经历（必填）"
 # statistic = "开始复习月份（必填）"
 # statistic = "备考状态（必填）"
-statistic = "OI竞赛经历（必填）"
-# 定义分组映射字典
-month_groups = {
-    "没参加过OI": ["没参加过OI"],
-    "参加过OI": [
-        "NOIP提高组二等奖以下",
-        "NOIP提高组二等奖",
-    ],
-}
-
-# 初始化分组列，默认值为原始月份
-df[statistic + "_分组"] = df[statistic]
-
-# 对每个分组进行映射
-for group_name, months in month_groups.items():
-    df.loc[df[statistic].isin(months), statistic + "_分组"] = group_name
-# 按本科学校类别（必填）列进行分组，计算各分组下初试总分（必填）、复试机试成绩（总分160）（必填）、复试面试成绩（总分150）（必填）和总成绩的最低分、最高分和平均分
-grouped = (
-    df.groupby(statistic + "_分组")[
-        [
-            "初试总分（必填）",
-            "复试机试成绩（总分160）（必填）",
-            "复试面试成绩（总分150）（必填）",
-        ]
+DEFAULT_STATISTIC = "OI竞赛经历（必填）"
+
+STAT_NAMES = {"min": "最低分", "max": "最高分", "mean": "平均分"}
+
+
+def cube_dimension(statistic):
+    """分类列在立方体中的维度名，有分组定义（见 cube.REGROUPS）的分类使用派生维度"""
+    for name, (source, _) in REGROUPS.items():
+        if source == statistic:
+            return name
+    return statistic
+
+
+def analyze(cube, statistic):
+    """
+    计算某个分类下初试总分、复试机试成绩和复试面试成绩的最低分、最高分和平均分
+    有分组定义（见 cube.REGROUPS）的分类按分组统计
+    """
+    dimension = cube_dimension(statistic)
+    grouped = query(cube, dimension, aggregations=list(STAT_NAMES)).reset_index()
+
+    # 重命名列名，如 初试总分最低分
+    grouped.columns = [statistic] + [
+        f"{measure.split('（')[0]}{STAT_NAMES[agg]}"
+        for measure, agg in grouped.columns[1:]
     ]
-    .agg(["min", "max", "mean"])
-    .reset_index()
-)
-
-# 重命名列名
-grouped.columns = [
-    statistic,
-    "初试总分最低分",
-    "初试总分最高分",
-    "初试总分平均分",
-    "复试机试成绩最低分",
-    "复试机试成绩最高分",
-    "复试机试成绩平均分",
-    "复试面试成绩最低分",
-    "复试面试成绩最高分",
-    "复试面试成绩平均分",
-]
-
-# 将平均分结果保留两位小数
-for col in grouped.columns:
-    if "平均分" in col:
-        grouped[col] = grouped[col].round(2)
-
-# 定义本科学校类别的顺序
-# category_order = ['C9', '985（非C9）', '211', '一本', '二本']
-
-# category_order = [
-#     "有高于课程设计水平的项目 (包括公司的实习项目)",
-#     "有不高于课程设计水平的项目",
-#     "没有任何计算机相关项目",
-# ]
-# # 使用Categorical类型对本科学校类别（必填）列进行排序
-# grouped[statistic] = pd.Categorical(
-#     grouped[statistic], categories=category_order, ordered=True
-# )
-
-# # 按照本科学校类别（必填）列进行排序
-# grouped = grouped.sort_values(statistic).reset_index(drop=True)
-
-# 将结果保存为 Excel 文件
-output_folder = f"output/{statistic}分析"
-os.makedirs(output_folder, exist_ok=True)
-save_path = f"{output_folder}/{statistic}分析.xlsx"
-grouped.to_excel(save_path, index=False)
+    return grouped
+
+
+def main():
+    parser = argparse.ArgumentParser(description="问卷分类与成绩分析")
+    parser.add_argument(
+        "-s",
+        "--statistic",
+        default=DEFAULT_STATISTIC,
+        help=f"分类列名, 默认: {DEFAULT_STATISTIC}",
+    )
+    parser.add_argument("--rebuild", action="store_true", help="重新计算立方体")
+    args = parser.parse_args()
+
+    cube = load_cube(file_path, rebuild=args.rebuild)
+    if cube_dimension(args.statistic) not in cube["dimensions"]:
+        sources = {name: source for name, (source, _) in REGROUPS.items()}
+        choices = dict.fromkeys(sources.get(dim, dim) for dim in cube["dimensions"])
+        parser.error(f"未知的分类列: {args.statistic}，可选: {', '.join(choices)}")
+    grouped = analyze(cube, args.statistic)
+
+    # 将结果保存为 Excel 文件
+    output_folder = f"output/{args.statistic}分析"
+    os.makedirs(output_folder, exist_ok=True)
+    save_path = f"{output_folder}/{args.statistic}分析.xlsx"
+    grouped.to_excel(save_path, index=False)
+
+
+if __name__ == "__main__":
+    main()
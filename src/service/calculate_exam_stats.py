@@ -1,14 +1,32 @@
-import pandas as pd
-from decimal import Decimal
+"""
+问卷各科目成绩统计
+用法：python src/service/calculate_exam_stats.py [xlsx ...] [--chunked] [--save-state 路径] [--merge 状态文件 ...]
+"""
+
+import argparse
 import os
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# 把项目根目录添加到系统路径
+project_dir = str(Path(__file__).resolve().parents[2])
+sys.path.append(project_dir)
+from src.utils.data_cache import load_excel
+from src.utils.online_stats import (
+    describe,
+    iter_excel_blocks,
+    load_stats,
+    merge,
+    new_stats,
+    save_stats,
+    update,
+)
 
 # 读取Excel数据（需确保文件路径正确）
-df = pd.read_excel('data/哈工计算机25考研复试信息表_纠正后_合并.xlsx', sheet_name='Sheet1')
-df = df.fillna(0)
-# place = '校本部'
-# place = '校本部'
-# df = df[df['院系所码与名称'] == f'013-计算学部']
-print(len(df))
+file_path = 'data/哈工计算机25考研复试信息表_纠正后_合并.xlsx'
 
 # 定义科目与列名的映射关系（根据原表列名调整）
 # subject_mapping = {
@@ -29,45 +47,102 @@ subject_mapping = {
     '初试总分': '初试总分（必填）',
     '机试(满分160)': '复试机试成绩（总分160）（必填）',
     '面试(满分150)': '复试面试成绩（总分150）（必填）',
-    '总成绩': '总成绩'
+    '总成绩': '总成绩',
 }
 
-# 初始化结果字典
-stats = {
-    '科目': [],
-    '最低分': [],
-    '最高分': [],
-    '平均分': [],
-    '中位数': []
-}
 
-for subject, column in subject_mapping.items():
-    # 提取列数据并转换为数值类型（处理可能的非数字字符）
-    try:
-        data = pd.to_numeric(df[column], errors='coerce').dropna()
-    except Exception as e:
-        print(f"处理{subject}时出错: {e}")
-        continue
-
-    # 计算统计值
-    min_val = data.min()
-    max_val = data.max()
-    avg_val = data.mean().round(2)
-    median_val = data.median()
-    
-    # 统一数值格式（保留两位小数，中位数取整）
-    stats['科目'].append(subject)
-    stats['最低分'].append(f"{min_val:.2f}")
-    stats['最高分'].append(f"{max_val:.2f}")
-    stats['平均分'].append(avg_val)
-    stats['中位数'].append(f"{median_val:.0f}" if isinstance(median_val, (int, float)) else median_val)
-
-# 转换为DataFrame并输出
-result_df = pd.DataFrame(stats)
-print("各科目成绩统计结果：")
-# print(result_df.to_markdown(index=False))
-
-# 保存为Excel文件（可选）
-output_file = 'output/成绩表格'
-os.makedirs(output_file, exist_ok=True)
-result_df.to_excel(f'{output_file}/问卷成绩统计结果.xlsx', index=False)
\ No newline at end of file
+def numeric_block(df, columns):
+    """取出若干列组成数值块，非数字字符视为缺失，缺少的列全部为缺失"""
+    block = pd.DataFrame(
+        {
+            col: (
+                pd.to_numeric(df[col], errors='coerce') if col in df.columns else np.nan
+            )
+            for col in columns
+        },
+        index=df.index,
+    )
+    return block.to_numpy(dtype=float)
+
+
+def collect_stats(excel_path, columns, chunked=False, chunk_size=10000):
+    """
+    统计一个文件中各列的成绩，缺失值不参与统计
+    :param chunked: 流式逐块读取，不把整张表载入内存
+    """
+    stats = new_stats(columns)
+    if chunked:
+        for block in iter_excel_blocks(excel_path, columns, chunk_size=chunk_size):
+            update(stats, block)
+    else:
+        df = load_excel(excel_path, 'Sheet1')
+        print(len(df))
+        update(stats, numeric_block(df, columns))
+    return stats
+
+
+def format_result(stats):
+    """统一数值格式（保留两位小数，中位数取整）"""
+    summary = describe(stats)
+    rows = []
+    for subject, column in subject_mapping.items():
+        row = summary.loc[column]
+        if row['count'] == 0:
+            print(f"处理{subject}时出错: 没有有效成绩")
+            continue
+        rows.append(
+            {
+                '科目': subject,
+                '最低分': f"{row['min']:.2f}",
+                '最高分': f"{row['max']:.2f}",
+                '平均分': round(row['mean'], 2),
+                '中位数': f"{row['median']:.0f}",
+            }
+        )
+    return pd.DataFrame(rows, columns=['科目', '最低分', '最高分', '平均分', '中位数'])
+
+
+def main():
+    parser = argparse.ArgumentParser(description='问卷各科目成绩统计')
+    parser.add_argument(
+        'files', nargs='*', help=f'xlsx 文件，可多个（如多年数据）, 默认: {file_path}'
+    )
+    parser.add_argument(
+        '--chunked', action='store_true', help='流式逐块读取，适合超大文件'
+    )
+    parser.add_argument(
+        '--chunk-size', type=int, default=10000, help='流式读取的块大小, 默认: 10000'
+    )
+    parser.add_argument('--save-state', help='把统计状态保存为 JSON，供之后合并')
+    parser.add_argument(
+        '--merge', nargs='+', default=[], help='合并已保存的统计状态文件'
+    )
+    args = parser.parse_args()
+
+    columns = list(subject_mapping.values())
+    files = args.files or ([] if args.merge else [file_path])
+
+    stats = new_stats(columns)
+    for path in files:
+        stats = merge(
+            stats, collect_stats(path, columns, args.chunked, args.chunk_size)
+        )
+    for path in args.merge:
+        stats = merge(stats, load_stats(path))
+
+    if args.save_state:
+        save_stats(stats, args.save_state)
+        print(f"统计状态已保存: {args.save_state}")
+
+    result_df = format_result(stats)
+    print("各科目成绩统计结果：")
+    # print(result_df.to_markdown(index=False))
+
+    # 保存为Excel文件（可选）
+    output_file = 'output/成绩表格'
+    os.makedirs(output_file, exist_ok=True)
+    result_df.to_excel(f'{output_file}/问卷成绩统计结果.xlsx', index=False)
+
+
+if __name__ == '__main__':
+    main()
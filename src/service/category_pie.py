@@ -1,129 +1,126 @@
-import pandas as pd
-import matplotlib.pyplot as plt
+"""
+问卷分类统计饼图
+用法：python src/service/category_pie.py [--statistic 列名 ...] [--all] [-j 并行数]
+"""
+
+import argparse
 import os
-from pathlib import Path
 import sys
+from pathlib import Path
+
+import pandas as pd
 
 # 把项目根目录添加到系统路径
 project_dir = str(Path(__file__).resolve().parents[2])
 sys.path.append(project_dir)
-from src.utils.watermark_generator import add_watermark
+from src.utils.chart_renderer import render_charts
+from src.utils.dataset import QUESTIONNAIRE_CATEGORY_COLUMNS, load_questionnaire
 
 # 读取Excel文件
 file_path = "data/哈工计算机25考研复试信息表_纠正后_合并.xlsx"
-df = pd.read_excel(file_path)
-
-# statistic = "本科学校类别（必填）"
-# statistic = "跨考类别（必填）"
-# statistic = "是否二战及以上（必填）"
-# statistic = "项目经历（必填）"
-# statistic = "论文发表情况（必填）"
-# statistic = "数学建模获奖情况（必填）"
-# statistic = "ICPC竞赛经历（必填）"
-# statistic = "OI竞赛经历（必填）"
-# statistic = "开始复习月份（必填）"
-statistic = "备考状态（必填）"
-# 统计“本科学校类别（必填）”的分布
-df[statistic] = df[statistic].apply(lambda x: x.split("：")[0])
-category_counts = df[statistic].value_counts()
-total = category_counts.sum()
-
-# 计算百分比
-category_percentages = (category_counts / total * 100).round(1)
-
-# 创建结果DataFrame
-result_df = pd.DataFrame(
-    {
-        statistic: category_counts.index,
-        "人数": category_counts.values,
-        "百分比(%)": category_percentages.values,
-    }
-)
-
-# 按人数降序排序
-result_df = result_df.sort_values("人数", ascending=False)
-
-# 设置中文字体和解决负号显示问题
-plt.rcParams["font.sans-serif"] = ["SimHei"]
-plt.rcParams["axes.unicode_minus"] = False
-
-
-# 自定义格式化函数，用于显示人数和百分比
-def make_autopct(values):
-    def my_autopct(pct):
-        total = sum(values)
-        val = int(round(pct * total / 100.0))
-        return f"{val} ({pct:.1f}%)"
-
-    return my_autopct
-
-
-# 创建图表
-fig, ax = plt.subplots(figsize=(10, 8))
-
-# 突出最大一块
-explode = [0.05 if val == category_counts.max() else 0 for val in category_counts]
-
-# 绘制饼图
-wedges, texts, autotexts = ax.pie(
-    category_counts,
-    labels=None,  # 不直接显示标签，改用图例
-    autopct=make_autopct(category_counts),  # 使用自定义的格式化函数
-    pctdistance=0.75,  # 百分比标签离中心的距离
-    textprops=dict(color="black", fontsize=10, weight="bold"),  # 标签样式
-    startangle=90,
-    explode=explode,
-    colors=plt.cm.Paired.colors,
-    wedgeprops=dict(width=0.4),  # 控制饼图厚度（甜甜圈样式）
-)
-
-# 添加图例并美化
-legend = ax.legend(
-    wedges,
-    category_counts.index,
-    title=f"{statistic}分布",
-    loc="center left",
-    bbox_to_anchor=(1, 0, 0.5, 1),
-    prop={"size": 12},
-)
-
-# 设置标题
-ax.set_title(f"{statistic}分布", fontsize=16)
-
-# 保证饼图为圆形
-ax.axis("equal")
-
-# 自动调整布局，防止被截断
-plt.tight_layout()
-
-# 保存图片到本地，使用 bbox_inches='tight' 避免白边
-output_folder = f"output/{statistic}"
-os.makedirs(output_folder, exist_ok=True)
-save_path = f"{output_folder}/{statistic}分布.png"
-
-plt.savefig(save_path, dpi=300, bbox_inches="tight")
-
-# 添加水印
-try:
-    add_watermark(
-        save_path,
-        save_path,
-        watermark_text="葵妈考研",
-        opacity=30,
-        scale=0.8,
-        angle=30,
-        color="gray",
-        compress=True,
-        quality=10,
+
+# 默认统计项
+DEFAULT_STATISTIC = "备考状态（必填）"
+
+
+def count_categories(df, statistics):
+    """
+    一次统计多个分类列的分布
+    选项中 "：" 之后的说明文字会被去掉
+    :return: 以 (统计项, 类别) 为索引的人数 Series
+    """
+    stacked = df[statistics].astype(object).melt(var_name="统计项", value_name="类别")
+    stacked["类别"] = stacked["类别"].astype(object).str.split("：").str[0]
+    return stacked.groupby(["统计项", "类别"], sort=False).size()
+
+
+def category_table(statistic, category_counts):
+    """生成单个统计项的人数和百分比表，按人数降序排序"""
+    category_counts = category_counts.sort_values(ascending=False)
+    total = category_counts.sum()
+
+    # 计算百分比
+    category_percentages = (category_counts / total * 100).round(1)
+
+    # 创建结果DataFrame
+    return pd.DataFrame(
+        {
+            statistic: category_counts.index,
+            "人数": category_counts.values,
+            "百分比(%)": category_percentages.values,
+        }
     )
-    print(f"饼图已生成并添加水印: {save_path}")
-except Exception as e:
-    print(f"添加水印失败: {e}")
 
-# 显示图表
-plt.show()
 
-# 保存统计数据到Excel
-excel_path = f"{output_folder}/{statistic}分布统计.xlsx"
-result_df.to_excel(excel_path, index=False)
-print(f"统计数据已保存到Excel: {excel_path}")
+def process_statistics(statistics, max_workers=None):
+    """加载一次数据，统计并输出所有统计项的饼图和Excel"""
+    df = load_questionnaire(file_path)
+    missing = [statistic for statistic in statistics if statistic not in df.columns]
+    for statistic in missing:
+        print(f"警告: 数据中没有列 {statistic}")
+    statistics = [statistic for statistic in statistics if statistic not in missing]
+    counts = count_categories(df, statistics)
+
+    specs = []
+    for statistic in statistics:
+        # 整列都没有作答时 groupby 不会产生该统计项
+        if statistic not in counts.index.get_level_values("统计项"):
+            print(f"警告: {statistic} 没有数据，跳过")
+            continue
+        category_counts = counts.loc[statistic].sort_values(ascending=False)
+        result_df = category_table(statistic, category_counts)
+
+        output_folder = f"output/{statistic}"
+        os.makedirs(output_folder, exist_ok=True)
+
+        # 保存统计数据到Excel
+        excel_path = f"{output_folder}/{statistic}分布统计.xlsx"
+        result_df.to_excel(excel_path, index=False)
+        print(f"统计数据已保存到Excel: {excel_path}")
+
+        specs.append(
+            {
+                "kind": "donut",
+                "data": category_counts,
+                "title": f"{statistic}分布",
+                "title_fontsize": 16,
+                "legend_title": f"{statistic}分布",
+                "output_path": f"{output_folder}/{statistic}分布.png",
+                "figsize": (10, 8),
+                "watermark_text": "葵妈考研",
+            }
+        )
+
+    # 所有饼图一起渲染（添加水印并压缩）
+    for result in render_charts(specs, max_workers=max_workers):
+        if result["error"] is None:
+            print(f"饼图已生成并添加水印: {result['output_path']}")
+        else:
+            print(f"生成饼图失败: {result['output_path']}\n{result['error']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="问卷分类统计饼图")
+    parser.add_argument(
+        "-s",
+        "--statistic",
+        action="append",
+        help=f"统计的列名，可重复，默认: {DEFAULT_STATISTIC}",
+    )
+    parser.add_argument(
+        "--all", action="store_true", help="统计所有问卷分类列（备考状态等）"
+    )
+    parser.add_argument(
+        "-j", "--jobs", type=int, default=None, help="渲染进程数，默认为CPU核数"
+    )
+    args = parser.parse_args()
+
+    if args.all:
+        statistics = QUESTIONNAIRE_CATEGORY_COLUMNS
+    else:
+        statistics = args.statistic or [DEFAULT_STATISTIC]
+    process_statistics(statistics, max_workers=args.jobs)
+
+
+if __name__ == "__main__":
+    main()
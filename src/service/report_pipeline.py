@@ -0,0 +1,124 @@
+"""
+报表流水线任务登记
+用法：python src/service/report_pipeline.py [任务名 ...] [-j 并行数] [--force] [--dry-run]
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+# 把项目根目录添加到系统路径
+project_dir = str(Path(__file__).resolve().parents[2])
+sys.path.append(project_dir)
+from src.utils.dataset import QUESTIONNAIRE_CATEGORY_COLUMNS
+from src.utils.pipeline import TASKS, print_results, run_pipeline, task
+
+SCORES = "data/总复试成绩单.xlsx"
+QUESTIONNAIRE_RAW = "data/哈工计算机25考研复试信息表_纠正后.xlsx"
+QUESTIONNAIRE = "data/哈工计算机25考研复试信息表_纠正后_合并.xlsx"
+
+# 派生完整专业代码用到的列
+MAJOR_COLUMNS = ["院系所码与名称", "专业代码与名称", "研究方向"]
+
+task(
+    "correct",
+    "src/utils/correct.py",
+    inputs=[SCORES, QUESTIONNAIRE_RAW],
+    outputs=[QUESTIONNAIRE],
+)
+task(
+    "admit_distribution",
+    "src/service/admit_distribution.py",
+    inputs=[
+        (SCORES, MAJOR_COLUMNS + ["初试总分", "复试及格", "录取状态", "一志愿录取"])
+    ],
+    outputs=["output/一志愿去向/analysis_results.xlsx"],
+)
+task(
+    "adjustment_distribution",
+    "src/service/adjustment_distribution.py",
+    inputs=[(SCORES, MAJOR_COLUMNS + ["录取状态", "一志愿录取", "录取专业"])],
+    outputs=["output/调剂统计/各专业调剂录取统计.xlsx"],
+)
+task(
+    "score_distribution",
+    "src/service/score_distribution.py",
+    inputs=[(QUESTIONNAIRE, MAJOR_COLUMNS + ["复试机试成绩（总分160）（必填）"])],
+    outputs=["output/问卷66人机试分布/各校区问卷66人机试分布统计.xlsx"],
+)
+task(
+    "analyze_with_school",
+    "src/service/analyze_with_school.py",
+    inputs=[
+        (
+            QUESTIONNAIRE,
+            [
+                "OI竞赛经历（必填）",
+                "初试总分（必填）",
+                "复试机试成绩（总分160）（必填）",
+                "复试面试成绩（总分150）（必填）",
+            ],
+        )
+    ],
+    outputs=["output/OI竞赛经历（必填）分析/OI竞赛经历（必填）分析.xlsx"],
+)
+task(
+    "calculate_exam_stats",
+    "src/service/calculate_exam_stats.py",
+    inputs=[QUESTIONNAIRE],
+    outputs=["output/成绩表格/问卷成绩统计结果.xlsx"],
+)
+# 没有作答的统计项会被跳过、不生成文件，所以不登记逐列的输出；
+# 输入或代码不变时跳过，手动删除了图表时用 --force 重新生成
+task(
+    "category_pie",
+    "src/service/category_pie.py",
+    inputs=[(QUESTIONNAIRE, QUESTIONNAIRE_CATEGORY_COLUMNS)],
+    args=["--all"],
+)
+task(
+    "school_distribution",
+    "src/service/school_distribution.py",
+    inputs=[(QUESTIONNAIRE, ["本科学校（必填）"])],
+    outputs=["output/本科学校/本科学校分布.png"],
+)
+task(
+    "school_major_distribution",
+    "src/service/school_major_distribution.py",
+    inputs=[(QUESTIONNAIRE, ["本科学校类别（必填）", "跨考类别（必填）"])],
+    outputs=["output/学校和跨考分析/学校和跨考分析.xlsx"],
+)
+task(
+    "school_word_cloud",
+    "src/service/school_word_cloud.py",
+    inputs=[(QUESTIONNAIRE, ["本科学校（必填）"])],
+    outputs=["output/本科学校（必填）心形词云/本科学校（必填）心形词云.png"],
+)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="报表流水线（增量重建）")
+    parser.add_argument("tasks", nargs="*", help="要运行的任务，默认全部")
+    parser.add_argument("-j", "--jobs", type=int, default=1, help="并行任务数, 默认: 1")
+    parser.add_argument("--force", action="store_true", help="忽略指纹，全部重新运行")
+    parser.add_argument(
+        "--dry-run", action="store_true", help="只列出需要重新运行的任务"
+    )
+    parser.add_argument("--list", action="store_true", help="列出所有任务")
+    args = parser.parse_args()
+
+    if args.list:
+        for name, spec in TASKS.items():
+            print(f"{name:<28}{spec['script']}")
+        return
+
+    results = run_pipeline(
+        args.tasks, jobs=args.jobs, force=args.force, dry_run=args.dry_run
+    )
+    print_results(results)
+    if any(r["status"] in ("failed", "blocked") for r in results.values()):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+"""
+多年份结果查询
+用法：
+    python src/service/results_query.py ingest --year 2025 [--scores 成绩单.xlsx] [--questionnaire 问卷.xlsx]
+    python src/service/results_query.py admit [--year 2024 2025] [--level 完整专业代码] [--bands] [-o 结果.xlsx]
+    python src/service/results_query.py adjustment [--year ...] [-o 结果.xlsx]
+    python src/service/results_query.py stats --column 初试总分 [--table scores] [--level 院系所码与名称]
+    python src/service/results_query.py histogram --column 复试机试成绩（总分160）（必填） [-b 10]
+    python src/service/results_query.py years
+查询直接在 SQLite 结果库（默认 data/results.sqlite）上做聚合，指定 -o 时每个分组写一个 sheet
+"""
+
+import argparse
+import sqlite3
+import sys
+from pathlib import Path
+
+from pandas.errors import DatabaseError
+
+# 把项目根目录添加到系统路径
+project_dir = str(Path(__file__).resolve().parents[2])
+sys.path.append(project_dir)
+from src.utils.dataset import QUESTIONNAIRE_PATH, SCORES_PATH
+from src.utils.excel_output import StreamingExcelWriter
+from src.utils.major_slices import ALL_CAMPUSES
+from src.utils.results_store import (
+    DB_PATH,
+    GROUP_LEVELS,
+    admit_bands,
+    admit_summary,
+    adjustment_counts,
+    connect,
+    ingest_year,
+    score_histogram,
+    score_stats,
+    years,
+)
+
+PERCENT_COLUMNS = ["一志愿录取率", "总录取率"]
+
+
+def save_by_group(df, output_path):
+    """每个分组写一个 sheet"""
+    with StreamingExcelWriter(output_path) as writer:
+        for group, group_df in df.groupby("分组", sort=False):
+            writer.write_frame(
+                group_df.drop(columns="分组"),
+                group,
+                percent_columns=[c for c in PERCENT_COLUMNS if c in df.columns],
+            )
+    print(f"查询结果已保存: {output_path}")
+
+
+def add_query_arguments(parser, level=ALL_CAMPUSES):
+    parser.add_argument(
+        "-y", "--year", type=int, nargs="+", help="只查询这些年份，默认全部"
+    )
+    parser.add_argument(
+        "-l",
+        "--level",
+        choices=GROUP_LEVELS,
+        default=level,
+        help=f"分组层级, 默认: {level}",
+    )
+    parser.add_argument("-o", "--output", help="结果保存路径（xlsx），默认打印")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="多年份结果查询")
+    parser.add_argument("--db", default=DB_PATH, help=f"结果库路径, 默认: {DB_PATH}")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    ingest = commands.add_parser("ingest", help="导入一年的成绩单和问卷")
+    ingest.add_argument("-y", "--year", type=int, required=True, help="年份")
+    ingest.add_argument("--scores", default=SCORES_PATH, help="总复试成绩单 xlsx")
+    ingest.add_argument(
+        "--questionnaire", default=QUESTIONNAIRE_PATH, help="合并后的问卷 xlsx"
+    )
+    ingest.add_argument(
+        "--force", action="store_true", help="源文件没有变化时也重新导入"
+    )
+
+    admit = commands.add_parser("admit", help="录取去向人数和录取率")
+    add_query_arguments(admit, level="完整专业代码")
+    admit.add_argument("--bands", action="store_true", help="按初试总分分数段统计")
+    admit.add_argument(
+        "-b", "--bin-size", type=int, default=10, help="分数段宽度, 默认: 10"
+    )
+
+    adjustment = commands.add_parser("adjustment", help="调剂录取到的专业及人数")
+    add_query_arguments(adjustment, level="完整专业代码")
+
+    stats = commands.add_parser("stats", help="成绩列的最低分、最高分、平均分和中位数")
+    add_query_arguments(stats)
+    stats.add_argument("-c", "--column", required=True, help="成绩列名")
+    stats.add_argument(
+        "-t",
+        "--table",
+        choices=["scores", "questionnaire"],
+        default="scores",
+        help="scores（成绩单）或 questionnaire（问卷）, 默认: scores",
+    )
+
+    histogram = commands.add_parser("histogram", help="成绩列的分数段分布")
+    add_query_arguments(histogram)
+    histogram.add_argument("-c", "--column", required=True, help="成绩列名")
+    histogram.add_argument(
+        "-t",
+        "--table",
+        choices=["scores", "questionnaire"],
+        default="questionnaire",
+        help="scores（成绩单）或 questionnaire（问卷）, 默认: questionnaire",
+    )
+    histogram.add_argument(
+        "-b", "--bin-size", type=int, default=10, help="分数段宽度, 默认: 10"
+    )
+
+    commands.add_parser("years", help="列出已导入的年份")
+    args = parser.parse_args()
+
+    conn = connect(args.db)
+    try:
+        if args.command == "ingest":
+            result = ingest_year(
+                conn, args.year, args.scores, args.questionnaire, args.force
+            )
+            for table, rows in result.items():
+                if rows is None:
+                    print(f"{args.year} {table}: 源文件没有变化，跳过")
+                else:
+                    print(f"{args.year} {table}: 已导入 {rows} 行")
+            return
+        if args.command == "years":
+            print(f"成绩单: {years(conn, 'scores')}")
+            print(f"问卷: {years(conn, 'questionnaire')}")
+            return
+
+        if args.command == "admit" and args.bands:
+            result = admit_bands(conn, args.year, args.level, args.bin_size)
+        elif args.command == "admit":
+            result = admit_summary(conn, args.year, args.level)
+        elif args.command == "adjustment":
+            result = adjustment_counts(conn, args.year, args.level)
+        elif args.command == "stats":
+            result = score_stats(conn, args.column, args.table, args.year, args.level)
+        else:
+            result = score_histogram(
+                conn, args.column, args.table, args.year, args.level, args.bin_size
+            )
+    except (sqlite3.Error, DatabaseError, ValueError) as e:
+        # 没有导入数据或列名不存在时 SQLite 报错
+        print(f"查询失败: {e}")
+        sys.exit(1)
+    finally:
+        conn.close()
+
+    if result.empty:
+        print("没有符合条件的数据，请先用 ingest 导入")
+    elif args.output:
+        save_by_group(result, args.output)
+    else:
+        print(result.to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
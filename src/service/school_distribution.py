@@ -1,75 +1,129 @@
-import pandas as pd
-import matplotlib.pyplot as plt
+"""
+生源院校分布
+用法：python src/service/school_distribution.py [--top N] [--page-size N] [--format png|svg] [-j 并行数]
+"""
+
+import argparse
 import os
 import sys
 from pathlib import Path
 
+import pandas as pd
+
 # 把项目根目录添加到系统路径
 project_dir = str(Path(__file__).resolve().parents[2])
 sys.path.append(project_dir)
-from src.utils.watermark_generator import add_watermark
+from src.utils.chart_renderer import render_charts
+from src.utils.data_cache import load_excel
 
-# 读取Excel文件
+# 问卷数据
 file_path = 'data/哈工计算机25考研复试信息表_纠正后_合并.xlsx'
-df = pd.read_excel(file_path)
-
-# 统计本科学校并按人数降序排序
-school_counts = df['本科学校（必填）'].value_counts().sort_values(ascending=False)
-
-# 反转排序结果（使人数最多的学校在顶部）
-school_counts = school_counts.iloc[::-1]
-
-
-# 设置中文字体
-plt.rcParams["font.sans-serif"] = ["SimHei"]
-plt.rcParams["axes.unicode_minus"] = False
-
-# 创建水平条形图，增加图形尺寸以容纳更多内容
-plt.figure(figsize=(12, 10), dpi=100)
-bars = school_counts.plot(kind='barh', color='orange')
-
-# 设置图表标题和坐标轴标签
-plt.title('生源院校分布', fontsize=18, pad=20)  # 增加标题与图表的间距
-plt.xlabel('人数', fontsize=16, labelpad=15)
-plt.ylabel('本科院校', fontsize=16, labelpad=15)
-
-# 调整y轴标签字体大小
-plt.yticks(fontsize=12)
 
-# 使用tick_params调整刻度标签与坐标轴的间距
-plt.tick_params(axis='y', pad=10)  # 增加y轴刻度标签的间距
-
-# 添加数值标签
-for i, v in enumerate(school_counts):
-    bars.text(v + 0.2, i, str(v), color='black', va='center', fontweight='bold')
-
-# 手动调整边距，增加左侧空间以容纳较长的学校名称
-plt.subplots_adjust(left=0.3, right=0.95, top=0.9, bottom=0.05)
-
-
-
-# 保存图片到本地，你可以修改保存路径和文件名
-output_folder = "output/本科学校"
-os.makedirs(output_folder, exist_ok=True)
-save_path = f"{output_folder}/本科学校分布.png"
-plt.savefig(save_path, bbox_inches='tight') 
-
-# 添加水印
-try:
-    add_watermark(
-        save_path,
-        save_path,
-        watermark_text="葵妈考研",
-        opacity=30,
-        scale=0.8,
-        angle=30,
-        color="gray",
-        compress=True,
-        quality=10,
+OTHER_LABEL = '其他'
+
+
+def top_schools(school_counts, top, other_label=OTHER_LABEL):
+    """
+    保留人数最多的 top 所学校，其余学校合并为一项
+    :param school_counts: 按人数降序的 Series
+    :return: 前 top 所学校加上合并项（放在最后）
+    """
+    kept = school_counts.nlargest(top, keep='first')
+    rest = school_counts.sum() - kept.sum()
+    if rest > 0:
+        kept = pd.concat([kept, pd.Series({other_label: rest})])
+    return kept
+
+
+def paginate(school_counts, page_size):
+    """按页切分，每页最多 page_size 所学校"""
+    if not page_size or len(school_counts) <= page_size:
+        return [school_counts]
+    return [
+        school_counts.iloc[start : start + page_size]
+        for start in range(0, len(school_counts), page_size)
+    ]
+
+
+def chart_spec(school_counts, save_path, title='生源院校分布'):
+    """生成水平条形图描述，图的高度随学校数增长"""
+    return {
+        'kind': 'barh',
+        'data': school_counts,
+        'color': 'orange',
+        'title': title,
+        'title_fontsize': 18,
+        'title_pad': 20,
+        'xlabel': '人数',
+        'ylabel': '本科院校',
+        'label_fontsize': 16,
+        'label_pad': 15,
+        'ytick_fontsize': 12,
+        'output_path': save_path,
+        'figsize': (12, max(10, 0.3 * len(school_counts) + 2)),
+        'dpi': 100,
+        # 增加左侧空间以容纳较长的学校名称
+        'subplots_adjust': {'left': 0.3, 'right': 0.95, 'top': 0.9, 'bottom': 0.05},
+        'watermark_text': '葵妈考研',
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='生源院校分布')
+    parser.add_argument(
+        '--top',
+        type=int,
+        default=None,
+        help='只显示人数最多的 N 所学校，其余合并为“其他”；0 或不指定时显示全部',
     )
-    print(f"图表已生成: {save_path}")
-except Exception as e:
-    print(f"添加水印失败: {e}")
-
-# 显示图表
-plt.show()
+    parser.add_argument(
+        '--page-size',
+        type=int,
+        default=None,
+        help='每张图最多显示的学校数，超出时分页；0 或不指定时不分页',
+    )
+    parser.add_argument(
+        '--format', choices=['png', 'svg'], default='png', help='输出格式, 默认: png'
+    )
+    parser.add_argument(
+        '-j', '--jobs', type=int, default=None, help='渲染进程数，默认为CPU核数'
+    )
+    args = parser.parse_args()
+    if args.top is not None and args.top < 0:
+        parser.error('--top 不能为负数')
+    if args.page_size is not None and args.page_size < 0:
+        parser.error('--page-size 不能为负数')
+
+    # 读取Excel文件
+    df = load_excel(file_path, "Sheet1")
+
+    # 统计本科学校并按人数降序排序
+    school_counts = df['本科学校（必填）'].value_counts().sort_values(ascending=False)
+    if args.top:
+        school_counts = top_schools(school_counts, args.top)
+
+    # 保存图片到本地，你可以修改保存路径和文件名
+    output_folder = "output/本科学校"
+    os.makedirs(output_folder, exist_ok=True)
+
+    pages = paginate(school_counts, args.page_size)
+    specs = []
+    for i, page in enumerate(pages, start=1):
+        if len(pages) == 1:
+            save_path = f"{output_folder}/本科学校分布.{args.format}"
+            title = '生源院校分布'
+        else:
+            save_path = f"{output_folder}/本科学校分布_第{i}页.{args.format}"
+            title = f'生源院校分布（第{i}/{len(pages)}页）'
+        specs.append(chart_spec(page, save_path, title))
+
+    # 渲染、添加水印并压缩，全程在内存中完成
+    for result in render_charts(specs, max_workers=args.jobs):
+        if result["error"] is None:
+            print(f"图表已生成: {result['output_path']}")
+        else:
+            print(f"生成图表失败: {result['output_path']}\n{result['error']}")
+
+
+if __name__ == '__main__':
+    main()
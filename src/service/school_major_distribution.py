@@ -1,28 +1,52 @@
+"""
+本科学校类别与跨考类别交叉统计
+"""
+
 import pandas as pd
 import os
+import sys
+from pathlib import Path
+
+# 把项目根目录添加到系统路径
+project_dir = str(Path(__file__).resolve().parents[2])
+sys.path.append(project_dir)
+from src.utils.dataset import load_questionnaire
+
+
+def main():
+    """按本科学校类别和跨考类别统计人数"""
+    # 读取文件（优先使用列式缓存）
+    df = load_questionnaire('data/哈工计算机25考研复试信息表_纠正后_合并.xlsx')
+    df['跨考类别（必填）'] = df['跨考类别（必填）'].apply(lambda x: x.split('：')[0])
 
-# 读取文件
-excel_file = pd.ExcelFile('data/哈工计算机25考研复试信息表_纠正后_合并.xlsx')
+    # 按本科学校类别（必填）和跨考类别（必填）列进行分组，统计每组的人数
+    grouped_data = (
+        df.groupby(['本科学校类别（必填）', '跨考类别（必填）'], observed=True)[
+            '本科学校类别（必填）'
+        ]
+        .count()
+        .reset_index(name='人数')
+    )
 
-# 获取指定工作表中的数据
-df = excel_file.parse('Sheet1')
-df['跨考类别（必填）'] = df['跨考类别（必填）'].apply(lambda x: x.split('：')[0])
+    # 定义本科学校类别的顺序
+    category_order = ['C9', '985（非C9）', '211', '一本', '二本']
 
-# 按本科学校类别（必填）和跨考类别（必填）列进行分组，统计每组的人数
-grouped_data = df.groupby(['本科学校类别（必填）', '跨考类别（必填）'])[
-    '本科学校类别（必填）'].count().reset_index(name='人数')
+    # # 使用Categorical类型对本科学校类别（必填）列进行排序
+    grouped_data['本科学校类别（必填）'] = pd.Categorical(
+        grouped_data['本科学校类别（必填）'], categories=category_order, ordered=True
+    )
 
-# 定义本科学校类别的顺序
-category_order = ['C9', '985（非C9）', '211', '一本', '二本']
+    # # 按照本科学校类别（必填）列进行排序
+    grouped_data = grouped_data.sort_values('本科学校类别（必填）').reset_index(
+        drop=True
+    )
 
-# # 使用Categorical类型对本科学校类别（必填）列进行排序
-grouped_data['本科学校类别（必填）'] = pd.Categorical(grouped_data['本科学校类别（必填）'], categories=category_order, ordered=True)
+    # 将结果保存为 Excel 文件
+    output_folder = f"output/学校和跨考分析"
+    os.makedirs(output_folder, exist_ok=True)
+    save_path = f"{output_folder}/学校和跨考分析.xlsx"
+    grouped_data.to_excel(save_path, index=False)
 
-# # 按照本科学校类别（必填）列进行排序
-grouped_data = grouped_data.sort_values('本科学校类别（必填）').reset_index(drop=True)
 
-# 将结果保存为 Excel 文件
-output_folder = f"output/学校和跨考分析"
-os.makedirs(output_folder, exist_ok=True)
-save_path = f"{output_folder}/学校和跨考分析.xlsx"
-grouped_data.to_excel(save_path, index=False)
\ No newline at end of file
+if __name__ == '__main__':
+    main()
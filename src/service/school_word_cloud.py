@@ -1,31 +1,47 @@
-import pandas as pd
-from wordcloud import WordCloud
-import matplotlib.pyplot as plt
-import numpy as np
+"""
+心形词云
+用法：python src/service/school_word_cloud.py [-c 列名 ...] [--size 心形大小] [--watermark 文字]
+分类列（如 本科学校）直接按取值计数，自由文本列（如 对26考生的备考建议）先中文分词再计数
+自由文本列的分词需要 jieba（pip install jieba），未安装时按标点和空白粗略切分并给出警告
+图片只保存到 output 目录，不弹出窗口
+"""
+
+import argparse
 import os
+import re
 import sys
+from functools import lru_cache
 from pathlib import Path
 
+import numpy as np
+import pandas as pd
+
 # 把项目根目录添加到系统路径
 project_dir = str(Path(__file__).resolve().parents[2])
 sys.path.append(project_dir)
-from src.utils.watermark_generator import add_watermark
+from src.utils.data_cache import load_excel
+from src.utils.watermark_generator import FONT_PATHS, add_watermark
+
+file_path = "data/哈工计算机25考研复试信息表_纠正后_合并.xlsx"
 
-# 读取 Excel 文件
-excel_file = pd.ExcelFile("data/哈工计算机25考研复试信息表_纠正后_合并.xlsx")
-df = excel_file.parse("Sheet1")
+# 默认统计列
+DEFAULT_COLUMNS = ["本科学校（必填）"]
 
-# 设置中文字体
-plt.rcParams["font.sans-serif"] = ["SimHei"]
-plt.rcParams["axes.unicode_minus"] = False
+# 需要分词的自由文本列
+FREE_TEXT_COLUMNS = {"对26考生的备考建议"}
 
-# 提取“对26考生的备考建议”列的数据
-# statistic = "对26考生的备考建议"
-statistic = "本科学校（必填）"
-text = " ".join([str(x) for x in df[statistic] if pd.notna(x)])
+# 心形 mask 缓存目录，按大小保存为 .npy
+MASK_DIR = "data/.cache/masks"
 
-# 设置字体路径
-font_path = "C:/Windows/Fonts/simhei.ttf"
+# 分词后丢弃的常见虚词
+STOPWORDS = {
+    "的", "了", "和", "是", "就", "都", "而", "及", "与", "着", "或", "一个",
+    "没有", "我们", "你们", "他们", "自己", "这个", "那个", "可以", "就是",
+    "不要", "一定", "还是", "如果", "因为", "所以", "但是", "然后", "这样",
+}  # fmt: skip
+
+# 无分词器时按标点和空白切分
+_SEPARATORS = re.compile(r"[\s，。！？、；：,.!?;:“”\"'（）()【】\[\]《》<>…~～-]+")
 
 
 # ----------------------------
@@ -48,54 +64,151 @@ def generate_heart_mask(size=500):
     return mask
 
 
-# 生成大小为 1000x1000 的心形 mask
-heart_mask = generate_heart_mask(size=1000)
+@lru_cache(maxsize=4)
+def heart_mask(size=1000, cache_dir=MASK_DIR):
+    """读取缓存的心形 mask，不存在时生成并保存为 .npy"""
+    path = os.path.join(cache_dir, f"heart_{size}.npy")
+    try:
+        return np.load(path)
+    except (OSError, ValueError):
+        pass
+    mask = np.ascontiguousarray(generate_heart_mask(size=size))
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        np.save(path, mask)
+    except OSError as e:
+        print(f"警告: 无法写入 mask 缓存 {path} - {e}")
+    return mask
 
-# ----------------------------
-# ✅ 创建词云
-# ----------------------------
-wordcloud = WordCloud(
-    font_path=font_path,
-    colormap="magma",
-    background_color="white",
-    mask=heart_mask,
-    width=1600,
-    height=1200,
-    contour_width=1,
-    contour_color="firebrick",
-    max_words=500,
-    min_font_size=8,
-    max_font_size=100,
-    random_state=42,
-).generate(text)
-
-# 显示词云
-plt.figure(figsize=(10, 10))
-plt.imshow(wordcloud, interpolation="bilinear")
-plt.axis("off")
-
-# 保存图片
-output_folder = f"output/{statistic}心形词云"
-os.makedirs(output_folder, exist_ok=True)
-save_path = f"{output_folder}/{statistic}心形词云.png"
-plt.savefig(save_path, bbox_inches="tight", dpi=300)
-
-# 添加水印
-try:
-    add_watermark(
-        save_path,
-        save_path,
-        watermark_text="",
-        opacity=30,
-        scale=0.8,
-        angle=30,
-        color="gray",
-        compress=True,
-        quality=10,
-    )
+
+def find_font():
+    """返回第一个存在的中文字体，都不存在时使用 wordcloud 自带字体"""
+    for path in FONT_PATHS:
+        if os.path.exists(path):
+            return path
+    print("警告: 未找到中文字体，使用默认字体。可能无法正确显示中文。")
+    return None
+
+
+def tokenize(texts):
+    """
+    对自由文本分词，返回词语 Series
+    优先使用 jieba，未安装时退化为按标点和空白切分
+    """
+    joined = "\n".join(texts)
+    try:
+        import jieba
+    except ImportError:
+        print(
+            "警告: 未安装 jieba（pip install jieba），按标点和空白切分文本，词频会不准确"
+        )
+        return pd.Series(_SEPARATORS.split(joined), dtype=object)
+    return pd.Series(jieba.lcut(joined), dtype=object)
+
+
+def column_frequencies(series, free_text=False):
+    """
+    统计一列的词频
+    :param free_text: 为 True 时先分词，否则每个取值作为一个整体计数（学校名不会被拆开）
+    :return: {词: 次数}
+    """
+    values = series.dropna().astype(str).str.strip()
+    values = values[values != ""]
+    if free_text:
+        words = tokenize(values.tolist()).str.strip()
+        values = words[(words.str.len() > 1) & ~words.isin(STOPWORDS)]
+    return values.value_counts().to_dict()
+
+
+def render_word_cloud(frequencies, mask, save_path, font_path, watermark_text=""):
+    """按词频生成词云并保存，保存后关闭图表，多列时不会累积占用内存"""
+    import matplotlib.pyplot as plt
+    from wordcloud import WordCloud
+
+    # ----------------------------
+    # ✅ 创建词云
+    # ----------------------------
+    wordcloud = WordCloud(
+        font_path=font_path,
+        colormap="magma",
+        background_color="white",
+        mask=mask,
+        width=1600,
+        height=1200,
+        contour_width=1,
+        contour_color="firebrick",
+        max_words=500,
+        min_font_size=8,
+        max_font_size=100,
+        random_state=42,
+    ).generate_from_frequencies(frequencies)
+
+    # 显示词云
+    fig = plt.figure(figsize=(10, 10))
+    plt.imshow(wordcloud, interpolation="bilinear")
+    plt.axis("off")
+
+    # 保存图片
+    os.makedirs(os.path.dirname(save_path), exist_ok=True)
+    fig.savefig(save_path, bbox_inches="tight", dpi=300)
+    plt.close(fig)
+
+    # 添加水印
+    if watermark_text:
+        add_watermark(
+            save_path,
+            save_path,
+            watermark_text=watermark_text,
+            opacity=30,
+            scale=0.8,
+            angle=30,
+            color="gray",
+            compress=True,
+            quality=10,
+        )
     print(f"图表已生成: {save_path}")
-except Exception as e:
-    print(f"添加水印失败: {e}")
 
-# 展示图片
-plt.show()
+
+def main():
+    parser = argparse.ArgumentParser(description="心形词云")
+    parser.add_argument(
+        "-c",
+        "--column",
+        action="append",
+        help=f"生成词云的列，可重复, 默认: {DEFAULT_COLUMNS[0]}",
+    )
+    parser.add_argument(
+        "--size", type=int, default=1000, help="心形 mask 边长, 默认: 1000"
+    )
+    parser.add_argument("--watermark", default="", help="水印文字，默认不加水印")
+    args = parser.parse_args()
+
+    import matplotlib.pyplot as plt
+
+    # 设置中文字体
+    plt.rcParams["font.sans-serif"] = ["SimHei"]
+    plt.rcParams["axes.unicode_minus"] = False
+
+    # 读取 Excel 文件，所有列共用同一份数据、mask 和字体
+    df = load_excel(file_path, "Sheet1")
+    mask = heart_mask(args.size)
+    font_path = find_font()
+
+    for statistic in args.column or DEFAULT_COLUMNS:
+        if statistic not in df.columns:
+            print(f"警告: 数据中没有列 {statistic}")
+            continue
+        frequencies = column_frequencies(
+            df[statistic], free_text=statistic in FREE_TEXT_COLUMNS
+        )
+        if not frequencies:
+            print(f"警告: {statistic} 没有可用的文本")
+            continue
+
+        output_folder = f"output/{statistic}心形词云"
+        save_path = f"{output_folder}/{statistic}心形词云.png"
+        render_word_cloud(frequencies, mask, save_path, font_path, args.watermark)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,11 @@
+"""
+问卷成绩分布统计
+用法：python src/service/score_distribution.py [-c 列名[=显示名] ...] [-b 分数段宽度] [-m 专业代码 ...] [-j 并行数]
+"""
+
+import argparse
+import numpy as np
 import pandas as pd
-import matplotlib.pyplot as plt
 import sys
 from pathlib import Path
 import os
@@ -7,7 +13,11 @@ import os
 # 把项目根目录添加到系统路径
 project_dir = str(Path(__file__).resolve().parents[2])
 sys.path.append(project_dir)
-from src.utils.watermark_generator import add_watermark
+from src.utils.dataset import load_questionnaire
+from src.utils.major_slices import ALL_CAMPUSES, LEVEL_COLUMNS
+from src.utils.chart_renderer import render_charts
+from src.utils.excel_output import StreamingExcelWriter
+from src.utils.profiling import profiled
 
 # 专业映射
 major_mapping = {
@@ -37,124 +47,157 @@ major_mapping = {
     "902-085400-24": "威海计专",
 }
 
-statistic = "问卷66人机试"
-output_folder = f"output/{statistic}分布"
-os.makedirs(output_folder, exist_ok=True)
-# 读取文件
-input_file = "哈工计算机25考研复试信息表_纠正后_合并.xlsx"
-input_folder = "data"
-
-# 创建ExcelWriter对象，用于保存所有校区的统计数据
-excel_writer = pd.ExcelWriter(
-    os.path.join(output_folder, f"各校区{statistic}分布统计.xlsx"), engine="openpyxl"
-)
-
-excel_file = pd.ExcelFile(os.path.join(input_folder, input_file))
-# 获取指定工作表中的数据
-df = excel_file.parse("Sheet1")
-data = df
-data["完整专业代码"] = (
-    data["院系所码与名称"].str.split("-").str[0]
-    + "-"
-    + data["专业代码与名称"].str.split("-").str[0]
-    + "-"
-    + data["研究方向"].str.split("-").str[0]
-)
-data[statistic] = data["复试机试成绩（总分160）（必填）"]
-for major_code, major_name in major_mapping.items():
-    print(f"正在处理: {major_name}")
-
-    # 只生成所有校区的统计数据
-    if major_code != "所有校区":
-        continue
-
-    # 筛选专业数据
-    if major_code == "所有校区":
-        major_df = data.copy()
-    elif (
-        major_code == "013-计算学部"
-        or major_code == "903-哈尔滨工业大学（深圳）"
-        or major_code == "902-哈尔滨工业大学（威海）"
-    ):
-        major_df = data[data["院系所码与名称"] == major_code].copy()
-    else:
-        major_df = data[data["完整专业代码"] == major_code].copy()
-    if len(major_df) == 0:
-        print(f"警告: 专业 {major_name} 没有数据")
-        continue
-
-    print(f"处理 {major_name}，数据量: {len(major_df)}")
-
-    # 定义分数段
-    max_score = major_df[statistic].max() // 10 * 10 + 10
-    min_score = major_df[statistic].min() // 10 * 10
-    print(f"分数段范围: {min_score}~{max_score}")
-    bins = list(range(int(min_score), int(max_score) + 10, 10))
-    labels = [f"[{bins[i]},{bins[i + 1]})" for i in range(len(bins) - 1)]
-
-    # 对初试总分进行分组统计
-    major_df["分数段"] = pd.cut(
-        major_df[statistic], bins=bins, labels=labels, right=False
+
+# 默认统计列：{列名: 显示名}
+DEFAULT_COLUMNS = {"复试机试成绩（总分160）（必填）": "问卷66人机试"}
+
+
+@profiled()
+def score_histograms(data, column, bin_size=10):
+    """
+    一次 bincount 统计 [校区 × 完整专业代码 × 分数段] 的人数，再汇总出各级分组的分布
+    :param data: 含 院系所码与名称、完整专业代码 和 column 列的 DataFrame
+    :return: {分组代码: 以分数段为索引的人数 Series}，分数段只覆盖该分组有数据的范围
+    """
+    scores = pd.to_numeric(data[column], errors="coerce").to_numpy(dtype=float)
+    scored = ~np.isnan(scores)
+    if not scored.any():
+        return {}
+
+    # 分类编码，缺失值的编码 -1 移到 0
+    levels = [data[col].astype("category") for col in LEVEL_COLUMNS]
+    codes = [level.cat.codes.to_numpy(dtype=np.int64)[scored] + 1 for level in levels]
+    band = (scores[scored] // bin_size).astype(np.int64)
+    base = band.min()
+    n_bands = band.max() - base + 1
+
+    shape = [len(level.cat.categories) + 1 for level in levels] + [n_bands]
+    flat = np.ravel_multi_index((*codes, band - base), shape)
+    counts = np.bincount(flat, minlength=np.prod(shape)).reshape(shape)
+
+    # 所有校区、各校区、各专业分别在对应维度上求和
+    grouped = {ALL_CAMPUSES: counts.sum(axis=(0, 1))}
+    for axis, level in enumerate(levels):
+        per_level = counts.sum(axis=1 - axis)
+        for i, code in enumerate(level.cat.categories, start=1):
+            grouped[code] = per_level[i]
+
+    histograms = {}
+    for code, per_band in grouped.items():
+        present = np.flatnonzero(per_band)
+        if len(present) == 0:
+            continue
+        low, high = present[0], present[-1] + 1
+        labels = [
+            f"[{(base + i) * bin_size},{(base + i + 1) * bin_size})"
+            for i in range(low, high)
+        ]
+        histograms[code] = pd.Series(
+            per_band[low:high], index=pd.Index(labels, name="分数段"), name="人数"
+        )
+    return histograms
+
+
+def process_statistics(
+    excel_path, columns, major_mapping, bin_size=10, max_workers=None, csv=False
+):
+    """
+    统计多个成绩列在各专业的分布，每个统计项写一个 Excel（每个专业一个 sheet），图表统一渲染
+    :param columns: {列名: 显示名}
+    :param csv: 同时把每个 sheet 输出为 CSV（输出目录下的 csv 文件夹）
+    """
+    # 获取指定工作表中的数据（已派生完整专业代码）
+    data = load_questionnaire(excel_path)
+
+    specs = []
+    for column, statistic in columns.items():
+        if column not in data.columns:
+            print(f"警告: 数据中没有列 {column}")
+            continue
+        output_folder = f"output/{statistic}分布"
+        os.makedirs(output_folder, exist_ok=True)
+        excel_path_out = os.path.join(output_folder, f"各校区{statistic}分布统计.xlsx")
+        csv_dir = os.path.join(output_folder, "csv") if csv else None
+
+        histograms = score_histograms(data, column, bin_size)
+        with StreamingExcelWriter(excel_path_out, csv_dir=csv_dir) as excel_writer:
+            for major_code, major_name in major_mapping.items():
+                if major_code not in histograms:
+                    print(f"警告: 专业 {major_name} 没有{statistic}数据")
+                    continue
+                score_distribution = histograms[major_code]
+
+                # 将统计结果保存到Excel的不同sheet中（名称超过31个字符时自动截断）
+                excel_writer.write_frame(score_distribution.reset_index(), major_name)
+
+                # 记录矩形图描述，统一渲染
+                file_path = f"{major_name}{statistic}分布矩形图.png"
+                specs.append(
+                    {
+                        "kind": "bar",
+                        "data": score_distribution,
+                        "title": f"{major_name}{statistic}分布矩形图",
+                        "xlabel": f"{statistic}分数段",
+                        "ylabel": "人数",
+                        "output_path": os.path.join(output_folder, file_path),
+                        "figsize": (10, 6),
+                        "watermark_text": "葵妈考研",
+                    }
+                )
+        print(f"{statistic}统计数据已保存至: {excel_path_out}")
+
+    # 并行渲染图表
+    for result in render_charts(specs, max_workers=max_workers):
+        if result["error"] is None:
+            print(f"已生成: {result['output_path']}")
+        else:
+            print(f"生成图表失败: {result['output_path']}\n{result['error']}")
+
+
+def parse_column(text):
+    """解析 列名=显示名，没有显示名时用列名"""
+    column, _, statistic = text.partition("=")
+    return column, statistic or column
+
+
+def main():
+    parser = argparse.ArgumentParser(description="问卷成绩分布统计")
+    parser.add_argument(
+        "-i",
+        "--input",
+        default="data/哈工计算机25考研复试信息表_纠正后_合并.xlsx",
+        help="问卷数据 xlsx",
+    )
+    parser.add_argument(
+        "-c",
+        "--column",
+        action="append",
+        type=parse_column,
+        help="统计的成绩列，格式 列名[=显示名]，可重复, 默认: 复试机试成绩（总分160）（必填）=问卷66人机试",
+    )
+    parser.add_argument(
+        "-b", "--bin-size", type=int, default=10, help="分数段宽度, 默认: 10"
     )
-    score_distribution = (
-        major_df["分数段"].value_counts().reindex(labels).reset_index(name="人数")
+    parser.add_argument(
+        "-m",
+        "--major",
+        action="append",
+        help="只输出这些专业（专业代码），可重复，默认全部",
+    )
+    parser.add_argument(
+        "-j", "--jobs", type=int, default=None, help="渲染进程数，默认为CPU核数"
+    )
+    parser.add_argument("--csv", action="store_true", help="同时输出每个 sheet 的 CSV")
+    args = parser.parse_args()
+
+    columns = dict(args.column) if args.column else DEFAULT_COLUMNS
+    mapping = major_mapping
+    if args.major:
+        mapping = {code: major_mapping.get(code, code) for code in args.major}
+    process_statistics(
+        args.input, columns, mapping, args.bin_size, args.jobs, csv=args.csv
     )
 
-    # 将统计结果保存到Excel的不同sheet中
-    sheet_name = (
-        major_name if len(major_name) <= 31 else major_name[:31]
-    )  # Excel sheet名不能超过31个字符
-    score_distribution.to_excel(excel_writer, sheet_name=sheet_name, index=False)
-
-    # 设置中文字体
-    plt.rcParams["font.sans-serif"] = ["SimHei"]
-
-    # 绘制矩形图
-    plt.figure(figsize=(10, 6))  # 设置图表大小
-    width = 0.8  # 矩形宽度
-    plt.xticks(rotation=30)
-    bars = plt.bar(score_distribution["分数段"], score_distribution["人数"], width)
-    plt.xlabel(f"{statistic}分数段")
-    plt.ylabel("人数")
-    plt.title(f"{major_name}{statistic}分布矩形图")
-
-    # 在柱子上方添加数值
-    for bar in bars:
-        height = bar.get_height()
-        plt.text(
-            bar.get_x() + bar.get_width() / 2.0,
-            height,
-            f"{height}",
-            ha="center",
-            va="bottom",
-            fontsize=10,
-        )
 
-    # 保存图片
-    file_path = f"{major_name}{statistic}分布矩形图.png"
-    file_path = os.path.join(output_folder, file_path)
-    plt.savefig(file_path, dpi=300, bbox_inches="tight")  # 提高图片清晰度
-    plt.close()
-
-    # 添加水印
-    try:
-        add_watermark(
-            file_path,
-            file_path,
-            watermark_text="葵妈考研",
-            compress=True,
-            quality=10,
-        )
-    except Exception as e:
-        print(f"添加水印失败: {e}")
-
-    print(f"已生成: {file_path}")
-    print(f"{statistic}分布表：")
-    print(score_distribution)
-    print("-" * 50)  # 分隔线
-
-# 保存Excel文件
-excel_writer.close()
-print(
-    f"\n所有校区统计数据已保存至: {os.path.join(output_folder, f'各校区{statistic}分布统计.xlsx')}"
-)
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+成绩排名查询
+用法：
+    python src/service/score_rank.py 350 365 --major 013-085400-11 --subject 初试总分
+    python src/service/score_rank.py --input 考生.xlsx --output 排名.xlsx
+批量查询的输入表需包含 专业 和 分数 两列
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+import pandas as pd
+
+# 把项目根目录添加到系统路径
+project_dir = str(Path(__file__).resolve().parents[2])
+sys.path.append(project_dir)
+from src.utils.major_slices import ALL_CAMPUSES
+from src.utils.rank_index import (
+    SUBJECTS,
+    WINDOW,
+    load_rank_index,
+    rank,
+    rank_candidates,
+)
+
+file_path = "data/总复试成绩单.xlsx"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="成绩排名查询")
+    parser.add_argument("scores", nargs="*", type=float, help="要查询的分数")
+    parser.add_argument(
+        "-m",
+        "--major",
+        default=ALL_CAMPUSES,
+        help=f"完整专业代码或院系所码与名称, 默认: {ALL_CAMPUSES}",
+    )
+    parser.add_argument(
+        "-s",
+        "--subject",
+        default="初试总分",
+        choices=list(SUBJECTS),
+        help="科目, 默认: 初试总分",
+    )
+    parser.add_argument(
+        "-w",
+        "--window",
+        type=float,
+        default=WINDOW,
+        help=f"录取概率的分数窗口, 默认: ±{WINDOW}",
+    )
+    parser.add_argument("-i", "--input", help="批量查询的考生表（xlsx 或 csv）")
+    parser.add_argument("-o", "--output", help="批量查询结果保存路径（xlsx）")
+    parser.add_argument("--rebuild", action="store_true", help="重新生成排名索引")
+    args = parser.parse_args()
+
+    if not args.scores and not args.input:
+        parser.error("请提供分数或 --input 考生表")
+
+    index = load_rank_index(file_path, rebuild=args.rebuild)
+    try:
+        if args.input:
+            if args.input.endswith(".csv"):
+                candidates = pd.read_csv(args.input, dtype={"专业": str})
+            else:
+                candidates = pd.read_excel(args.input, dtype={"专业": str})
+            candidates["专业"] = candidates["专业"].fillna(args.major)
+            result = rank_candidates(index, candidates, args.subject, args.window)
+        else:
+            result = rank(index, args.scores, args.subject, args.major, args.window)
+    except KeyError as e:
+        print(f"查询失败: {e.args[0]}")
+        sys.exit(1)
+
+    if args.output:
+        result.to_excel(args.output, index=False)
+        print(f"查询结果已保存: {args.output}")
+    else:
+        print(result.to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
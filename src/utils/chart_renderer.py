@@ -0,0 +1,301 @@
+"""
+图表渲染池
+功能：根据声明式的图表描述（数据、标题、坐标轴标签、输出路径）在进程池中并行渲染图表并添加水印，
+每个图表单独返回成功或失败
+"""
+
+import os
+import sys
+import traceback
+from concurrent.futures import Future, ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+
+# 把项目根目录添加到系统路径
+project_dir = str(Path(__file__).resolve().parents[2])
+sys.path.append(project_dir)
+from src.utils import profiling
+
+WATERMARK_OPTIONS = {
+    "opacity": 30,
+    "scale": 0.8,
+    "angle": 30,
+    "color": "gray",
+    "compress": True,
+    "quality": 10,
+}
+
+# 不能弹出窗口的后端，在这些后端下不调用 plt.show()
+NON_INTERACTIVE_BACKENDS = {"agg", "cairo", "pdf", "pgf", "ps", "svg", "template"}
+
+# 图表使用的中文字体，渲染时用 rc_context 临时生效，不修改调用方的全局设置
+CHART_RC = {"font.sans-serif": ["SimHei"], "axes.unicode_minus": False}
+
+
+def _init_worker():
+    """工作进程初始化：使用 Agg 后端"""
+    if project_dir not in sys.path:
+        sys.path.append(project_dir)
+
+    import matplotlib
+
+    matplotlib.use("Agg")
+
+
+def _draw_grouped_bar(ax, spec):
+    """分组柱状图，data 为 DataFrame，每列一组柱子"""
+    data = spec["data"]
+    colors = spec.get("colors", ["#1F77B4", "#FF7F0E", "#2CA02C", "#D62728"])
+    width = 0.8 / len(data.columns)
+    offset = (len(data.columns) - 1) / 2
+    x = np.arange(len(data.index))
+
+    for i, col in enumerate(data.columns):
+        values = data[col]
+        ax.bar(x + (i - offset) * width, values, width, label=col, color=colors[i])
+        for j, val in enumerate(values):
+            if val > 0:
+                ax.text(
+                    x[j] + (i - offset) * width,
+                    val,
+                    str(int(val)),
+                    ha="center",
+                    va="bottom",
+                    fontsize=9,
+                )
+
+    ax.set_xticks(x)
+    ax.set_xticklabels(data.index, rotation=30, ha="center")
+    ax.legend()
+
+
+def _draw_bar(ax, spec):
+    """单组柱状图，data 为 Series，索引为横坐标"""
+    data = spec["data"]
+    bars = ax.bar(data.index.astype(str), data.values, spec.get("width", 0.8))
+    ax.tick_params(axis="x", labelrotation=30)
+
+    # 在柱子上方添加数值
+    for bar in bars:
+        height = bar.get_height()
+        ax.text(
+            bar.get_x() + bar.get_width() / 2.0,
+            height,
+            f"{height}",
+            ha="center",
+            va="bottom",
+            fontsize=10,
+        )
+
+
+def _draw_donut(ax, spec):
+    """甜甜圈饼图，data 为按人数降序的 Series，突出最大一块，用图例代替标签"""
+    import matplotlib
+
+    data = spec["data"]
+    total = data.sum()
+
+    # 自定义格式化函数，用于显示人数和百分比
+    def autopct(pct):
+        val = int(round(pct * total / 100.0))
+        return f"{val} ({pct:.1f}%)"
+
+    explode = [0.05 if val == data.max() else 0 for val in data]
+    wedges, _, _ = ax.pie(
+        data,
+        labels=None,
+        autopct=autopct,
+        pctdistance=0.75,
+        textprops=dict(color="black", fontsize=10, weight="bold"),
+        startangle=90,
+        explode=explode,
+        colors=matplotlib.colormaps["Paired"].colors,
+        wedgeprops=dict(width=0.4),
+    )
+    ax.legend(
+        wedges,
+        data.index,
+        title=spec.get("legend_title"),
+        loc="center left",
+        bbox_to_anchor=(1, 0, 0.5, 1),
+        prop={"size": 12},
+    )
+    # 保证饼图为圆形
+    ax.axis("equal")
+
+
+def _draw_barh(ax, spec):
+    """水平条形图，data 为 Series，第一项画在最上方，数值标在条形右侧"""
+    data = spec["data"].iloc[::-1]
+    bars = ax.barh(data.index.astype(str), data.values, color=spec.get("color"))
+
+    # 一次性添加所有数值标签
+    ax.bar_label(bars, padding=2, color="black", fontweight="bold")
+    ax.tick_params(axis="y", labelsize=spec.get("ytick_fontsize"), pad=10)
+    ax.set_ylim(-0.6, len(data) - 0.4)
+
+
+def _svg_watermark(fig, watermark_text, options):
+    """矢量图的水印：居中旋转的半透明文字，透明度等参数与位图水印一致"""
+    fig.text(
+        0.5,
+        0.5,
+        watermark_text,
+        fontsize=48 * options["scale"],
+        color=options["color"],
+        alpha=options["opacity"] / 100,
+        rotation=options["angle"],
+        ha="center",
+        va="center",
+    )
+
+
+RENDERERS = {
+    "grouped_bar": _draw_grouped_bar,
+    "bar": _draw_bar,
+    "donut": _draw_donut,
+    "barh": _draw_barh,
+}
+
+
+def render_chart(spec):
+    """
+    渲染单个图表
+    :param spec: 图表描述字典，包含 kind, data, output_path，
+                 可选 title, title_fontsize, title_pad, xlabel, ylabel, label_fontsize,
+                 label_pad, subplots_adjust, figsize, dpi,
+                 watermark_text, watermark_options；output_path 以 .svg 结尾时输出矢量图
+    :return: {"output_path": 输出路径, "error": 出错信息或 None, "profile": 阶段记录}
+    """
+    output_path = spec["output_path"]
+    # 渲染进程中的阶段记录随结果返回，由 render_charts 合并到主进程
+    with profiling.capture() as captured:
+        try:
+            with profiling.stage("render_chart", chart=os.path.basename(output_path)):
+                _render(spec, output_path)
+        except Exception:
+            return {
+                "output_path": output_path,
+                "error": traceback.format_exc(),
+                "profile": captured,
+            }
+    return {"output_path": output_path, "error": None, "profile": captured}
+
+
+def _render(spec, output_path):
+    """
+    绘制并保存图表，有水印文字时在内存中加水印和压缩
+    直接创建 Agg 画布上的 Figure，不经过 pyplot，串行渲染时不会切换调用方的后端
+    """
+    import matplotlib
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+
+    from src.utils.watermark_generator import watermark_figure
+
+    # 调用方只给出部分水印参数时，其余使用默认值
+    watermark_options = {**WATERMARK_OPTIONS, **spec.get("watermark_options", {})}
+    with matplotlib.rc_context(CHART_RC):
+        fig = Figure(figsize=spec.get("figsize", (12, 6)))
+        FigureCanvasAgg(fig)
+        ax = fig.subplots()
+        with profiling.stage("draw", kind=spec["kind"]):
+            RENDERERS[spec["kind"]](ax, spec)
+            if "xlabel" in spec:
+                ax.set_xlabel(
+                    spec["xlabel"],
+                    fontsize=spec.get("label_fontsize"),
+                    labelpad=spec.get("label_pad"),
+                )
+            if "ylabel" in spec:
+                ax.set_ylabel(
+                    spec["ylabel"],
+                    fontsize=spec.get("label_fontsize"),
+                    labelpad=spec.get("label_pad"),
+                )
+            if "title" in spec:
+                ax.set_title(
+                    spec["title"],
+                    fontsize=spec.get("title_fontsize"),
+                    pad=spec.get("title_pad"),
+                )
+            # 给出边距时按边距排版，否则自动排版
+            if "subplots_adjust" in spec:
+                fig.subplots_adjust(**spec["subplots_adjust"])
+            else:
+                fig.tight_layout()
+        os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+
+        dpi = spec.get("dpi", 300)
+        watermark_text = spec.get("watermark_text")
+        if output_path.lower().endswith(".svg"):
+            # 矢量输出：水印作为半透明文字写入图中，不经过位图处理
+            if watermark_text:
+                _svg_watermark(fig, watermark_text, watermark_options)
+            with profiling.stage("savefig", format="svg"):
+                fig.savefig(output_path, format="svg", bbox_inches="tight")
+        elif watermark_text is None:
+            with profiling.stage("savefig", dpi=dpi):
+                fig.savefig(output_path, bbox_inches="tight", dpi=dpi)
+        else:
+            # 渲染、加水印、压缩都在内存中完成，只写一次文件
+            watermark_figure(
+                fig,
+                output_path,
+                watermark_text,
+                dpi=dpi,
+                **watermark_options,
+            )
+
+
+def show_figures():
+    """显示当前图表；Agg 等非交互后端（批处理、服务器）下直接跳过，避免阻塞或告警"""
+    import matplotlib
+
+    if matplotlib.get_backend().lower() in NON_INTERACTIVE_BACKENDS:
+        return
+    import matplotlib.pyplot as plt
+
+    plt.show()
+
+
+def render_charts(specs, max_workers=None):
+    """
+    并行渲染多个图表
+    :param specs: 图表描述列表
+    :param max_workers: 进程数，默认为 CPU 核数；为 1 时在当前进程中渲染
+    :return: 与 specs 顺序一致的结果列表
+    工作进程崩溃（如高 dpi 下内存不足）或描述无法序列化时，只把受影响的图表记为失败
+    """
+    specs = list(specs)
+    with profiling.stage("render_charts", charts=len(specs)):
+        if max_workers == 1 or len(specs) <= 1:
+            results = [render_chart(spec) for spec in specs]
+        else:
+            with ProcessPoolExecutor(
+                max_workers=max_workers, initializer=_init_worker
+            ) as executor:
+                futures = []
+                for spec in specs:
+                    try:
+                        future = executor.submit(render_chart, spec)
+                    except Exception as e:
+                        # 进程池已损坏时 submit 直接抛出
+                        future = Future()
+                        future.set_exception(e)
+                    futures.append(future)
+                results = []
+                for spec, future in zip(specs, futures):
+                    try:
+                        results.append(future.result())
+                    except Exception:
+                        results.append(
+                            {
+                                "output_path": spec.get("output_path"),
+                                "error": traceback.format_exc(),
+                            }
+                        )
+    for result in results:
+        profiling.extend(result.pop("profile", None))
+    return results
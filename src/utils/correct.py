@@ -1,50 +1,106 @@
 import pandas as pd
+import sys
+from pathlib import Path
 
-# 读取文件
-excel_file1 = pd.ExcelFile("data/总复试成绩单.xlsx")
-excel_file2 = pd.ExcelFile("data/哈工计算机25考研复试信息表_纠正后.xlsx")
-
-# 获取指定工作表中的数据
-df1 = excel_file1.parse("Sheet1")
-df2 = excel_file2.parse("Sheet1")
+# 把项目根目录添加到系统路径
+project_dir = str(Path(__file__).resolve().parents[2])
+sys.path.append(project_dir)
+from src.utils.data_cache import load_excel
 
 # 定义关联字段
 key_columns = ["政治", "外语", "业务课一", "业务课二", "初试总分"]
+questionnaire_key_columns = [
+    "初试政治成绩（必填）",
+    "初试英语成绩（必填）",
+    "初试数学成绩（必填）",
+    "初试专业课（408）成绩（必填）",
+    "初试总分（必填）",
+]
+
+# df1 列 -> df2 列 的成绩回填映射
+score_columns = {
+    "机试原始分": "复试机试成绩（总分160）（必填）",
+    "面试成绩": "复试面试成绩（总分150）（必填）",
+}
+
+
+def build_key_index(df, columns):
+    """
+    为复合关联字段建立一次性索引
+    :return: (每个关联键首次出现的行索引, 关联键重复的行)
+    """
+    keys = df[columns]
+    first = keys[~keys.duplicated(keep="first")]
+    key_index = pd.Series(first.index, index=pd.MultiIndex.from_frame(first))
+    duplicates = df[keys.duplicated(keep=False)]
+    return key_index, duplicates
+
+
+def assign_column(df, column, values):
+    """按索引整列回填数据，values 未覆盖的行保持原值"""
+    aligned = values.reindex(df.index)
+    if column in df.columns:
+        df[column] = aligned.where(df.index.isin(values.index), df[column])
+    else:
+        df[column] = aligned
+
+
+def merge_scores(df1, df2):
+    """
+    用 df1 的机试原始分、面试成绩和其余列更新 df2
+    关联键在 df2 中重复时取首次出现的行（与原逐行实现一致），
+    在 df1 中重复时取最后一行（与逐行写入一致），两种歧义匹配都会打印
+    :return: (更新后的 df2, df2 中歧义匹配的行, df1 中歧义匹配的行)
+    """
+    df2 = df2.copy()
+
+    # 确定 df1 中除了关联字段之外需要保留的列
+    cols_to_keep = [col for col in df1.columns if col not in key_columns]
+
+    # 只建一次 df2 的关联键索引
+    key_index, ambiguous = build_key_index(df2, questionnaire_key_columns)
 
-# 确定 df1 中除了关联字段之外需要保留的列
-cols_to_keep = [col for col in df1.columns if col not in key_columns]
-
-# 根据关联字段合并两个 DataFrame
-merged_df = pd.merge(
-    df1,
-    df2,
-    left_on=key_columns,
-    right_on=[
-        "初试政治成绩（必填）",
-        "初试英语成绩（必填）",
-        "初试数学成绩（必填）",
-        "初试专业课（408）成绩（必填）",
-        "初试总分（必填）",
-    ],
-    how="inner",
-)
-
-# 用 df1 的机试原始分和面试成绩更新 df2 的对应列
-for index, row in merged_df.iterrows():
-    df2_index = df2[
-        (df2["初试政治成绩（必填）"] == row["政治"])
-        & (df2["初试英语成绩（必填）"] == row["外语"])
-        & (df2["初试数学成绩（必填）"] == row["业务课一"])
-        & (df2["初试专业课（408）成绩（必填）"] == row["业务课二"])
-        & (df2["初试总分（必填）"] == row["初试总分"])
-    ].index[0]
-
-    df2.at[df2_index, "复试机试成绩（总分160）（必填）"] = row["机试原始分"]
-    df2.at[df2_index, "复试面试成绩（总分150）（必填）"] = row["面试成绩"]
-
-    # 将 df1 中其他需要保留的列数据添加到 df2 中
+    # 按关联键查找 df2 中的目标行，未匹配的 df1 行丢弃（等价于 inner merge）
+    lookup = pd.MultiIndex.from_frame(
+        df1[key_columns].set_axis(questionnaire_key_columns, axis=1)
+    )
+    positions = key_index.index.get_indexer(lookup)
+    matched = df1[positions >= 0]
+    target_index = key_index.to_numpy()[positions[positions >= 0]]
+
+    # 多个 df1 行命中同一 df2 行时，与逐行写入一致保留最后一行
+    source = matched.set_axis(target_index, axis=0)
+    source = source[~source.index.duplicated(keep="last")]
+    score_ambiguous = matched[matched[key_columns].duplicated(keep=False)]
+
+    if not ambiguous.empty:
+        print(f"警告: {len(ambiguous)} 行问卷数据的关联字段重复，仅更新每组中的第一行")
+        print(ambiguous[questionnaire_key_columns].to_string())
+    if not score_ambiguous.empty:
+        print(
+            f"警告: {len(score_ambiguous)} 行成绩单数据的关联字段重复，仅使用每组中的最后一行"
+        )
+        print(score_ambiguous[key_columns].to_string())
+
+    # 整列回填
+    for src_col, dst_col in score_columns.items():
+        assign_column(df2, dst_col, source[src_col])
     for col in cols_to_keep:
-        df2.at[df2_index, col] = row[col]
+        assign_column(df2, col, source[col])
+
+    return df2, ambiguous, score_ambiguous
+
+
+def main():
+    # 读取文件
+    df1 = load_excel("data/总复试成绩单.xlsx", "Sheet1")
+    df2 = load_excel("data/哈工计算机25考研复试信息表_纠正后.xlsx", "Sheet1")
+
+    merged, _, _ = merge_scores(df1, df2)
+
+    # 将结果保存为 Excel 文件
+    merged.to_excel("data/哈工计算机25考研复试信息表_纠正后_合并.xlsx", index=False)
+
 
-# 将结果保存为 Excel 文件
-df2.to_excel("data/哈工计算机25考研复试信息表_纠正后_合并.xlsx", index=False)
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,211 @@
+"""
+分析立方体
+功能：一次扫描问卷数据，对每个维度和每两个维度的组合预先计算各成绩的
+人数、最低分、最高分、平均分、中位数和标准差，保存为 pickle，
+之后任意切片直接查询，无需再读取 Excel
+"""
+
+import os
+import pickle
+import sys
+from itertools import combinations
+from pathlib import Path
+
+# 把项目根目录添加到系统路径
+project_dir = str(Path(__file__).resolve().parents[2])
+sys.path.append(project_dir)
+from src.utils.data_cache import file_hash
+from src.utils.dataset import (
+    QUESTIONNAIRE_CATEGORY_COLUMNS,
+    QUESTIONNAIRE_PATH,
+    load_questionnaire,
+)
+from src.utils.profiling import profiled
+
+CUBE_PATH = "data/.cache/questionnaire_cube.pkl"
+CUBE_VERSION = 2
+
+# 度量：问卷中的各项成绩
+MEASURES = [
+    "初试总分（必填）",
+    "复试机试成绩（总分160）（必填）",
+    "复试面试成绩（总分150）（必填）",
+]
+
+AGGREGATIONS = ["count", "min", "max", "mean", "median", "std"]
+
+# 派生维度：把原始选项合并为分组，{派生列名: (原始列名, {分组名: [原始选项]})}
+REGROUPS = {
+    "OI竞赛经历（必填）_分组": (
+        "OI竞赛经历（必填）",
+        {
+            "没参加过OI": ["没参加过OI"],
+            "参加过OI": [
+                "NOIP提高组二等奖以下",
+                "NOIP提高组二等奖",
+            ],
+        },
+    ),
+}
+
+
+# 选项中带说明的维度，只保留全角冒号前的类别名，与 school_major_distribution 一致
+LABEL_COLUMNS = ["跨考类别（必填）"]
+
+
+def normalize_labels(df, columns):
+    """去掉选项中全角冒号及之后的说明，只保留类别名"""
+    for col in columns:
+        if col in df.columns:
+            df[col] = (
+                df[col]
+                .astype(object)
+                .map(lambda x: x.split("：")[0] if isinstance(x, str) else x)
+            )
+    return df
+
+
+def apply_regroups(df, regroups):
+    """添加派生维度列，不在任何分组中的选项保持原值"""
+    for name, (source, groups) in regroups.items():
+        # 转为 object，才能写入新的分组名
+        df[name] = df[source].astype(object)
+        for group_name, values in groups.items():
+            df.loc[df[source].isin(values), name] = group_name
+    return df
+
+
+@profiled()
+def build_cube(df, dimensions, measures=MEASURES, regroups=REGROUPS):
+    """
+    计算立方体
+    :param df: 问卷数据
+    :param dimensions: 维度列名列表（派生维度写派生列名）
+    :param measures: 度量列名列表
+    :param regroups: 派生维度定义，见 REGROUPS
+    :return: {"dimensions", "measures", "cells": {维度元组: 聚合 DataFrame}}
+    """
+    df = normalize_labels(df.copy(), LABEL_COLUMNS)
+    df = apply_regroups(df, regroups)
+    dimensions = [dim for dim in dimensions if dim in df.columns]
+    measures = [col for col in measures if col in df.columns]
+
+    cells = {}
+    for size in (1, 2):
+        for dims in combinations(dimensions, size):
+            cells[dims] = (
+                df.groupby(list(dims), observed=True)[measures]
+                .agg(AGGREGATIONS)
+                .round(2)
+            )
+    return {"dimensions": dimensions, "measures": measures, "cells": cells}
+
+
+def _source_stat(excel_path):
+    stat = os.stat(excel_path)
+    return {"mtime": stat.st_mtime, "size": stat.st_size}
+
+
+def save_cube(cube, cube_path=CUBE_PATH):
+    os.makedirs(os.path.dirname(cube_path) or ".", exist_ok=True)
+    tmp_path = cube_path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        pickle.dump(cube, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_path, cube_path)
+
+
+def _read_cube(cube_path):
+    try:
+        with open(cube_path, "rb") as f:
+            cube = pickle.load(f)
+    except (OSError, pickle.UnpicklingError, EOFError):
+        return None
+    if not isinstance(cube, dict) or cube.get("version") != CUBE_VERSION:
+        return None
+    return cube
+
+
+def load_cube(
+    excel_path=QUESTIONNAIRE_PATH,
+    cube_path=CUBE_PATH,
+    dimensions=None,
+    rebuild=False,
+):
+    """
+    加载立方体，源文件或维度定义变化时重新计算
+    :param excel_path: 问卷 xlsx 路径
+    :param cube_path: 立方体 pickle 路径
+    :param dimensions: 维度列表，默认为所有问卷分类列和派生维度
+    :param rebuild: 强制重新计算
+    :return: 立方体字典
+    """
+    if dimensions is None:
+        dimensions = QUESTIONNAIRE_CATEGORY_COLUMNS + list(REGROUPS)
+    config = {
+        "dimensions": list(dimensions),
+        "measures": MEASURES,
+        "regroups": REGROUPS,
+        "label_columns": LABEL_COLUMNS,
+    }
+
+    cube = None if rebuild else _read_cube(cube_path)
+    if cube is not None and cube["config"] == config:
+        source = _source_stat(excel_path)
+        if cube["source"] == source:
+            return cube
+        # mtime 变了但内容没变，只刷新元数据
+        if cube["source"]["size"] == source["size"] and cube["sha256"] == file_hash(
+            excel_path
+        ):
+            cube["source"] = source
+            save_cube(cube, cube_path)
+            return cube
+
+    source = _source_stat(excel_path)
+    cube = build_cube(load_questionnaire(excel_path), dimensions)
+    cube.update(
+        {
+            "version": CUBE_VERSION,
+            "config": config,
+            "source": source,
+            "sha256": file_hash(excel_path),
+        }
+    )
+    try:
+        save_cube(cube, cube_path)
+    except OSError as e:
+        print(f"警告: 无法写入立方体 {cube_path} - {e}")
+    return cube
+
+
+def query(cube, dimensions, filters=None, measures=None, aggregations=None):
+    """
+    查询立方体的一个切片
+    :param cube: 立方体字典
+    :param dimensions: 一个或两个维度，顺序不限
+    :param filters: {维度: 取值}，只保留指定取值的行
+    :param measures: 只返回这些度量，默认全部
+    :param aggregations: 只返回这些统计量，默认全部
+    :return: 以维度为索引、(度量, 统计量) 为列的 DataFrame
+    """
+    if isinstance(dimensions, str):
+        dimensions = [dimensions]
+    order = {dim: i for i, dim in enumerate(cube["dimensions"])}
+    missing = [dim for dim in dimensions if dim not in order]
+    if missing:
+        raise KeyError(f"立方体中没有维度: {', '.join(missing)}")
+    key = tuple(sorted(dimensions, key=order.get))
+    if key not in cube["cells"]:
+        raise KeyError(f"立方体中没有维度组合: {' × '.join(dimensions)}")
+
+    result = cube["cells"][key]
+    if len(key) > 1:
+        # 按调用方给出的维度顺序排列索引
+        result = result.reorder_levels(list(dimensions)).sort_index()
+    for dim, value in (filters or {}).items():
+        result = result[result.index.get_level_values(dim) == value]
+
+    measures = measures or cube["measures"]
+    aggregations = aggregations or AGGREGATIONS
+    columns = [(col, agg) for col in measures for agg in aggregations]
+    return result.loc[:, columns]
@@ -0,0 +1,159 @@
+"""
+Excel 列式缓存
+功能：首次读取 xlsx 时把每一列保存为 .npy 文件，之后直接内存映射加载，
+源文件变化（mtime/大小变化且内容哈希不同）时自动重建
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# 把项目根目录添加到系统路径
+project_dir = str(Path(__file__).resolve().parents[2])
+sys.path.append(project_dir)
+from src.utils.profiling import stage
+
+CACHE_DIR = "data/.cache"
+CACHE_VERSION = 1
+
+
+def file_hash(path, chunk_size=1 << 20):
+    """计算文件内容的 sha256"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _cache_path(excel_path, sheet_name, cache_dir):
+    """缓存目录：文件名 + 绝对路径的短哈希 + sheet，不同目录下的同名工作簿互不覆盖"""
+    abs_path = os.path.abspath(excel_path)
+    stem = os.path.splitext(os.path.basename(abs_path))[0]
+    key = hashlib.sha256(abs_path.encode("utf-8")).hexdigest()[:8]
+    return os.path.join(cache_dir, f"{stem}-{key}-{sheet_name}")
+
+
+def _read_meta(cache_path):
+    try:
+        with open(os.path.join(cache_path, "meta.json"), encoding="utf-8") as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if meta.get("version") != CACHE_VERSION:
+        return None
+    return meta
+
+
+def _write_meta(cache_path, meta):
+    tmp_path = os.path.join(cache_path, "meta.json.tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(meta, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, os.path.join(cache_path, "meta.json"))
+
+
+def _save_column(cache_path, i, series):
+    """保存单列，返回列的存储方式"""
+    values = series.to_numpy()
+    if values.dtype.kind in "biufM":
+        np.save(os.path.join(cache_path, f"{i}.npy"), values)
+        return {"kind": "array", "dtype": str(series.dtype)}
+
+    # 字符串列存为定长 unicode 数组 + 缺失值掩码，保证可以内存映射
+    mask = series.isna().to_numpy()
+    present = values[~mask]
+    if all(isinstance(x, str) for x in present):
+        text = np.where(mask, "", values).astype(str)
+        np.save(os.path.join(cache_path, f"{i}.npy"), text)
+        np.save(os.path.join(cache_path, f"{i}.mask.npy"), mask)
+        return {"kind": "str", "dtype": str(series.dtype)}
+
+    # 混合类型的列只能 pickle，加载时不能内存映射
+    np.save(
+        os.path.join(cache_path, f"{i}.npy"),
+        values.astype(object),
+        allow_pickle=True,
+    )
+    return {"kind": "object"}
+
+
+def _load_column(cache_path, i, spec):
+    path = os.path.join(cache_path, f"{i}.npy")
+    if spec["kind"] == "array":
+        return pd.Series(np.load(path, mmap_mode="r"), dtype=spec["dtype"])
+    if spec["kind"] == "str":
+        text = pd.Series(np.load(path, mmap_mode="r"), dtype=object)
+        mask = np.load(os.path.join(cache_path, f"{i}.mask.npy"))
+        text = text.mask(mask)
+        return text if spec["dtype"] == "object" else text.astype(spec["dtype"])
+    return pd.Series(np.load(path, allow_pickle=True))
+
+
+def _build_cache(df, cache_path, meta):
+    # 先写到临时目录再替换，避免中途失败留下半个缓存
+    tmp_path = cache_path + ".tmp"
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    os.makedirs(tmp_path)
+    meta["columns"] = [str(col) for col in df.columns]
+    meta["specs"] = [
+        _save_column(tmp_path, i, df[col]) for i, col in enumerate(df.columns)
+    ]
+    _write_meta(tmp_path, meta)
+    shutil.rmtree(cache_path, ignore_errors=True)
+    os.replace(tmp_path, cache_path)
+
+
+def load_excel(excel_path, sheet_name=0, cache_dir=CACHE_DIR):
+    """
+    读取 Excel 工作表，优先使用列式缓存
+    :param excel_path: xlsx 文件路径
+    :param sheet_name: 工作表名称或序号
+    :param cache_dir: 缓存目录
+    :return: DataFrame
+    """
+    cache_path = _cache_path(excel_path, sheet_name, cache_dir)
+    stat = os.stat(excel_path)
+    meta = _read_meta(cache_path)
+
+    if meta is not None and (meta["mtime"], meta["size"]) != (
+        stat.st_mtime,
+        stat.st_size,
+    ):
+        # mtime 变了但内容没变（如重新拷贝），只刷新元数据
+        if meta["size"] == stat.st_size and meta["sha256"] == file_hash(excel_path):
+            meta["mtime"] = stat.st_mtime
+            _write_meta(cache_path, meta)
+        else:
+            meta = None
+
+    if meta is None:
+        meta = {
+            "version": CACHE_VERSION,
+            "source": os.path.abspath(excel_path),
+            "sheet_name": sheet_name,
+            "mtime": stat.st_mtime,
+            "size": stat.st_size,
+            "sha256": file_hash(excel_path),
+        }
+        with stage("read_excel", file=os.path.basename(excel_path)):
+            df = pd.read_excel(excel_path, sheet_name=sheet_name)
+        try:
+            with stage("build_cache", file=os.path.basename(excel_path)):
+                _build_cache(df, cache_path, meta)
+        except OSError as e:
+            print(f"警告: 无法写入缓存 {cache_path} - {e}")
+        return df
+
+    with stage("load_cache", file=os.path.basename(excel_path)):
+        return pd.DataFrame(
+            {
+                col: _load_column(cache_path, i, spec)
+                for i, (col, spec) in enumerate(zip(meta["columns"], meta["specs"]))
+            }
+        )
@@ -0,0 +1,97 @@
+"""
+数据集加载
+功能：统一读取总复试成绩单和问卷数据，派生一次完整专业代码，并把分类列存为 Categorical
+"""
+
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# 把项目根目录添加到系统路径
+project_dir = str(Path(__file__).resolve().parents[2])
+sys.path.append(project_dir)
+from src.utils.data_cache import load_excel
+
+SCORES_PATH = "data/总复试成绩单.xlsx"
+QUESTIONNAIRE_PATH = "data/哈工计算机25考研复试信息表_纠正后_合并.xlsx"
+
+# 组成完整专业代码的列，取每列 "-" 之前的代码部分
+MAJOR_CODE_PARTS = ["院系所码与名称", "专业代码与名称", "研究方向"]
+
+# 成绩单中的分类列
+SCORE_CATEGORY_COLUMNS = [
+    "院系所码与名称",
+    "专业代码与名称",
+    "录取状态",
+    "一志愿录取",
+    "复试及格",
+]
+
+# 问卷中的分类列
+QUESTIONNAIRE_CATEGORY_COLUMNS = [
+    "本科学校类别（必填）",
+    "跨考类别（必填）",
+    "是否二战及以上（必填）",
+    "项目经历（必填）",
+    "论文发表情况（必填）",
+    "数学建模获奖情况（必填）",
+    "ICPC竞赛经历（必填）",
+    "OI竞赛经历（必填）",
+    "开始复习月份（必填）",
+    "备考状态（必填）",
+]
+
+
+def add_major_code(df):
+    """
+    派生 完整专业代码（如 013-085400-11）
+    只对三列的不同取值组合拼接字符串，再按组合编号回填到每一行
+    """
+    parts = [df[col].astype("category") for col in MAJOR_CODE_PARTS]
+    codes = np.stack([part.cat.codes.to_numpy() for part in parts])
+    combos, inverse = np.unique(codes, axis=1, return_inverse=True)
+
+    labels = []
+    for combo in combos.T:
+        if (combo < 0).any():
+            # 任一部分缺失时结果为缺失值
+            labels.append(np.nan)
+        else:
+            labels.append(
+                "-".join(
+                    part.cat.categories[i].split("-")[0]
+                    for part, i in zip(parts, combo)
+                )
+            )
+
+    df["完整专业代码"] = pd.Categorical(
+        np.asarray(labels, dtype=object)[inverse.ravel()]
+    )
+    return df
+
+
+def to_categorical(df, columns):
+    """把存在的列转换为 Categorical"""
+    for col in columns:
+        if col in df.columns:
+            df[col] = df[col].astype("category")
+    return df
+
+
+def load_scores(excel_path=SCORES_PATH):
+    """加载总复试成绩单"""
+    df = load_excel(excel_path, "Sheet1")
+    add_major_code(df)
+    return to_categorical(df, SCORE_CATEGORY_COLUMNS)
+
+
+def load_questionnaire(excel_path=QUESTIONNAIRE_PATH):
+    """加载合并后的问卷数据"""
+    df = load_excel(excel_path, "Sheet1")
+    if all(col in df.columns for col in MAJOR_CODE_PARTS):
+        add_major_code(df)
+    return to_categorical(
+        df, SCORE_CATEGORY_COLUMNS + QUESTIONNAIRE_CATEGORY_COLUMNS
+    )
@@ -0,0 +1,156 @@
+"""
+流式 Excel 输出
+功能：用 openpyxl 的 write_only 模式逐行写入多个 sheet，不在内存中保留整个工作簿；
+统一处理 sheet 名称（31 个字符限制、非法字符、重名），百分比列写为数值并设置单元格格式，
+可选同时为每个 sheet 输出 CSV
+"""
+
+import os
+import re
+import sys
+from pathlib import Path
+
+import numpy as np
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Alignment, Border, Font, Side
+
+# 把项目根目录添加到系统路径
+project_dir = str(Path(__file__).resolve().parents[2])
+sys.path.append(project_dir)
+from src.utils.profiling import stage
+
+# Excel sheet名不能超过31个字符
+SHEET_NAME_LIMIT = 31
+INVALID_SHEET_CHARS = re.compile(r"[\[\]:*?/\\]")
+
+PERCENT_FORMAT = "0.00%"
+
+# 与 pandas.to_excel 一致的表头样式
+_THIN = Side(style="thin")
+HEADER_FONT = Font(bold=True)
+HEADER_BORDER = Border(left=_THIN, right=_THIN, top=_THIN, bottom=_THIN)
+HEADER_ALIGNMENT = Alignment(horizontal="center", vertical="top")
+
+
+def sheet_title(name, used=()):
+    """
+    生成合法且不重名的 sheet 名称
+    :param name: 原始名称
+    :param used: 已使用的名称
+    """
+    title = INVALID_SHEET_CHARS.sub("_", str(name))[:SHEET_NAME_LIMIT] or "Sheet"
+    candidate, n = title, 1
+    while candidate in used:
+        n += 1
+        suffix = f"_{n}"
+        candidate = title[: SHEET_NAME_LIMIT - len(suffix)] + suffix
+    return candidate
+
+
+def _value(value):
+    """缺失值写为空单元格"""
+    if value is None or (isinstance(value, float) and np.isnan(value)):
+        return None
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+
+class StreamingExcelWriter:
+    """
+    逐行写入的 Excel 写入器，用法与 pd.ExcelWriter 类似：
+
+        with StreamingExcelWriter(path) as writer:
+            writer.write_frame(df, "所有校区", percent_columns=["总录取率"])
+    """
+
+    def __init__(self, path, csv_dir=None):
+        """
+        :param path: xlsx 输出路径
+        :param csv_dir: 若指定，每个 sheet 同时输出为该目录下的 {sheet名}.csv
+        """
+        self.path = path
+        self.csv_dir = csv_dir
+        self.sheet_names = []
+        self._workbook = Workbook(write_only=True)
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        if csv_dir:
+            os.makedirs(csv_dir, exist_ok=True)
+
+    def _header_cell(self, sheet, value):
+        cell = WriteOnlyCell(sheet, value=_value(value))
+        cell.font = HEADER_FONT
+        cell.border = HEADER_BORDER
+        cell.alignment = HEADER_ALIGNMENT
+        return cell
+
+    def write_frame(self, df, sheet_name, index=False, percent_columns=()):
+        """
+        把一个 DataFrame 写为一个 sheet
+        :param sheet_name: sheet 名称，超长、含非法字符或重名时自动处理
+        :param index: 是否写出索引列
+        :param percent_columns: 以百分比格式显示的列，值为小数（如 0.1234 显示为 12.34%）
+        :return: 实际使用的 sheet 名称
+        """
+        title = sheet_title(sheet_name, self.sheet_names)
+        with stage("write_sheet", sheet=title, rows=len(df)):
+            self._write_frame(df, title, index, percent_columns)
+        return title
+
+    def _write_frame(self, df, title, index, percent_columns):
+        self.sheet_names.append(title)
+        sheet = self._workbook.create_sheet(title)
+
+        header = ([df.index.name] if index else []) + list(df.columns)
+        sheet.append([self._header_cell(sheet, value) for value in header])
+
+        percent_columns = set(percent_columns)
+        percent = {
+            i + (1 if index else 0)
+            for i, col in enumerate(df.columns)
+            if col in percent_columns
+        }
+        for row in df.itertuples(index=index, name=None):
+            cells = []
+            for i, value in enumerate(row):
+                if index and i == 0:
+                    cells.append(self._header_cell(sheet, value))
+                elif i in percent:
+                    cell = WriteOnlyCell(sheet, value=_value(value))
+                    cell.number_format = PERCENT_FORMAT
+                    cells.append(cell)
+                else:
+                    cells.append(_value(value))
+            sheet.append(cells)
+
+        if self.csv_dir:
+            df.to_csv(
+                os.path.join(self.csv_dir, f"{title}.csv"),
+                index=index,
+                encoding="utf-8-sig",
+            )
+
+    def close(self):
+        """保存工作簿；没有写入任何 sheet 时不生成文件"""
+        if self._workbook is None:
+            return
+        if self.sheet_names:
+            with stage("excel_save", file=os.path.basename(self.path)):
+                self._workbook.save(self.path)
+        self._workbook = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            # 出错时不保存，避免残缺的工作簿覆盖上一次的结果
+            # 先结束各 sheet 的逐行写入，临时文件由 openpyxl 在退出时清理
+            if self._workbook is not None:
+                for sheet in self._workbook.worksheets:
+                    sheet.close()
+            self._workbook = None
+        return False
@@ -0,0 +1,49 @@
+"""
+专业切片
+功能：对数据只排序一次，按 所有校区 → 校区 → 完整专业代码 的层级记录每个分组的行区间，
+之后每个专业直接取连续切片（不连续时按行位置取），不再对全表逐个筛选
+"""
+
+ALL_CAMPUSES = "所有校区"
+
+# 分区层级：先按校区，再按完整专业代码
+LEVEL_COLUMNS = ["院系所码与名称", "完整专业代码"]
+
+
+def partition_majors(data):
+    """
+    按层级对数据排序并记录各分组的行区间
+    :param data: 含 院系所码与名称 和 完整专业代码 列的 DataFrame
+    :return: (排序后的 DataFrame, {分组代码: slice 或行位置数组})
+    """
+    ordered = data.sort_values(LEVEL_COLUMNS, kind="stable")
+    bounds = {ALL_CAMPUSES: slice(0, len(ordered))}
+    for col in LEVEL_COLUMNS:
+        groups = ordered.groupby(col, observed=True, sort=False).indices
+        for code, positions in groups.items():
+            # 排序后同一分组的行通常是连续的，首尾位置即为区间；
+            # 同一完整专业代码出现在多个院系名称下（如院系改名）时不连续，保留行位置
+            start, stop = positions[0], positions[-1] + 1
+            if stop - start == len(positions):
+                bounds[code] = slice(start, stop)
+            else:
+                bounds[code] = positions
+    return ordered, bounds
+
+
+def iter_major_slices(data, major_mapping):
+    """
+    依次返回 major_mapping 中每个专业的数据
+    :param data: 含 院系所码与名称 和 完整专业代码 列的 DataFrame
+    :param major_mapping: {专业代码: 专业名称}，专业代码可以是 所有校区、院系所码与名称或完整专业代码
+    :return: 生成 (专业代码, 专业名称, 专业数据)，没有数据的专业返回空 DataFrame
+    """
+    ordered, bounds = partition_majors(data)
+    empty = ordered.iloc[0:0]
+    for major_code, major_name in major_mapping.items():
+        if major_code == ALL_CAMPUSES:
+            yield major_code, major_name, data
+        elif major_code in bounds:
+            yield major_code, major_name, ordered.iloc[bounds[major_code]]
+        else:
+            yield major_code, major_name, empty
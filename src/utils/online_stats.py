@@ -0,0 +1,215 @@
+"""
+在线统计
+功能：按数据块增量计算多列的人数、最低分、最高分、平均分、标准差和分位数，
+均值和方差用 Welford/Chan 公式合并，分位数用按精度取整的计数直方图（可合并），
+多个分片或多年数据的统计状态可以分别计算后再合并
+"""
+
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+# 直方图精度：成绩最多两位小数，按 0.01 取整时分位数是精确的
+RESOLUTION = 0.01
+
+
+def new_stats(columns, resolution=RESOLUTION):
+    """
+    创建空的统计状态
+    :param columns: 列名列表
+    :param resolution: 直方图精度
+    :return: 统计状态字典
+    """
+    k = len(columns)
+    return {
+        "columns": list(columns),
+        "resolution": resolution,
+        "count": np.zeros(k, dtype=np.int64),
+        "mean": np.zeros(k),
+        "m2": np.zeros(k),
+        "min": np.full(k, np.inf),
+        "max": np.full(k, -np.inf),
+        "sketch": [{} for _ in range(k)],
+    }
+
+
+def _merge_moments(stats, count, mean, m2):
+    """Chan 并行公式：把一组 (人数, 均值, 离差平方和) 合并进状态"""
+    total = stats["count"] + count
+    safe_total = np.maximum(total, 1)
+    delta = mean - stats["mean"]
+    stats["mean"] = stats["mean"] + delta * count / safe_total
+    stats["m2"] = stats["m2"] + m2 + delta**2 * stats["count"] * count / safe_total
+    stats["count"] = total
+
+
+def _merge_sketch(sketch, keys, counts):
+    for key, count in zip(keys.tolist(), counts.tolist()):
+        sketch[key] = sketch.get(key, 0) + count
+
+
+def update(stats, block):
+    """
+    用一个数据块更新统计状态，所有列一次向量化计算
+    :param stats: 统计状态
+    :param block: 形状为 (行数, 列数) 的数值数组，缺失值为 NaN
+    :return: 更新后的统计状态
+    """
+    block = np.asarray(block, dtype=float).reshape(-1, len(stats["columns"]))
+    present = ~np.isnan(block)
+    count = present.sum(axis=0)
+    if not count.any():
+        return stats
+
+    filled = np.where(present, block, 0.0)
+    safe_count = np.maximum(count, 1)
+    mean = filled.sum(axis=0) / safe_count
+    m2 = (np.where(present, block - mean, 0.0) ** 2).sum(axis=0)
+    _merge_moments(stats, count, mean, m2)
+
+    stats["min"] = np.fmin(stats["min"], np.where(present, block, np.inf).min(axis=0))
+    stats["max"] = np.fmax(stats["max"], np.where(present, block, -np.inf).max(axis=0))
+
+    keys = np.rint(filled / stats["resolution"]).astype(np.int64)
+    for j, sketch in enumerate(stats["sketch"]):
+        values, counts = np.unique(keys[present[:, j], j], return_counts=True)
+        _merge_sketch(sketch, values, counts)
+    return stats
+
+
+def merge(a, b):
+    """合并两个统计状态（列和精度需一致），返回新的状态"""
+    if a["columns"] != b["columns"] or a["resolution"] != b["resolution"]:
+        raise ValueError("统计状态的列或精度不一致，无法合并")
+    merged = new_stats(a["columns"], a["resolution"])
+    for stats in (a, b):
+        _merge_moments(merged, stats["count"], stats["mean"], stats["m2"])
+        merged["min"] = np.fmin(merged["min"], stats["min"])
+        merged["max"] = np.fmax(merged["max"], stats["max"])
+        for sketch, other in zip(merged["sketch"], stats["sketch"]):
+            keys = np.fromiter(other.keys(), dtype=np.int64, count=len(other))
+            counts = np.fromiter(other.values(), dtype=np.int64, count=len(other))
+            _merge_sketch(sketch, keys, counts)
+    return merged
+
+
+def quantile(stats, column, q):
+    """
+    从直方图计算分位数，与 pandas 默认的线性插值一致
+    :param column: 列名
+    :param q: 0~1 之间的分位点
+    """
+    sketch = stats["sketch"][stats["columns"].index(column)]
+    if not sketch:
+        return np.nan
+    keys = np.array(sorted(sketch))
+    cumulative = np.cumsum([sketch[key] for key in keys])
+    position = q * (cumulative[-1] - 1)
+    lower = keys[np.searchsorted(cumulative, np.floor(position), side="right")]
+    upper = keys[np.searchsorted(cumulative, np.ceil(position), side="right")]
+    value = lower + (upper - lower) * (position - np.floor(position))
+    return value * stats["resolution"]
+
+
+def describe(stats):
+    """
+    汇总统计结果
+    :return: 以列名为索引，含 count, min, max, mean, median, std 的 DataFrame
+    """
+    count = stats["count"]
+    has_data = count > 0
+    std = np.sqrt(stats["m2"] / np.maximum(count - 1, 1))
+    return pd.DataFrame(
+        {
+            "count": count,
+            "min": np.where(has_data, stats["min"], np.nan),
+            "max": np.where(has_data, stats["max"], np.nan),
+            "mean": np.where(has_data, stats["mean"], np.nan),
+            "median": [quantile(stats, col, 0.5) for col in stats["columns"]],
+            "std": np.where(count > 1, std, np.nan),
+        },
+        index=stats["columns"],
+    )
+
+
+def save_stats(stats, path):
+    """把统计状态保存为 JSON，用于跨进程或跨机器合并分片"""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    data = {
+        "columns": stats["columns"],
+        "resolution": stats["resolution"],
+        "count": stats["count"].tolist(),
+        "mean": stats["mean"].tolist(),
+        "m2": stats["m2"].tolist(),
+        "min": [x if np.isfinite(x) else None for x in stats["min"].tolist()],
+        "max": [x if np.isfinite(x) else None for x in stats["max"].tolist()],
+        "sketch": stats["sketch"],
+    }
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False)
+
+
+def load_stats(path):
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    stats = new_stats(data["columns"], data["resolution"])
+    stats["count"] = np.array(data["count"], dtype=np.int64)
+    stats["mean"] = np.array(data["mean"], dtype=float)
+    stats["m2"] = np.array(data["m2"], dtype=float)
+    stats["min"] = np.array(
+        [np.inf if x is None else x for x in data["min"]], dtype=float
+    )
+    stats["max"] = np.array(
+        [-np.inf if x is None else x for x in data["max"]], dtype=float
+    )
+    # JSON 的键是字符串
+    stats["sketch"] = [
+        {int(key): count for key, count in sketch.items()} for sketch in data["sketch"]
+    ]
+    return stats
+
+
+def _to_float(value):
+    """单元格转为数值，非数值（如文字）视为缺失，与 pd.to_numeric(errors='coerce') 一致"""
+    if isinstance(value, bool) or value is None:
+        return np.nan
+    if isinstance(value, (int, float)):
+        return float(value)
+    try:
+        return float(str(value).strip())
+    except ValueError:
+        return np.nan
+
+
+def iter_excel_blocks(excel_path, columns, sheet_name="Sheet1", chunk_size=10000):
+    """
+    以只读流式方式逐块读取 xlsx 中的若干列，内存占用与块大小成正比
+    :param columns: 列名列表，表中不存在的列全部为 NaN
+    :return: 生成形状为 (行数, 列数) 的数值数组
+    """
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(excel_path, read_only=True, data_only=True)
+    try:
+        rows = workbook[sheet_name].iter_rows(values_only=True)
+        header = next(rows, ())
+        positions = {name: i for i, name in enumerate(header)}
+        indexes = [positions.get(col) for col in columns]
+
+        buffer = []
+        for row in rows:
+            buffer.append(
+                [
+                    _to_float(row[i]) if i is not None and i < len(row) else np.nan
+                    for i in indexes
+                ]
+            )
+            if len(buffer) >= chunk_size:
+                yield np.array(buffer, dtype=float)
+                buffer = []
+        if buffer:
+            yield np.array(buffer, dtype=float)
+    finally:
+        workbook.close()
@@ -0,0 +1,300 @@
+"""
+报表流水线
+功能：把每个分析脚本登记为任务，声明输入（数据文件，可细化到列）、参数和输出，
+按输入哈希跳过已是最新的任务，并行运行互不依赖的任务
+"""
+
+import ast
+import hashlib
+import json
+import os
+import subprocess
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from pathlib import Path
+
+# 把项目根目录添加到系统路径
+project_dir = str(Path(__file__).resolve().parents[2])
+sys.path.append(project_dir)
+
+STATE_PATH = "output/.pipeline_state.json"
+
+TASKS = {}
+
+
+def task(name, script, inputs=(), outputs=(), params=None, args=(), deps=(), code=()):
+    """
+    登记一个任务
+    :param name: 任务名
+    :param script: 运行的脚本路径（相对项目根目录）；它导入的 src 模块自动参与哈希
+    :param inputs: 输入列表，元素为文件路径，或 (xlsx 路径, [列名]) 表示只依赖其中几列
+    :param outputs: 输出文件列表
+    :param params: 影响结果的参数，参与哈希
+    :param args: 传给脚本的命令行参数，参与哈希
+    :param deps: 额外的前置任务；输入是其他任务输出时会自动加上依赖
+    :param code: 额外参与哈希的源码文件，用于没有通过 import 引用的代码
+    """
+    TASKS[name] = {
+        "name": name,
+        "script": script,
+        "inputs": list(inputs),
+        "outputs": list(outputs),
+        "params": params or {},
+        "args": list(args),
+        "deps": list(deps),
+        "code": list(code),
+    }
+    return TASKS[name]
+
+
+def _abs(path):
+    """任务中的路径都相对项目根目录"""
+    return os.path.join(project_dir, path)
+
+
+def _hash_file(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _hash_columns(path, columns):
+    """只对 xlsx 中指定的列求哈希，其他列变化不影响任务"""
+    import pandas as pd
+
+    from src.utils.data_cache import load_excel
+
+    df = load_excel(path, "Sheet1", cache_dir=_abs("data/.cache"))
+    digest = hashlib.sha256()
+    for col in columns:
+        digest.update(col.encode("utf-8"))
+        if col in df.columns:
+            values = pd.util.hash_pandas_object(df[col].astype(object), index=False)
+            digest.update(values.to_numpy().tobytes())
+        else:
+            digest.update(b"<missing>")
+    return digest.hexdigest()
+
+
+def _module_path(module):
+    """src 下模块名对应的源码路径（相对项目根目录），不是项目模块时为 None"""
+    if module != "src" and not module.startswith("src."):
+        return None
+    path = module.replace(".", "/") + ".py"
+    return path if os.path.isfile(_abs(path)) else None
+
+
+def source_files(script):
+    """
+    脚本及其直接或间接导入的 src 模块，函数内的延迟导入也算在内
+    :return: 相对项目根目录的路径列表，已排序
+    """
+    found = set()
+    stack = [script]
+    while stack:
+        path = stack.pop()
+        if path in found:
+            continue
+        found.add(path)
+        with open(_abs(path), encoding="utf-8") as f:
+            tree = ast.parse(f.read(), filename=path)
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Import):
+                modules = [alias.name for alias in node.names]
+            elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+                # from src.utils import chart_renderer 这种写法导入的是子模块
+                modules = [node.module] + [
+                    f"{node.module}.{alias.name}" for alias in node.names
+                ]
+            else:
+                continue
+            for module in modules:
+                module_path = _module_path(module)
+                if module_path is not None:
+                    stack.append(module_path)
+    return sorted(found)
+
+
+def fingerprint(spec):
+    """任务的指纹：脚本及其导入的 src 模块源码、各输入内容、参数和命令行参数的哈希"""
+    code = sorted(set(source_files(spec["script"])) | set(spec.get("code", ())))
+    parts = {"code": [[path, _hash_file(_abs(path))] for path in code], "inputs": []}
+    for item in spec["inputs"]:
+        if isinstance(item, str):
+            parts["inputs"].append([item, _hash_file(_abs(item))])
+        else:
+            path, columns = item
+            parts["inputs"].append([path, columns, _hash_columns(_abs(path), columns)])
+    parts["params"] = spec["params"]
+    parts["args"] = spec["args"]
+    encoded = json.dumps(parts, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+def _input_path(item):
+    return item if isinstance(item, str) else item[0]
+
+
+def resolve_dependencies(tasks):
+    """根据显式依赖和 输入=其他任务输出 的关系得到每个任务的前置任务"""
+    producers = {
+        os.path.normpath(out): spec["name"]
+        for spec in tasks.values()
+        for out in spec["outputs"]
+    }
+    deps = {}
+    for name, spec in tasks.items():
+        upstream = set(spec["deps"])
+        for item in spec["inputs"]:
+            producer = producers.get(os.path.normpath(_input_path(item)))
+            if producer is not None and producer != name:
+                upstream.add(producer)
+        deps[name] = upstream
+    return deps
+
+
+def _select(tasks, deps, names):
+    """选出指定任务及其所有前置任务"""
+    selected = set()
+    stack = list(names)
+    while stack:
+        name = stack.pop()
+        if name not in tasks:
+            raise KeyError(f"未登记的任务: {name}")
+        if name not in selected:
+            selected.add(name)
+            stack.extend(deps[name])
+    return selected
+
+
+def _load_state(path):
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_state(path, state):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(state, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, path)
+
+
+def _run_script(spec):
+    """在子进程中运行脚本，强制使用 Agg 后端，避免 plt.show() 阻塞"""
+    env = dict(os.environ, MPLBACKEND="Agg")
+    start = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, spec["script"], *spec["args"]],
+        cwd=project_dir,
+        env=env,
+        capture_output=True,
+        text=True,
+    )
+    return proc, time.perf_counter() - start
+
+
+def run_pipeline(
+    names=None,
+    tasks=None,
+    jobs=1,
+    force=False,
+    dry_run=False,
+    state_path=STATE_PATH,
+):
+    """
+    运行流水线
+    :param names: 要运行的任务，默认全部；会自动带上前置任务
+    :param jobs: 并行运行的任务数
+    :param force: 忽略指纹，全部重新运行
+    :param dry_run: 只报告哪些任务需要运行
+    :return: {任务名: {"status": built/skipped/failed/blocked/stale, "seconds": 耗时}}
+    """
+    tasks = TASKS if tasks is None else tasks
+    deps = resolve_dependencies(tasks)
+    selected = _select(tasks, deps, names or list(tasks))
+    state_path = _abs(state_path)
+    state = _load_state(state_path)
+    results = {}
+
+    pending = set(selected)
+    running = {}
+
+    def ready(name):
+        return all(dep in results for dep in deps[name] if dep in selected)
+
+    def start(executor, name):
+        spec = tasks[name]
+        if any(
+            results.get(dep, {}).get("status") in ("failed", "blocked")
+            for dep in deps[name]
+        ):
+            results[name] = {"status": "blocked", "seconds": 0.0}
+            return
+        if any(results.get(dep, {}).get("status") == "stale" for dep in deps[name]):
+            # dry_run 时前置任务不会重建，指纹仍按旧输入计算，直接视为需要重新运行
+            results[name] = {"status": "stale", "seconds": 0.0}
+            return
+        try:
+            digest = fingerprint(spec)
+        except Exception as e:
+            # 输入缺失、工作簿损坏或源码无法解析时只让这个任务失败
+            print(f"[{name}] 无法计算指纹: {e}")
+            results[name] = {"status": "failed", "seconds": 0.0}
+            return
+        up_to_date = state.get(name) == digest and all(
+            os.path.exists(_abs(out)) for out in spec["outputs"]
+        )
+        if up_to_date and not force:
+            results[name] = {"status": "skipped", "seconds": 0.0}
+            return
+        if dry_run:
+            results[name] = {"status": "stale", "seconds": 0.0}
+            return
+        print(f"[{name}] 开始运行 {spec['script']}")
+        running[executor.submit(_run_script, spec)] = (name, digest)
+
+    with ThreadPoolExecutor(max_workers=max(1, jobs)) as executor:
+        while pending or running:
+            for name in sorted(n for n in pending if ready(n)):
+                pending.discard(name)
+                start(executor, name)
+            if not running:
+                if pending and not any(ready(n) for n in pending):
+                    raise RuntimeError(f"任务之间存在循环依赖: {sorted(pending)}")
+                continue
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name, digest = running.pop(future)
+                proc, seconds = future.result()
+                missing = [
+                    out
+                    for out in tasks[name]["outputs"]
+                    if not os.path.exists(_abs(out))
+                ]
+                if proc.returncode == 0 and not missing:
+                    results[name] = {"status": "built", "seconds": seconds}
+                    state[name] = digest
+                    _save_state(state_path, state)
+                else:
+                    results[name] = {"status": "failed", "seconds": seconds}
+                    state.pop(name, None)
+                    print(f"[{name}] 运行失败 (退出码 {proc.returncode})")
+                    if missing:
+                        print(f"[{name}] 缺少输出: {', '.join(missing)}")
+                    print(proc.stdout[-2000:])
+                    print(proc.stderr[-2000:])
+
+    return results
+
+
+def print_results(results):
+    for name, result in sorted(results.items()):
+        print(f"  {result['status']:<8} {result['seconds']:8.2f}s  {name}")
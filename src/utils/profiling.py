@@ -0,0 +1,317 @@
+"""
+分阶段性能记录
+功能：用 with stage("名称") 或 @profiled 标记读取数据、逐专业统计、渲染图表、加水印、写 Excel 等阶段，
+记录每个阶段的耗时、CPU 时间、进程最大常驻内存（RSS）及其在本阶段的增长和可选的 tracemalloc 峰值，
+结束时保存为 JSON 或 Chrome trace（可在 chrome://tracing 或 Perfetto 中查看）
+未开启时 stage 不做任何测量，开销可以忽略
+
+开启方式（环境变量，子进程和渲染进程池会继承）：
+    REPORT_PROFILE=output/profile.json            保存各阶段记录
+    REPORT_PROFILE=output/profile.trace.json      以 .trace.json 结尾时保存为 Chrome trace
+    REPORT_PROFILE_MEMORY=1                       同时用 tracemalloc 统计 Python 内存分配峰值（会拖慢运行）
+    REPORT_CPROFILE=output/admit.prof             用 cProfile 采样整次运行，可用 snakeviz 或 flameprof 生成火焰图
+    REPORT_CPROFILE_STAGE=major                   只采样指定名称的阶段（采样图表渲染阶段时用 -j 1 在主进程中渲染）
+路径中的 {pid} 会替换为进程号，多个脚本并行运行时互不覆盖
+"""
+
+import atexit
+import cProfile
+import functools
+import json
+import multiprocessing
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:
+    # Windows 没有 resource 模块，不记录 RSS
+    resource = None
+
+PROFILE_ENV = "REPORT_PROFILE"
+MEMORY_ENV = "REPORT_PROFILE_MEMORY"
+CPROFILE_ENV = "REPORT_CPROFILE"
+CPROFILE_STAGE_ENV = "REPORT_CPROFILE_STAGE"
+
+CHROME_TRACE_SUFFIX = ".trace.json"
+
+_state = {
+    "enabled": False,
+    "memory": False,
+    "output_path": None,
+    "cprofile_path": None,
+    "cprofile_stage": None,
+    "profiler": None,
+}
+_records = []
+_local = threading.local()
+
+
+def _process_peak_rss_mb():
+    """
+    进程启动至今的最大常驻内存（ru_maxrss），不是某个阶段自己的峰值，
+    阶段记录中用阶段前后的差值表示本阶段把进程峰值抬高了多少
+    """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS 上单位为字节，Linux 上为 KB
+    return peak / 2**20 if sys.platform == "darwin" else peak / 2**10
+
+
+def _stack():
+    if not hasattr(_local, "stack"):
+        _local.stack = []
+    return _local.stack
+
+
+def enable(output_path=None, memory=False, cprofile_path=None, cprofile_stage=None):
+    """
+    开启记录
+    :param output_path: 退出时保存记录的路径，为 None 时只在内存中记录（见 records）
+    :param memory: 是否用 tracemalloc 统计每个阶段的 Python 内存分配峰值
+    :param cprofile_path: 保存 cProfile 结果的路径
+    :param cprofile_stage: 只采样该名称的阶段；为 None 时采样从开启到退出的整个过程
+    """
+    _state.update(
+        enabled=True,
+        memory=memory,
+        output_path=output_path and output_path.replace("{pid}", str(os.getpid())),
+        cprofile_path=cprofile_path
+        and cprofile_path.replace("{pid}", str(os.getpid())),
+        cprofile_stage=cprofile_stage,
+    )
+    if memory and not tracemalloc.is_tracing():
+        tracemalloc.start()
+    if cprofile_path and cprofile_stage is None and _state["profiler"] is None:
+        _state["profiler"] = cProfile.Profile()
+        _state["profiler"].enable()
+
+
+def enable_from_env():
+    """按环境变量开启，没有设置时什么也不做"""
+    output_path = os.environ.get(PROFILE_ENV)
+    cprofile_path = os.environ.get(CPROFILE_ENV)
+    if _state["enabled"] or not (output_path or cprofile_path):
+        return
+    memory = os.environ.get(MEMORY_ENV, "") not in ("", "0")
+    if multiprocessing.parent_process() is not None:
+        # spawn 方式启动的进程池工作进程：只在内存中记录，随结果交给主进程保存
+        enable(memory=memory)
+        return
+    enable(
+        output_path,
+        memory=memory,
+        cprofile_path=cprofile_path,
+        cprofile_stage=os.environ.get(CPROFILE_STAGE_ENV),
+    )
+    atexit.register(finish)
+
+
+def is_enabled():
+    return _state["enabled"]
+
+
+@contextmanager
+def stage(name, **details):
+    """
+    记录一个阶段，可以嵌套
+    :param name: 阶段名，如 read_excel、major、savefig
+    :param details: 附加信息，如 major="本部计学"，写入记录和 Chrome trace 的 args
+    """
+    if not _state["enabled"]:
+        yield
+        return
+
+    stack = _stack()
+    memory = _state["memory"] and tracemalloc.is_tracing()
+    if memory:
+        # tracemalloc 只有一个峰值计数器：进入内层阶段前把外层到目前为止的峰值记在外层上，再清零
+        if stack:
+            stack[-1]["py_peak"] = max(
+                stack[-1]["py_peak"], tracemalloc.get_traced_memory()[1]
+            )
+        tracemalloc.reset_peak()
+    # 同名阶段多次出现时累积到同一个 cProfile 中，嵌套时只在最外层开关
+    profiling = (
+        _state["cprofile_path"] is not None
+        and name == _state["cprofile_stage"]
+        and not any(f["name"] == name for f in stack)
+    )
+    if profiling:
+        if _state["profiler"] is None:
+            _state["profiler"] = cProfile.Profile()
+        _state["profiler"].enable()
+
+    frame = {"name": name, "py_peak": 0}
+    stack.append(frame)
+    rss_before = _process_peak_rss_mb()
+    start = time.time()
+    wall, cpu = time.perf_counter(), time.process_time()
+    try:
+        yield
+    finally:
+        wall = time.perf_counter() - wall
+        cpu = time.process_time() - cpu
+        stack.pop()
+        if profiling:
+            _state["profiler"].disable()
+        rss_after = _process_peak_rss_mb()
+        record = {
+            "name": name,
+            "path": "/".join([f["name"] for f in stack] + [name]),
+            "start": start,
+            "wall": wall,
+            "cpu": cpu,
+            "process_peak_rss_mb": rss_after,
+            "peak_rss_growth_mb": (
+                None if rss_after is None else rss_after - rss_before
+            ),
+            "pid": os.getpid(),
+            "tid": threading.get_ident(),
+        }
+        if memory:
+            # 计数器没有再清零，外层结束时读到的峰值自然包含本阶段
+            peak = max(frame["py_peak"], tracemalloc.get_traced_memory()[1])
+            record["py_peak_mb"] = peak / 2**20
+        if details:
+            record["details"] = {k: str(v) for k, v in details.items()}
+        _records.append(record)
+
+
+def profiled(name=None, **details):
+    """
+    装饰器版本的 stage
+        @profiled("build_count_tensor")
+        def build_count_tensor(...): ...
+    """
+
+    def decorator(func):
+        stage_name = name or func.__name__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with stage(stage_name, **details):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def records():
+    """当前进程已记录的阶段"""
+    return list(_records)
+
+
+@contextmanager
+def capture():
+    """
+    把代码块内产生的记录从全局列表中取出，供渲染进程随结果一起返回给主进程
+        with capture() as captured:
+            ...
+        return {"profile": captured}
+    """
+    captured = []
+    start = len(_records)
+    try:
+        yield captured
+    finally:
+        captured.extend(_records[start:])
+        del _records[start:]
+
+
+def extend(new_records):
+    """合并其他进程返回的记录"""
+    if _state["enabled"] and new_records:
+        _records.extend(new_records)
+
+
+def summary(stage_records=None):
+    """
+    按阶段名汇总
+    :return: {阶段名: {"count", "wall", "cpu", "max_wall"}}，按总耗时降序
+    """
+    totals = {}
+    for record in _records if stage_records is None else stage_records:
+        total = totals.setdefault(
+            record["name"], {"count": 0, "wall": 0.0, "cpu": 0.0, "max_wall": 0.0}
+        )
+        total["count"] += 1
+        total["wall"] += record["wall"]
+        total["cpu"] += record["cpu"]
+        total["max_wall"] = max(total["max_wall"], record["wall"])
+    return dict(sorted(totals.items(), key=lambda item: -item[1]["wall"]))
+
+
+def chrome_trace(stage_records):
+    """转换为 Chrome trace 事件格式，时间单位为微秒"""
+    events = []
+    for record in stage_records:
+        args = {
+            "cpu_ms": round(record["cpu"] * 1000, 3),
+            "process_peak_rss_mb": record["process_peak_rss_mb"],
+            "peak_rss_growth_mb": record["peak_rss_growth_mb"],
+            **record.get("details", {}),
+        }
+        if "py_peak_mb" in record:
+            args["py_peak_mb"] = record["py_peak_mb"]
+        events.append(
+            {
+                "name": record["name"],
+                "ph": "X",
+                "ts": record["start"] * 1e6,
+                "dur": record["wall"] * 1e6,
+                "pid": record["pid"],
+                "tid": record["tid"],
+                "args": args,
+            }
+        )
+    return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+
+def save(output_path, stage_records=None):
+    """保存记录，路径以 .trace.json 结尾时保存为 Chrome trace"""
+    stage_records = _records if stage_records is None else stage_records
+    if output_path.endswith(CHROME_TRACE_SUFFIX):
+        data = chrome_trace(stage_records)
+    else:
+        data = {"stages": stage_records, "summary": summary(stage_records)}
+    os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+    with open(output_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=1)
+
+
+def finish():
+    """停止整体 cProfile 采样并保存记录，重复调用无副作用"""
+    if _state["profiler"] is not None:
+        _state["profiler"].disable()
+        os.makedirs(os.path.dirname(_state["cprofile_path"]) or ".", exist_ok=True)
+        _state["profiler"].dump_stats(_state["cprofile_path"])
+        print(f"cProfile 结果已保存到: {_state['cprofile_path']}", file=sys.stderr)
+        _state["profiler"] = None
+    if _state["output_path"] and _records:
+        save(_state["output_path"])
+        print(f"阶段记录已保存到: {_state['output_path']}", file=sys.stderr)
+        _state["output_path"] = None
+
+
+def print_summary(limit=15, file=sys.stderr):
+    """在标准错误中打印耗时最多的阶段"""
+    totals = summary()
+    if not totals:
+        return
+    print(f"{'阶段':<24}{'次数':>6}{'总耗时':>10}{'CPU':>10}{'最长':>10}", file=file)
+    for name, total in list(totals.items())[:limit]:
+        print(
+            f"{name:<26}{total['count']:>6}{total['wall']:>10.3f}"
+            f"{total['cpu']:>10.3f}{total['max_wall']:>10.3f}",
+            file=file,
+        )
+
+
+enable_from_env()
@@ -0,0 +1,175 @@
+"""
+成绩排名索引
+功能：从总复试成绩单预先为每个 (专业, 科目) 生成升序成绩数组和累计录取人数，
+用 searchsorted 以 O(log n) 查询排名、百分位和经验录取概率，支持批量查询
+"""
+
+import os
+import pickle
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# 把项目根目录添加到系统路径
+project_dir = str(Path(__file__).resolve().parents[2])
+sys.path.append(project_dir)
+from src.utils.data_cache import file_hash
+from src.utils.dataset import SCORES_PATH, load_scores
+from src.utils.major_slices import ALL_CAMPUSES, partition_majors
+from src.utils.profiling import profiled
+
+INDEX_PATH = "data/.cache/rank_index.pkl"
+INDEX_VERSION = 1
+
+# 科目名称与成绩单列名
+SUBJECTS = {
+    "初试总分": "初试总分",
+    "机试": "专业综合测试成绩",
+    "面试": "面试成绩",
+    "总成绩": "总成绩",
+}
+
+# 经验录取概率的默认分数窗口：统计 分数±窗口 内考生的录取比例
+WINDOW = 5
+
+
+def _entry(scores, admitted):
+    """单个 (专业, 科目) 的索引：升序成绩和前 i 名（按分数升序）中的录取人数"""
+    valid = ~np.isnan(scores)
+    order = np.argsort(scores[valid], kind="stable")
+    admitted = admitted[valid][order]
+    return {
+        "scores": scores[valid][order],
+        "admitted": np.concatenate([[0], np.cumsum(admitted)]),
+    }
+
+
+@profiled()
+def build_rank_index(data, subjects=SUBJECTS):
+    """
+    生成排名索引
+    :param data: 成绩单数据，含 院系所码与名称、完整专业代码、录取状态 和各科目列
+    :param subjects: {科目名称: 列名}，成绩单中没有的列会被跳过
+    :return: {"groups": 分组代码列表, "subjects": 科目列表, "entries": {(分组, 科目): 索引}}
+    """
+    ordered, bounds = partition_majors(data)
+    admitted = (ordered["录取状态"].astype(object) == "已录取").to_numpy()
+    subjects = {name: col for name, col in subjects.items() if col in ordered.columns}
+
+    entries = {}
+    for name, col in subjects.items():
+        scores = pd.to_numeric(ordered[col], errors="coerce").to_numpy(dtype=float)
+        # 所有校区、各校区、各专业在排序后基本都是连续区间，rows 为 slice 或行位置数组
+        for group, rows in bounds.items():
+            entries[(group, name)] = _entry(scores[rows], admitted[rows])
+    return {"groups": list(bounds), "subjects": list(subjects), "entries": entries}
+
+
+def load_rank_index(excel_path=SCORES_PATH, index_path=INDEX_PATH, rebuild=False):
+    """加载排名索引，成绩单内容变化时重新生成"""
+    if not rebuild:
+        try:
+            with open(index_path, "rb") as f:
+                index = pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError):
+            index = None
+        stat = os.stat(excel_path)
+        if (
+            isinstance(index, dict)
+            and index.get("version") == INDEX_VERSION
+            and index["size"] == stat.st_size
+            and (
+                index["mtime"] == stat.st_mtime
+                or index["sha256"] == file_hash(excel_path)
+            )
+        ):
+            return index
+
+    stat = os.stat(excel_path)
+    index = build_rank_index(load_scores(excel_path))
+    index.update(
+        {
+            "version": INDEX_VERSION,
+            "mtime": stat.st_mtime,
+            "size": stat.st_size,
+            "sha256": file_hash(excel_path),
+        }
+    )
+    try:
+        os.makedirs(os.path.dirname(index_path) or ".", exist_ok=True)
+        tmp_path = index_path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            pickle.dump(index, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, index_path)
+    except OSError as e:
+        print(f"警告: 无法写入排名索引 {index_path} - {e}")
+    return index
+
+
+def _get_entry(index, group, subject):
+    try:
+        return index["entries"][(group, subject)]
+    except KeyError:
+        raise KeyError(f"排名索引中没有 {group} 的 {subject} 成绩") from None
+
+
+def rank(index, scores, subject="初试总分", group=ALL_CAMPUSES, window=WINDOW):
+    """
+    批量查询同一专业、同一科目的多个分数
+    :param scores: 分数或分数数组
+    :param group: 分组代码：所有校区、院系所码与名称或完整专业代码
+    :param window: 经验录取概率统计的分数窗口
+    :return: DataFrame，列为 分数、排名（高于该分数的人数 + 1）、总人数、
+             百分位（不高于该分数的考生占比 %）、录取概率（分数±窗口内已录取占比，无样本时为 NaN）
+    """
+    entry = _get_entry(index, group, subject)
+    sorted_scores, admitted = entry["scores"], entry["admitted"]
+    scores = np.atleast_1d(np.asarray(scores, dtype=float))
+    total = len(sorted_scores)
+
+    at_or_below = np.searchsorted(sorted_scores, scores, side="right")
+    lower = np.searchsorted(sorted_scores, scores - window, side="left")
+    upper = np.searchsorted(sorted_scores, scores + window, side="right")
+    nearby = upper - lower
+    with np.errstate(invalid="ignore", divide="ignore"):
+        probability = np.where(
+            nearby > 0, (admitted[upper] - admitted[lower]) / nearby, np.nan
+        )
+        percentile = at_or_below / total * 100
+
+    return pd.DataFrame(
+        {
+            "分数": scores,
+            "排名": total - at_or_below + 1,
+            "总人数": total,
+            "百分位": np.round(percentile, 2),
+            "录取概率": np.round(probability, 4),
+        }
+    )
+
+
+def rank_candidates(index, candidates, subject="初试总分", window=WINDOW):
+    """
+    批量查询不同专业的考生
+    :param candidates: DataFrame，含 专业（分组代码）和 分数 两列
+    :return: 与 candidates 行顺序和索引一致的查询结果；索引中没有的专业对应的行为 NaN
+    """
+    if subject not in index["subjects"]:
+        raise KeyError(f"排名索引中没有 {subject} 成绩")
+    scores = candidates["分数"].to_numpy(dtype=float)
+    result = pd.DataFrame({"专业": candidates["专业"].to_numpy(), "分数": scores})
+    for col in ["排名", "总人数", "百分位", "录取概率"]:
+        result[col] = np.nan
+    # 按位置而不是标签回填，candidates 的索引有重复时也能对齐
+    for group, positions in candidates.groupby("专业", sort=False).indices.items():
+        try:
+            ranked = rank(index, scores[positions], subject, group, window)
+        except KeyError as e:
+            print(f"警告: {e.args[0]}，对应 {len(positions)} 名考生的结果为空")
+            continue
+        result.iloc[positions, 1:] = ranked.to_numpy()
+    result[["排名", "总人数"]] = result[["排名", "总人数"]].astype("Int64")
+    result.index = candidates.index
+    return result
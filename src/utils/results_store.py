@@ -0,0 +1,369 @@
+"""
+多年份结果库
+功能：把每年的总复试成绩单和合并后的问卷导入本地 SQLite，
+在 year、完整专业代码、录取状态 上建立索引，录取分布、调剂统计、成绩统计直接用 SQL 聚合，
+跨年份对比不需要重新读取各年的 xlsx
+"""
+
+import os
+import sqlite3
+import sys
+import time
+from pathlib import Path
+
+import pandas as pd
+
+# 把项目根目录添加到系统路径
+project_dir = str(Path(__file__).resolve().parents[2])
+sys.path.append(project_dir)
+from src.utils.data_cache import file_hash
+from src.utils.dataset import (
+    QUESTIONNAIRE_PATH,
+    SCORES_PATH,
+    load_questionnaire,
+    load_scores,
+)
+from src.utils.major_slices import ALL_CAMPUSES
+
+DB_PATH = "data/results.sqlite"
+
+# {表名: 加载函数}
+TABLES = {
+    "scores": load_scores,
+    "questionnaire": load_questionnaire,
+}
+
+# 每张表的索引: {索引名: 列}，year 在最前，单独按年份筛选时也能用上
+INDEXES = {
+    "scores": {
+        "year_major": ["year", "完整专业代码"],
+        "year_status": ["year", "录取状态", "一志愿录取"],
+        "major_status": ["完整专业代码", "录取状态"],
+    },
+    "questionnaire": {
+        "year_major": ["year", "完整专业代码"],
+    },
+}
+
+# 成绩列：问卷中的成绩是自填的，可能混有 "未参加" 等文字，导入前统一转为数值，
+# 文字视为缺失，与 calculate_exam_stats 的口径一致；否则整列会存为 TEXT，按字符串比较大小
+SCORE_COLUMNS = [
+    "政治",
+    "外语",
+    "业务课一",
+    "业务课二",
+    "初试总分",
+    "专业综合测试成绩",
+    "面试成绩",
+    "复试总成绩",
+    "加试一成绩",
+    "加试二成绩",
+    "总成绩",
+    "机试原始分",
+    "初试政治成绩（必填）",
+    "初试英语成绩（必填）",
+    "初试数学成绩（必填）",
+    "初试专业课（408）成绩（必填）",
+    "初试总分（必填）",
+    "复试机试成绩（总分160）（必填）",
+    "复试面试成绩（总分150）（必填）",
+]
+
+# 分组层级，与 major_slices 一致：所有校区 → 院系所码与名称 → 完整专业代码
+GROUP_LEVELS = [ALL_CAMPUSES, "院系所码与名称", "完整专业代码"]
+
+
+def _quote(name):
+    """SQLite 标识符，列名含中文括号等字符"""
+    return '"' + str(name).replace('"', '""') + '"'
+
+
+def connect(db_path=DB_PATH):
+    """打开结果库，不存在时创建导入记录表"""
+    os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+    conn = sqlite3.connect(db_path)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS ingest_log (
+            "table" TEXT NOT NULL,
+            year INTEGER NOT NULL,
+            source TEXT,
+            sha256 TEXT,
+            rows INTEGER,
+            ingested_at TEXT,
+            PRIMARY KEY ("table", year)
+        )
+        """)
+    return conn
+
+
+def _table_columns(conn, table):
+    return [row[1] for row in conn.execute(f"PRAGMA table_info({_quote(table)})")]
+
+
+def _column_types(conn, table):
+    return {
+        row[1]: row[2] for row in conn.execute(f"PRAGMA table_info({_quote(table)})")
+    }
+
+
+def _sql_type(series):
+    if pd.api.types.is_integer_dtype(series) or pd.api.types.is_bool_dtype(series):
+        return "INTEGER"
+    if pd.api.types.is_float_dtype(series):
+        return "REAL"
+    return "TEXT"
+
+
+def _prepare(df, year):
+    """分类列转回普通值，成绩列转为数值，加上 year 列"""
+    df = df.copy()
+    for col in df.columns:
+        if isinstance(df[col].dtype, pd.CategoricalDtype):
+            df[col] = df[col].astype(object)
+        if col in SCORE_COLUMNS:
+            df[col] = pd.to_numeric(df[col], errors="coerce")
+    df.insert(0, "year", year)
+    return df
+
+
+def _ensure_table(conn, table, df):
+    """建表；已有表缺少的列（新年份多出的问卷题目）用 ALTER TABLE 补上"""
+    existing = _table_columns(conn, table)
+    if not existing:
+        columns = ", ".join(f"{_quote(c)} {_sql_type(df[c])}" for c in df.columns)
+        conn.execute(f"CREATE TABLE {_quote(table)} ({columns})")
+    else:
+        for col in df.columns:
+            if col not in existing:
+                conn.execute(
+                    f"ALTER TABLE {_quote(table)} "
+                    f"ADD COLUMN {_quote(col)} {_sql_type(df[col])}"
+                )
+
+    columns = set(_table_columns(conn, table))
+    for name, index_columns in INDEXES.get(table, {}).items():
+        if all(col in columns for col in index_columns):
+            conn.execute(
+                f"CREATE INDEX IF NOT EXISTS {_quote(f'idx_{table}_{name}')} "
+                f"ON {_quote(table)} ({', '.join(map(_quote, index_columns))})"
+            )
+
+
+def ingest_table(conn, table, year, excel_path, force=False):
+    """
+    导入一年的一张表，同一年份已导入的数据整体替换
+    :param force: 源文件内容没变时默认跳过，为 True 时强制重新导入
+    :return: 导入的行数，跳过时为 None
+    """
+    sha256 = file_hash(excel_path)
+    logged = conn.execute(
+        'SELECT sha256 FROM ingest_log WHERE "table" = ? AND year = ?', (table, year)
+    ).fetchone()
+    if not force and logged is not None and logged[0] == sha256:
+        return None
+
+    df = _prepare(TABLES[table](excel_path), year)
+    with conn:
+        _ensure_table(conn, table, df)
+        conn.execute(f"DELETE FROM {_quote(table)} WHERE year = ?", (year,))
+        placeholders = ", ".join("?" * len(df.columns))
+        conn.executemany(
+            f"INSERT INTO {_quote(table)} ({', '.join(map(_quote, df.columns))}) "
+            f"VALUES ({placeholders})",
+            df.astype(object).where(df.notna(), None).itertuples(index=False),
+        )
+        conn.execute(
+            "INSERT OR REPLACE INTO ingest_log VALUES (?, ?, ?, ?, ?, ?)",
+            (
+                table,
+                year,
+                os.path.abspath(excel_path),
+                sha256,
+                len(df),
+                time.strftime("%Y-%m-%d %H:%M:%S"),
+            ),
+        )
+    conn.execute("ANALYZE")
+    return len(df)
+
+
+def ingest_year(
+    conn,
+    year,
+    scores_path=SCORES_PATH,
+    questionnaire_path=QUESTIONNAIRE_PATH,
+    force=False,
+):
+    """
+    导入一年的成绩单和问卷，不存在的文件跳过
+    :return: {表名: 导入行数或 None（未变化跳过）}
+    """
+    result = {}
+    for table, path in (("scores", scores_path), ("questionnaire", questionnaire_path)):
+        if path and os.path.exists(path):
+            result[table] = ingest_table(conn, table, year, path, force)
+        else:
+            print(f"警告: 找不到文件 {path}，跳过 {table}")
+    return result
+
+
+def years(conn, table="scores"):
+    """已导入的年份"""
+    return [
+        row[0]
+        for row in conn.execute(
+            'SELECT year FROM ingest_log WHERE "table" = ? ORDER BY year', (table,)
+        )
+    ]
+
+
+def _group_expr(level):
+    """分组层级对应的 SQL 表达式，所有校区为常量"""
+    if level == ALL_CAMPUSES:
+        return f"'{ALL_CAMPUSES}'"
+    if level not in GROUP_LEVELS:
+        raise ValueError(f"不支持的分组层级: {level}，可选: {GROUP_LEVELS}")
+    return _quote(level)
+
+
+def _where(year_list=None, extra=()):
+    """生成 WHERE 子句和参数"""
+    clauses, params = list(extra), []
+    if year_list:
+        clauses.append(f"year IN ({', '.join('?' * len(year_list))})")
+        params.extend(year_list)
+    return (" WHERE " + " AND ".join(clauses) if clauses else ""), params
+
+
+def _value_column(conn, table, column):
+    """
+    成绩列的 SQL 标识符
+    SQLite 会把不存在的双引号标识符当作字符串常量，所以先确认列存在；
+    TEXT 列按字符串比较大小，统计结果没有意义，也直接报错
+    """
+    column_type = _column_types(conn, table).get(column)
+    if column_type is None:
+        raise ValueError(f"{table} 中没有列 {column}")
+    if column_type not in ("INTEGER", "REAL"):
+        raise ValueError(f"{table} 中的列 {column} 不是数值列（{column_type}）")
+    return _quote(column)
+
+
+def _query(conn, sql, params=()):
+    return pd.read_sql_query(sql, conn, params=list(params))
+
+
+def admit_summary(conn, year_list=None, level="完整专业代码"):
+    """
+    各年份、各分组的录取去向人数和录取率，口径与 admit_distribution 一致
+    :param level: 所有校区、院系所码与名称 或 完整专业代码
+    """
+    group = _group_expr(level)
+    where, params = _where(year_list)
+    df = _query(
+        conn,
+        f"""
+        SELECT year, {group} AS 分组,
+            SUM(复试及格 = '否' AND 录取状态 = '未录取' AND 一志愿录取 = '否') AS 复试不及格,
+            SUM(复试及格 = '是' AND 录取状态 = '未录取' AND 一志愿录取 = '否') AS 复试及格未录取,
+            SUM(复试及格 = '是' AND 录取状态 = '已录取' AND 一志愿录取 = '否') AS 调剂录取,
+            SUM(复试及格 = '是' AND 录取状态 = '已录取' AND 一志愿录取 = '是') AS 一志愿录取
+        FROM scores{where}
+        GROUP BY year, 分组
+        ORDER BY 分组, year
+        """,
+        params,
+    )
+    total = df[["复试不及格", "复试及格未录取", "调剂录取", "一志愿录取"]].sum(axis=1)
+    df["一志愿录取率"] = (df["一志愿录取"] / total).fillna(0)
+    df["总录取率"] = ((df["一志愿录取"] + df["调剂录取"]) / total).fillna(0)
+    return df
+
+
+def admit_bands(conn, year_list=None, level="完整专业代码", bin_size=10):
+    """各年份、各分组按初试总分分数段的录取去向人数"""
+    group = _group_expr(level)
+    where, params = _where(year_list, ["初试总分 IS NOT NULL"])
+    df = _query(
+        conn,
+        f"""
+        SELECT year, {group} AS 分组,
+            CAST(初试总分 / ? AS INTEGER) * ? AS 分数段,
+            SUM(复试及格 = '否' AND 录取状态 = '未录取' AND 一志愿录取 = '否') AS 复试不及格,
+            SUM(复试及格 = '是' AND 录取状态 = '未录取' AND 一志愿录取 = '否') AS 复试及格未录取,
+            SUM(复试及格 = '是' AND 录取状态 = '已录取' AND 一志愿录取 = '否') AS 调剂录取,
+            SUM(复试及格 = '是' AND 录取状态 = '已录取' AND 一志愿录取 = '是') AS 一志愿录取
+        FROM scores{where}
+        GROUP BY year, 分组, 分数段
+        ORDER BY 分组, year, 分数段
+        """,
+        [bin_size, bin_size, *params],
+    )
+    df["分数段"] = [f"[{low},{low + bin_size})" for low in df["分数段"]]
+    return df
+
+
+def adjustment_counts(conn, year_list=None, level="完整专业代码"):
+    """各年份、各分组调剂录取到的专业及人数，口径与 adjustment_distribution 一致"""
+    group = _group_expr(level)
+    where, params = _where(year_list, ["录取状态 = '已录取'", "一志愿录取 = '否'"])
+    return _query(
+        conn,
+        f"""
+        SELECT year, {group} AS 分组, 录取专业, COUNT(*) AS 个数
+        FROM scores{where}
+        GROUP BY year, 分组, 录取专业
+        ORDER BY 分组, year, 个数
+        """,
+        params,
+    )
+
+
+def score_stats(conn, column, table="scores", year_list=None, level=ALL_CAMPUSES):
+    """
+    各年份、各分组某一成绩列的人数、最低分、最高分、平均分和中位数
+    中位数用窗口函数在 SQL 中计算，缺失值不参与统计
+    """
+    group = _group_expr(level)
+    value = _value_column(conn, table, column)
+    where, params = _where(year_list, [f"{value} IS NOT NULL"])
+    return _query(
+        conn,
+        f"""
+        WITH ranked AS (
+            SELECT year, {group} AS 分组, {value} AS v,
+                ROW_NUMBER() OVER (PARTITION BY year, {group} ORDER BY {value}) AS i,
+                COUNT(*) OVER (PARTITION BY year, {group}) AS n
+            FROM {_quote(table)}{where}
+        )
+        SELECT year, 分组, COUNT(*) AS 人数, MIN(v) AS 最低分, MAX(v) AS 最高分,
+            AVG(v) AS 平均分,
+            AVG(CASE WHEN i IN ((n + 1) / 2, (n + 2) / 2) THEN v END) AS 中位数
+        FROM ranked
+        GROUP BY year, 分组
+        ORDER BY 分组, year
+        """,
+        params,
+    )
+
+
+def score_histogram(
+    conn, column, table="questionnaire", year_list=None, level=ALL_CAMPUSES, bin_size=10
+):
+    """各年份、各分组某一成绩列的分数段人数，口径与 score_distribution 一致"""
+    group = _group_expr(level)
+    value = _value_column(conn, table, column)
+    where, params = _where(year_list, [f"{value} IS NOT NULL"])
+    df = _query(
+        conn,
+        f"""
+        SELECT year, {group} AS 分组,
+            CAST({value} / ? AS INTEGER) * ? AS 分数段, COUNT(*) AS 人数
+        FROM {_quote(table)}{where}
+        GROUP BY year, 分组, 分数段
+        ORDER BY 分组, year, 分数段
+        """,
+        [bin_size, bin_size, *params],
+    )
+    df["分数段"] = [f"[{low},{low + bin_size})" for low in df["分数段"]]
+    return df
@@ -3,43 +3,463 @@
 功能：添加水印 + 图片压缩
 """
 
+import hashlib
+import io
+import json
 import os
 import sys
-from PIL import Image, ImageDraw, ImageFont
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from PIL import Image, ImageDraw, ImageFont, features
 import argparse
 import random
+from functools import lru_cache
+from pathlib import Path
+
+import numpy as np
+
+# 把项目根目录添加到系统路径
+project_dir = str(Path(__file__).resolve().parents[2])
+sys.path.append(project_dir)
+from src.utils.profiling import profiled, stage
+
+# PNG 量化策略
+QUANTIZE_METHODS = {
+    "octree": Image.Quantize.FASTOCTREE,
+    "mediancut": Image.Quantize.MEDIANCUT,
+    "libimagequant": Image.Quantize.LIBIMAGEQUANT,
+}
+COMPRESS_STRATEGIES = ["octree", "mediancut", "libimagequant", "palette"]
+
+# 图表配色：matplotlib 默认色环（tab10）、饼图的 Paired 色系和条形图的橙色
+CHART_COLORS = [
+    "#1F77B4", "#FF7F0E", "#2CA02C", "#D62728", "#9467BD",
+    "#8C564B", "#E377C2", "#7F7F7F", "#BCBD22", "#17BECF",
+    "#A6CEE3", "#1F78B4", "#B2DF8A", "#33A02C", "#FB9A99", "#E31A1C",
+    "#FDBF6F", "#FF7F00", "#CAB2D6", "#6A3D9A", "#FFFF99", "#B15928",
+    "#FFA500",
+]  # fmt: skip
+
+
+@lru_cache(maxsize=None)
+def chart_palette():
+    """
+    图表共用的固定调色板及其查找表
+    调色板包含每种图表颜色与白色按不同比例混合的颜色（抗锯齿边缘、浅色水印）和一条灰阶
+    :return: (调色板 uint8[N, 3], 查找表 uint8[32, 32, 32])，查找表按 RGB 高 5 位索引
+    """
+    base = np.array(
+        [[int(c[i : i + 2], 16) for i in (1, 3, 5)] for c in CHART_COLORS], dtype=float
+    )
+    mixed = [base * t + 255 * (1 - t) for t in (1.0, 0.75, 0.5, 0.25)]
+    gray = np.repeat(np.linspace(0, 255, 64)[:, None], 3, axis=1)
+    palette = np.rint(np.concatenate(mixed + [gray])).astype(np.uint8)
+
+    # 每个 5 位 RGB 格子按 0-255 均匀展开后找最近的调色板颜色，
+    # 两端的格子恰好是 0 和 255，纯白背景和黑色文字映射为调色板中的纯白和纯黑
+    centers = np.rint(np.arange(32) * 255 / 31)
+    grid = np.stack(np.meshgrid(centers, centers, centers, indexing="ij"), axis=-1)
+    distances = ((grid.reshape(-1, 1, 3) - palette[None, :, :].astype(int)) ** 2).sum(
+        axis=-1
+    )
+    lut = distances.argmin(axis=1).astype(np.uint8).reshape(32, 32, 32)
+    return palette, lut
 
 
-def compress_image(image, output_path, quality=85, optimize=True):
+def quantize_image(image, quality=85, strategy="octree"):
+    """
+    把图片量化为调色板图片
+    :param quality: 压缩质量 (1-100)，决定自适应调色板的颜色数；palette 策略忽略该参数
+    :param strategy: octree(快速八叉树), mediancut(中位切分), libimagequant, palette(图表固定调色板)
+    :return: P 模式的 PIL Image
+    """
+    if image.mode != "RGB":
+        image = image.convert("RGB")
+
+    if strategy == "palette":
+        # 用查找表逐像素映射到固定调色板，全程向量化
+        palette, lut = chart_palette()
+        pixels = np.asarray(image) >> 3
+        indices = lut[pixels[..., 0], pixels[..., 1], pixels[..., 2]]
+        quantized = Image.fromarray(indices, "P")
+        quantized.putpalette(palette.tobytes())
+        return quantized
+
+    # 根据quality调整量化参数
+    # quality越高，保留的颜色越多，压缩率越低
+    colors = max(2, min(256, int(256 * (quality / 100))))
+
+    method = QUANTIZE_METHODS[strategy]
+    try:
+        return image.quantize(colors=colors, method=method, kmeans=0, palette=None)
+    except ValueError:
+        # Pillow 未编译 libimagequant 时退回快速八叉树
+        return image.quantize(
+            colors=colors, method=Image.Quantize.FASTOCTREE, kmeans=0, palette=None
+        )
+
+
+def compress_image(
+    image,
+    output_path,
+    quality=85,
+    optimize=True,
+    strategy="octree",
+    compress_level=6,
+):
     """
     压缩图片并保存
     :param image: PIL Image对象
     :param output_path: 输出路径
     :param quality: 压缩质量 (1-100)
     :param optimize: 是否优化
+    :param strategy: PNG 量化策略，见 quantize_image
+    :param compress_level: PNG 的 zlib 压缩级别 (0-9)，越低越快
     :return: None
+    保存失败时直接抛出异常，由调用方记为失败
     """
-    try:
-        if output_path.lower().endswith((".jpg", ".jpeg")):
-            image.save(output_path, quality=quality, optimize=optimize)
-        elif output_path.lower().endswith(".png"):
-            # 使用量化和调色板优化实现PNG有损压缩
-            if image.mode != "RGB":
-                image = image.convert("RGB")
-
-            # 根据quality调整量化参数
-            # quality越高，保留的颜色越多，压缩率越低
-            colors = max(2, min(256, int(256 * (quality / 100))))
-
-            # 使用自适应调色板进行量化
-            image = image.quantize(colors=colors, method=2, kmeans=0, palette=None)
-
-            # 保存PNG，使用zlib压缩级别6（平衡速度和大小）
-            image.save(output_path, compress_level=6)
+    if output_path.lower().endswith((".jpg", ".jpeg")):
+        image.save(output_path, quality=quality, optimize=optimize)
+    elif output_path.lower().endswith(".png"):
+        # 使用量化和调色板优化实现PNG有损压缩
+        image = quantize_image(image, quality=quality, strategy=strategy)
+        image.save(output_path, compress_level=compress_level)
+    else:
+        image.save(output_path)
+
+
+def benchmark_compression(
+    image, quality=85, strategies=COMPRESS_STRATEGIES, compress_levels=(1, 6, 9)
+):
+    """
+    对比各量化策略和压缩级别的 PNG 大小与耗时
+    :return: [{"strategy", "compress_level", "bytes", "quantize_ms", "encode_ms"}]
+    """
+    results = []
+    for strategy in strategies:
+        if strategy == "libimagequant" and not features.check_feature("libimagequant"):
+            print("提示: Pillow 未启用 libimagequant，跳过该策略")
+            continue
+        start = time.perf_counter()
+        quantized = quantize_image(image, quality=quality, strategy=strategy)
+        quantize_ms = (time.perf_counter() - start) * 1000
+        for level in compress_levels:
+            buffer = io.BytesIO()
+            start = time.perf_counter()
+            quantized.save(buffer, format="PNG", compress_level=level)
+            results.append(
+                {
+                    "strategy": strategy,
+                    "compress_level": level,
+                    "bytes": buffer.tell(),
+                    "quantize_ms": quantize_ms,
+                    "encode_ms": (time.perf_counter() - start) * 1000,
+                }
+            )
+    return results
+
+
+def open_image(source):
+    """
+    把各种图片来源统一转换为 RGBA 的 PIL Image
+    :param source: 文件路径、BytesIO/bytes、numpy 数组（H×W×3 或 H×W×4）或 PIL Image
+    """
+    if isinstance(source, Image.Image):
+        return source.convert("RGBA")
+    if isinstance(source, np.ndarray):
+        return Image.fromarray(np.ascontiguousarray(source)).convert("RGBA")
+    if isinstance(source, (bytes, bytearray)):
+        source = io.BytesIO(source)
+    with Image.open(source) as img:
+        return img.convert("RGBA")
+
+
+FONT_PATHS = [
+    "C:/Windows/Fonts/simhei.ttf",
+    "C:/Windows/Fonts/simsun.ttc",
+    "/System/Library/Fonts/PingFang.ttc",
+    "/usr/share/fonts/truetype/wqy/wqy-microhei.ttc",
+]
+
+COLOR_MAP = {
+    "white": (255, 255, 255),
+    "black": (0, 0, 0),
+    "gray": (128, 128, 128),
+    "lightgray": (211, 211, 211),
+    "darkgray": (169, 169, 169),
+    "silver": (192, 192, 192),
+}
+
+
+# random 模式最多盖章的次数，避免大图上文字过密
+MAX_RANDOM_STAMPS = 2000
+
+
+@lru_cache(maxsize=None)
+def load_font(font_size):
+    """按字号加载中文字体，进程内缓存，每个字号只探测一次字体路径"""
+    for font_path in FONT_PATHS:
+        try:
+            return ImageFont.truetype(font_path, font_size)
+        except (IOError, OSError):
+            continue
+
+    print("警告: 未找到中文字体，使用默认字体。可能无法正确显示中文。")
+    return ImageFont.load_default()
+
+
+@lru_cache(maxsize=64)
+def _text_stamp(watermark_text, font, fill_color):
+    """
+    把文字栅格化为紧贴文字边界的小图，按文字、字体和颜色缓存（每个只有几 KB）
+    :return: (只读 RGBA 数组, 文字相对绘制原点的偏移)
+    """
+    bbox = ImageDraw.Draw(Image.new("RGBA", (1, 1))).textbbox(
+        (0, 0), watermark_text, font=font
+    )
+    stamp = Image.new("RGBA", (bbox[2] - bbox[0], bbox[3] - bbox[1]), (0, 0, 0, 0))
+    ImageDraw.Draw(stamp).text(
+        (-bbox[0], -bbox[1]), watermark_text, font=font, fill=fill_color
+    )
+    return np.asarray(stamp), (bbox[0], bbox[1])
+
+
+def _place_stamp(layer, stamp, x, y):
+    """把文字小图盖到水印层 (x, y) 处，超出边界的部分裁掉"""
+    height, width = layer.shape[:2]
+    top, left = max(y, 0), max(x, 0)
+    bottom = min(y + stamp.shape[0], height)
+    right = min(x + stamp.shape[1], width)
+    if top >= bottom or left >= right:
+        return
+    patch = stamp[top - y : bottom - y, left - x : right - x]
+    region = layer[top:bottom, left:right]
+    region[:] = np.where(patch[..., 3:] > 0, patch, region)
+
+
+def _render_layer(size, watermark_text, opacity, scale, angle, position, color):
+    """绘制与图片同尺寸的水印层"""
+    width, height = size
+
+    # 字体处理
+    min_font_size = 10
+    max_font_size = 50
+    font_size = int(width * scale / len(watermark_text))
+    font_size = max(min(font_size, max_font_size), min_font_size)
+    font = load_font(font_size)
+
+    # 颜色处理
+    if isinstance(color, str):
+        rgb_color = COLOR_MAP.get(color.lower(), (128, 128, 128))
+    else:
+        rgb_color = tuple(color)
+
+    fill_color = (*rgb_color, int(opacity * 2.55))  # 转换为0-255范围
+
+    # 文字只栅格化一次，之后按位置盖章
+    stamp, (offset_x, offset_y) = _text_stamp(watermark_text, font, fill_color)
+    stamp_height, stamp_width = stamp.shape[:2]
+    layer = np.zeros((height, width, 4), dtype=np.uint8)
+
+    # 水印位置处理
+    if position == "tiled":
+        step_x = stamp_width + int(stamp_width * 0.2)
+        step_y = stamp_height + int(stamp_height * 0.2)
+
+        # 一个单元格盖一次章，整层用 np.tile 平铺，再按文字偏移整体平移
+        tile = np.zeros((step_y, step_x, 4), dtype=np.uint8)
+        tile[:stamp_height, :stamp_width] = stamp
+        repeats = (-(-height // step_y) + 1, -(-width // step_x) + 1, 1)
+        grid = np.tile(tile, repeats)
+        top, left = max(offset_y, 0), max(offset_x, 0)
+        layer[top:, left:] = grid[
+            top - offset_y : height - offset_y, left - offset_x : width - offset_x
+        ]
+
+    elif position == "center":
+        x = int((width - stamp_width) / 2) + offset_x
+        y = int((height - stamp_height) / 2) + offset_y
+        _place_stamp(layer, stamp, x, y)
+
+    elif position == "random":
+        count = min(int(width * height / 10000), MAX_RANDOM_STAMPS)
+        for _ in range(count):
+            x = int(width * random.random()) + offset_x
+            y = int(height * random.random()) + offset_y
+            _place_stamp(layer, stamp, x, y)
+
+    watermark = Image.fromarray(layer, "RGBA")
+
+    # 旋转水印
+    if angle != 0:
+        watermark = watermark.rotate(angle, expand=True)
+        watermark = watermark.resize(size, Image.BICUBIC)
+
+    return watermark
+
+
+# 整层水印按像素尺寸缓存：bbox_inches="tight" 保存的图表尺寸几乎各不相同，
+# 每层又有几十 MB，只保留最近两层，供同尺寸的连续图片（如目录模式）复用
+_cached_layer = lru_cache(maxsize=2)(_render_layer)
+
+
+def watermark_layer(
+    size,
+    watermark_text,
+    opacity=30,
+    scale=0.8,
+    angle=30,
+    position="tiled",
+    color="gray",
+):
+    """
+    获取水印层，文字小图总是复用缓存，与最近的图片尺寸和参数相同时整层复用缓存
+    random 模式每次位置不同，不做整层缓存
+    """
+    if not isinstance(color, str):
+        color = tuple(color)
+    args = (tuple(size), watermark_text, opacity, scale, angle, position, color)
+    if position == "random":
+        return _render_layer(*args)
+    return _cached_layer(*args)
+
+
+@profiled("watermark")
+def apply_watermark(
+    img,
+    watermark_text,
+    opacity=30,
+    scale=0.8,
+    angle=30,
+    position="tiled",
+    color="gray",
+):
+    """
+    在内存中给图片添加水印
+    :param img: RGBA 的 PIL Image
+    :return: 合并水印后的 RGBA Image
+    """
+    watermark = watermark_layer(
+        img.size, watermark_text, opacity, scale, angle, position, color
+    )
+
+    # 合并水印
+    return Image.alpha_composite(img, watermark)
+
+
+VARIANT_EXTENSIONS = {"PNG": ".png", "JPEG": ".jpg", "WEBP": ".webp"}
+
+
+def variant_path(output_path, target):
+    """输出目标的默认路径：原文件名 + _最大边长 + 格式扩展名"""
+    if target.get("path"):
+        return target["path"]
+    stem = os.path.splitext(output_path)[0]
+    suffix = f"_{target['max_size']}" if target.get("max_size") else ""
+    return stem + suffix + VARIANT_EXTENSIONS[target["format"].upper()]
+
+
+def variant_paths(output_path, targets):
+    """
+    所有输出目标的路径
+    与主输出或彼此重名的目标会互相覆盖（如主输出为 PNG 时不限尺寸的 png 目标），直接报错
+    """
+    seen = {os.path.normcase(os.path.abspath(output_path)): output_path}
+    paths = []
+    for target in targets or []:
+        path = variant_path(output_path, target)
+        key = os.path.normcase(os.path.abspath(path))
+        if key in seen:
+            raise ValueError(
+                f"输出目标 {target['format']} 的路径与 {seen[key]} 重复，"
+                "请指定最大边长或 path"
+            )
+        seen[key] = path
+        paths.append(path)
+    return paths
+
+
+def _downscale(image, max_size):
+    """先用 reduce 做整数倍快速缩小，再用 LANCZOS 缩放到目标尺寸"""
+    width, height = image.size
+    ratio = max_size / max(width, height)
+    if ratio >= 1:
+        return image
+    size = (max(1, round(width * ratio)), max(1, round(height * ratio)))
+    factor = int(1 / ratio)
+    if factor >= 2:
+        image = image.reduce(factor)
+    return image.resize(size, Image.LANCZOS)
+
+
+def export_variants(image, targets, output_path, strategy="octree", compress_level=6):
+    """
+    从同一张已解码的图片导出多种格式和尺寸
+    目标按尺寸从大到小处理，每个尺寸都由上一个尺寸继续缩小，原图只解码一次
+    :param targets: [{"format": PNG/JPEG/WEBP, "max_size": 最大边长或 None, "quality": 1-100, "path": 可选}]
+    :return: 写出的文件路径列表
+    """
+    ordered = sorted(targets, key=lambda t: -(t.get("max_size") or max(image.size)))
+    paths = variant_paths(output_path, ordered)
+    current = image
+    for target, path in zip(ordered, paths):
+        fmt = target["format"].upper()
+        quality = target.get("quality", 85)
+        if target.get("max_size"):
+            current = _downscale(current, target["max_size"])
+
+        if fmt == "PNG":
+            quantize_image(current, quality=quality, strategy=strategy).save(
+                path, compress_level=compress_level
+            )
+        elif fmt == "JPEG":
+            current.convert("RGB").save(path, "JPEG", quality=quality, optimize=True)
+        elif fmt == "WEBP":
+            current.save(path, "WEBP", quality=quality, method=4)
         else:
-            image.save(output_path)
-    except Exception as e:
-        print(f"压缩图片时出错: {output_path} - {e}")
+            raise ValueError(f"不支持的输出格式: {fmt}")
+    return paths
+
+
+@profiled("save_image")
+def save_image(
+    image,
+    output_path,
+    compress=False,
+    quality=85,
+    strategy="octree",
+    compress_level=6,
+    targets=None,
+):
+    """
+    按输出格式保存图片，可选压缩
+    :param targets: 额外的输出目标，见 export_variants
+    """
+    # 额外输出目标都从水印合并后的原尺寸图片导出
+    if targets:
+        export_variants(
+            image,
+            targets,
+            output_path,
+            strategy=strategy,
+            compress_level=compress_level,
+        )
+
+    # 处理输出格式
+    if output_path.lower().endswith((".jpg", ".jpeg")):
+        image = image.convert("RGB")
+
+    # 压缩处理
+    if compress:
+        compress_image(
+            image,
+            output_path,
+            quality=quality,
+            strategy=strategy,
+            compress_level=compress_level,
+        )
+    else:
+        image.save(output_path)
 
 
 def add_watermark(
@@ -53,138 +473,235 @@ def add_watermark(
     color="gray",
     compress=False,
     quality=85,
+    strategy="octree",
+    compress_level=6,
+    targets=None,
 ):
     """
     添加水印并可选压缩图片
+    :param image_path: 图片路径，也可以是 BytesIO、numpy 数组或 PIL Image
+    :param targets: 额外的输出格式和尺寸，见 export_variants
+    :return: 是否处理成功
     """
     try:
-        with Image.open(image_path).convert("RGBA") as img:
-            width, height = img.size
-
-            # 创建水印层
-            watermark = Image.new("RGBA", img.size, (0, 0, 0, 0))
-            draw = ImageDraw.Draw(watermark)
-
-            # 字体处理
-            font = None
-            for font_path in [
-                "C:/Windows/Fonts/simhei.ttf",
-                "C:/Windows/Fonts/simsun.ttc",
-                "/System/Library/Fonts/PingFang.ttc",
-                "/usr/share/fonts/truetype/wqy/wqy-microhei.ttc",
-            ]:
-                try:
-                    min_font_size = 10
-                    max_font_size = 50
-                    font_size = int(width * scale / len(watermark_text))
-                    font_size = max(min(font_size, max_font_size), min_font_size)
-                    font = ImageFont.truetype(font_path, font_size)
-                    break
-                except (IOError, OSError):
-                    continue
-
-            if font is None:
-                try:
-                    font = ImageFont.load_default()
-                    print("警告: 未找到中文字体，使用默认字体。可能无法正确显示中文。")
-                except Exception as e:
-                    print(f"错误: 无法加载字体 - {e}")
-                    return
-
-            # 颜色处理
-            if isinstance(color, str):
-                color_map = {
-                    "white": (255, 255, 255),
-                    "black": (0, 0, 0),
-                    "gray": (128, 128, 128),
-                    "lightgray": (211, 211, 211),
-                    "darkgray": (169, 169, 169),
-                    "silver": (192, 192, 192),
-                }
-                rgb_color = color_map.get(color.lower(), (128, 128, 128))
-            else:
-                rgb_color = color
-
-            fill_color = (*rgb_color, int(opacity * 2.55))  # 转换为0-255范围
-
-            # 水印位置处理
-            if position == "tiled":
-                bbox = draw.textbbox((0, 0), watermark_text, font=font)
-                text_width = bbox[2] - bbox[0]
-                text_height = bbox[3] - bbox[1]
-
-                step_x = text_width + int(text_width * 0.2)
-                step_y = text_height + int(text_height * 0.2)
-
-                for x in range(0, width, step_x):
-                    for y in range(0, height, step_y):
-                        draw.text((x, y), watermark_text, font=font, fill=fill_color)
-
-            elif position == "center":
-                bbox = draw.textbbox((0, 0), watermark_text, font=font)
-                text_width = bbox[2] - bbox[0]
-                text_height = bbox[3] - bbox[1]
-                x = (width - text_width) / 2
-                y = (height - text_height) / 2
-                draw.text((x, y), watermark_text, font=font, fill=fill_color)
-
-            elif position == "random":
-                for _ in range(int(width * height / 10000)):
-                    x = int(width * random.random())
-                    y = int(height * random.random())
-                    draw.text((x, y), watermark_text, font=font, fill=fill_color)
-
-            # 旋转水印
-            if angle != 0:
-                watermark = watermark.rotate(angle, expand=True)
-                watermark = watermark.resize(img.size, Image.BICUBIC)
-
-            # 合并水印
-            merged = Image.alpha_composite(img.convert("RGBA"), watermark)
-
-            # 处理输出格式
-            if output_path.lower().endswith((".jpg", ".jpeg")):
-                merged = merged.convert("RGB")
-
-            # 压缩处理
-            if compress:
-                compress_image(merged, output_path, quality=quality)
-            else:
-                merged.save(output_path)
-
-            print(f"已处理: {image_path} -> {output_path}")
+        merged = apply_watermark(
+            open_image(image_path),
+            watermark_text,
+            opacity=opacity,
+            scale=scale,
+            angle=angle,
+            position=position,
+            color=color,
+        )
+        save_image(
+            merged,
+            output_path,
+            compress=compress,
+            quality=quality,
+            strategy=strategy,
+            compress_level=compress_level,
+            targets=targets,
+        )
+        print(f"已处理: {image_path} -> {output_path}")
+        return True
 
     except Exception as e:
         print(f"处理图片时出错: {image_path} - {e}")
+        return False
+
+
+def watermark_figure(
+    fig,
+    output_path,
+    watermark_text,
+    dpi=300,
+    bbox_inches="tight",
+    compress=True,
+    quality=85,
+    strategy="octree",
+    compress_level=6,
+    targets=None,
+    **kwargs,
+):
+    """
+    渲染 matplotlib 图表 → 添加水印 → 压缩，全程在内存中完成，只写一次文件
+    :param fig: matplotlib Figure
+    :param targets: 额外的输出格式和尺寸，见 export_variants
+    :param kwargs: 传给 apply_watermark 的水印参数
+    """
+    with stage("savefig", dpi=dpi):
+        if bbox_inches is None:
+            # 不裁剪时直接取画布的 RGBA 数组
+            fig.set_dpi(dpi)
+            fig.canvas.draw()
+            img = open_image(np.asarray(fig.canvas.buffer_rgba()))
+        else:
+            # 裁剪白边需要走 savefig，用不压缩的 PNG 作为中间缓冲，编码几乎不耗时
+            buffer = io.BytesIO()
+            fig.savefig(
+                buffer,
+                format="png",
+                dpi=dpi,
+                bbox_inches=bbox_inches,
+                pil_kwargs={"compress_level": 0},
+            )
+            buffer.seek(0)
+            img = open_image(buffer)
+
+    merged = apply_watermark(img, watermark_text, **kwargs)
+    save_image(
+        merged,
+        output_path,
+        compress=compress,
+        quality=quality,
+        strategy=strategy,
+        compress_level=compress_level,
+        targets=targets,
+    )
+
+
+MANIFEST_NAME = ".watermark_manifest.json"
+
+
+def _file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _load_manifest(path):
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_manifest(path, manifest):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, path)
+
+
+def _watermark_file(task):
+    """工作进程入口：处理单张图片并计时"""
+    filename, input_path, output_path, watermark_text, options = task
+    start = time.perf_counter()
+    ok = add_watermark(input_path, output_path, watermark_text, **options)
+    return filename, ok, time.perf_counter() - start
 
 
 def process_directory(
-    input_dir, output_dir, watermark_text, compress=False, quality=85, **kwargs
+    input_dir,
+    output_dir,
+    watermark_text,
+    compress=False,
+    quality=85,
+    jobs=1,
+    force=False,
+    **kwargs,
 ):
     """
     处理目录中的所有图片
+    输出目录中的清单记录每张图片的输入哈希和参数，两者都未变化且输出（含额外输出目标）都存在时跳过
+    :param jobs: 并行进程数
+    :param force: 忽略清单，全部重新处理
+    :return: [{"file": 文件名, "status": processed/skipped/failed, "seconds": 耗时}]
     """
     os.makedirs(output_dir, exist_ok=True)
     image_extensions = (".jpg", ".jpeg", ".png", ".bmp", ".tiff", ".gif")
 
-    for filename in os.listdir(input_dir):
+    options = dict(kwargs, compress=compress, quality=quality)
+    params = json.dumps([watermark_text, options], sort_keys=True, default=list)
+    params_hash = hashlib.sha256(params.encode("utf-8")).hexdigest()
+
+    manifest_path = os.path.join(output_dir, MANIFEST_NAME)
+    manifest = {} if force else _load_manifest(manifest_path)
+
+    results = []
+    tasks = []
+    input_hashes = {}
+    for filename in sorted(os.listdir(input_dir)):
         if filename.lower().endswith(image_extensions):
             input_path = os.path.join(input_dir, filename)
             output_path = os.path.join(output_dir, filename)
-            add_watermark(
-                input_path,
-                output_path,
-                watermark_text,
-                compress=compress,
-                quality=quality,
-                **kwargs,
-            )
+            input_hashes[filename] = _file_sha256(input_path)
+            entry = manifest.get(filename)
+            try:
+                outputs = [output_path] + variant_paths(
+                    output_path, options.get("targets")
+                )
+            except ValueError:
+                # 路径冲突时不跳过，交给 add_watermark 报错并记为失败
+                outputs = None
+            if (
+                outputs
+                and entry == {"input": input_hashes[filename], "params": params_hash}
+                and all(os.path.exists(path) for path in outputs)
+            ):
+                results.append({"file": filename, "status": "skipped", "seconds": 0.0})
+                continue
+            tasks.append((filename, input_path, output_path, watermark_text, options))
+
+    def record(filename, ok, seconds):
+        status = "processed" if ok else "failed"
+        results.append({"file": filename, "status": status, "seconds": seconds})
+        if ok:
+            manifest[filename] = {
+                "input": input_hashes[filename],
+                "params": params_hash,
+            }
+        else:
+            manifest.pop(filename, None)
+
+    try:
+        if jobs > 1 and len(tasks) > 1:
+            with ProcessPoolExecutor(max_workers=jobs) as executor:
+                futures = {
+                    executor.submit(_watermark_file, task): task for task in tasks
+                }
+                for done, future in enumerate(as_completed(futures), 1):
+                    try:
+                        record(*future.result())
+                    except Exception as e:
+                        # 工作进程崩溃（BrokenProcessPool）时受影响的文件记为失败，其余照常汇总
+                        filename = futures[future][0]
+                        print(f"处理图片时出错: {filename} - {e!r}")
+                        record(filename, False, 0.0)
+                    # 定期落盘，中断后可以从这里继续
+                    if done % 50 == 0:
+                        _save_manifest(manifest_path, manifest)
+        else:
+            for task in tasks:
+                record(*_watermark_file(task))
+    finally:
+        _save_manifest(manifest_path, manifest)
+
+    return results
+
+
+def print_summary(results):
+    """打印目录处理的汇总和每个文件的耗时"""
+    for result in sorted(results, key=lambda r: r["file"]):
+        print(f"  {result['status']:<9} {result['seconds']:8.3f}s  {result['file']}")
+    counts = {
+        status: sum(r["status"] == status for r in results)
+        for status in ("processed", "skipped", "failed")
+    }
+    total = sum(r["seconds"] for r in results)
+    print(
+        f"共 {len(results)} 个文件: 处理 {counts['processed']}, "
+        f"跳过 {counts['skipped']}, 失败 {counts['failed']}, 总耗时 {total:.2f}s"
+    )
 
 
 def main():
     parser = argparse.ArgumentParser(description="图片水印工具（带压缩功能）")
     parser.add_argument("-i", "--input", required=True, help="输入图片路径或目录")
-    parser.add_argument("-o", "--output", required=True, help="输出图片路径或目录")
+    parser.add_argument("-o", "--output", help="输出图片路径或目录")
     parser.add_argument("-t", "--text", required=True, help="水印文字")
     parser.add_argument(
         "-a", "--alpha", type=int, default=30, help="水印透明度 (0-100), 默认: 30"
@@ -215,6 +732,42 @@ def main():
         default=85,
         help="压缩质量 (1-100), 默认: 85 (仅当启用压缩时有效)",
     )
+    parser.add_argument(
+        "--strategy",
+        choices=COMPRESS_STRATEGIES,
+        default="octree",
+        help="PNG量化策略: octree(快速八叉树), mediancut(中位切分), libimagequant, palette(图表固定调色板), 默认: octree",
+    )
+    parser.add_argument(
+        "--compress-level",
+        type=int,
+        default=6,
+        help="PNG的zlib压缩级别 (0-9), 越低越快, 默认: 6",
+    )
+    parser.add_argument(
+        "--variant",
+        action="append",
+        default=[],
+        metavar="FORMAT[:MAX_SIZE[:QUALITY]]",
+        help="额外输出的格式和尺寸，可重复，如 webp:1080:80 jpeg:320:70",
+    )
+    parser.add_argument(
+        "--benchmark",
+        action="store_true",
+        help="对输入图片加水印后比较各压缩策略的大小和耗时，不写出文件",
+    )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=1,
+        help="目录模式下的并行进程数, 默认: 1",
+    )
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="目录模式下忽略清单，重新处理所有图片",
+    )
 
     args = parser.parse_args()
 
@@ -231,9 +784,51 @@ def main():
             print("警告: 无法解析颜色参数，使用默认灰色。")
             args.color = "gray"
 
+    # 处理额外输出目标
+    targets = []
+    for spec in args.variant:
+        parts = spec.split(":")
+        if parts[0].upper() not in VARIANT_EXTENSIONS:
+            parser.error(f"不支持的输出格式: {parts[0]}")
+        targets.append(
+            {
+                "format": parts[0].upper(),
+                "max_size": int(parts[1]) if len(parts) > 1 and parts[1] else None,
+                "quality": int(parts[2]) if len(parts) > 2 else 85,
+            }
+        )
+
+    if args.benchmark:
+        if not os.path.isfile(args.input):
+            print(f"错误: 基准测试需要输入单张图片 - {args.input}")
+            sys.exit(1)
+        merged = apply_watermark(
+            open_image(args.input),
+            args.text,
+            opacity=args.alpha,
+            scale=args.scale,
+            angle=args.rotate,
+            position=args.position,
+            color=args.color,
+        )
+        print(f"{'策略':<14}{'级别':>4}{'字节':>12}{'量化ms':>10}{'编码ms':>10}")
+        for r in benchmark_compression(merged, quality=args.quality):
+            print(
+                f"{r['strategy']:<14}{r['compress_level']:>6}{r['bytes']:>14}"
+                f"{r['quantize_ms']:>12.1f}{r['encode_ms']:>12.1f}"
+            )
+        return
+
+    if args.output is None:
+        parser.error("需要指定 -o/--output")
+
     # 处理输入输出
     if os.path.isfile(args.input):
-        add_watermark(
+        try:
+            variant_paths(args.output, targets)
+        except ValueError as e:
+            parser.error(str(e))
+        ok = add_watermark(
             args.input,
             args.output,
             args.text,
@@ -244,20 +839,33 @@ def main():
             color=args.color,
             compress=args.compress,
             quality=args.quality,
+            strategy=args.strategy,
+            compress_level=args.compress_level,
+            targets=targets,
         )
+        if not ok:
+            sys.exit(1)
     elif os.path.isdir(args.input):
-        process_directory(
+        results = process_directory(
             args.input,
             args.output,
             args.text,
             compress=args.compress,
             quality=args.quality,
+            strategy=args.strategy,
+            compress_level=args.compress_level,
+            targets=targets,
             opacity=args.alpha,
             scale=args.scale,
             angle=args.rotate,
             position=args.position,
             color=args.color,
+            jobs=args.jobs,
+            force=args.force,
         )
+        print_summary(results)
+        if any(r["status"] == "failed" for r in results):
+            sys.exit(1)
     else:
         print(f"错误: 输入路径不存在 - {args.input}")
         sys.exit(1)
@@ -0,0 +1,62 @@
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# 把项目根目录添加到系统路径
+project_dir = str(Path(__file__).resolve().parents[1])
+sys.path.append(project_dir)
+from src.utils.correct import key_columns, merge_scores, questionnaire_key_columns
+
+MACHINE = "复试机试成绩（总分160）（必填）"
+INTERVIEW = "复试面试成绩（总分150）（必填）"
+
+
+def _scores(keys, machine, interview):
+    df = pd.DataFrame(keys, columns=key_columns)
+    df["机试原始分"] = machine
+    df["面试成绩"] = interview
+    df["姓名"] = [f"考生{i}" for i in range(len(df))]
+    return df
+
+
+def _questionnaire(keys):
+    df = pd.DataFrame(keys, columns=questionnaire_key_columns)
+    df[MACHINE] = np.nan
+    df[INTERVIEW] = np.nan
+    return df
+
+
+def test_scores_are_filled_by_composite_key():
+    scores = _scores(
+        [(70, 80, 130, 120, 400), (60, 70, 120, 110, 360), (50, 50, 50, 50, 200)],
+        [150, 90, 10],
+        [140, 100, 20],
+    )
+    questionnaire = _questionnaire(
+        [(60, 70, 120, 110, 360), (70, 80, 130, 120, 400), (65, 65, 100, 100, 330)]
+    )
+
+    merged, ambiguous, score_ambiguous = merge_scores(scores, questionnaire)
+
+    assert merged[MACHINE].tolist()[:2] == [90, 150]
+    assert merged[INTERVIEW].tolist()[:2] == [100, 140]
+    assert merged["姓名"].tolist()[:2] == ["考生1", "考生0"]
+    # 未匹配的问卷行保持原值
+    assert np.isnan(merged.loc[2, MACHINE])
+    assert ambiguous.empty and score_ambiguous.empty
+
+
+def test_duplicate_keys_on_both_sides_are_reported():
+    key = (70, 80, 130, 120, 400)
+    scores = _scores([key, key], [100, 150], [110, 140])
+    questionnaire = _questionnaire([key, key])
+
+    merged, ambiguous, score_ambiguous = merge_scores(scores, questionnaire)
+
+    # 问卷只更新第一行，成绩单取最后一行
+    assert merged.loc[0, MACHINE] == 150
+    assert np.isnan(merged.loc[1, MACHINE])
+    assert len(ambiguous) == 2
+    assert len(score_ambiguous) == 2
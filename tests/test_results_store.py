@@ -0,0 +1,48 @@
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+# 把项目根目录添加到系统路径
+project_dir = str(Path(__file__).resolve().parents[1])
+sys.path.append(project_dir)
+from src.utils import results_store
+
+COLUMN = "复试机试成绩（总分160）（必填）"
+
+
+@pytest.fixture
+def conn(tmp_path, monkeypatch):
+    questionnaire = pd.DataFrame(
+        {
+            "院系所码与名称": ["013-计算学部"] * 5,
+            "完整专业代码": ["013-081200-00"] * 5,
+            COLUMN: [101, 160, "未参加", 27, np.nan],
+        },
+        dtype=object,
+    )
+    source = tmp_path / "问卷.xlsx"
+    source.write_bytes(b"placeholder")
+    monkeypatch.setitem(
+        results_store.TABLES, "questionnaire", lambda path: questionnaire
+    )
+
+    conn = results_store.connect(str(tmp_path / "results.sqlite"))
+    results_store.ingest_table(conn, "questionnaire", 2025, str(source))
+    yield conn
+    conn.close()
+
+
+def test_text_answer_in_score_column_is_ignored(conn):
+    stats = results_store.score_stats(conn, COLUMN, "questionnaire")
+    row = stats.iloc[0]
+    assert (row["人数"], row["最低分"], row["最高分"]) == (3, 27, 160)
+    assert row["中位数"] == 101
+
+
+def test_histogram_does_not_bin_text_answers(conn):
+    hist = results_store.score_histogram(conn, COLUMN, "questionnaire", bin_size=10)
+    assert hist["人数"].sum() == 3
+    assert "[0,10)" not in set(hist["分数段"])
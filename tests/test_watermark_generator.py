@@ -0,0 +1,109 @@
+import json
+import os
+import sys
+from pathlib import Path
+
+import pytest
+from PIL import Image
+
+# 把项目根目录添加到系统路径
+project_dir = str(Path(__file__).resolve().parents[1])
+sys.path.append(project_dir)
+from src.utils import watermark_generator
+from src.utils.watermark_generator import (
+    MANIFEST_NAME,
+    add_watermark,
+    process_directory,
+    quantize_image,
+    variant_paths,
+)
+
+
+def _write_image(path):
+    Image.new("RGB", (64, 48), (255, 255, 255)).save(path)
+
+
+def test_compressed_save_failure_is_reported(tmp_path):
+    input_path = str(tmp_path / "in.png")
+    _write_image(input_path)
+    output_path = str(tmp_path / "missing_dir" / "out.png")
+
+    assert add_watermark(input_path, output_path, "x", compress=True) is False
+    assert add_watermark(input_path, output_path, "x", compress=False) is False
+
+
+def test_directory_mode_does_not_record_failed_compressed_file(tmp_path):
+    input_dir = tmp_path / "in"
+    output_dir = tmp_path / "out"
+    input_dir.mkdir()
+    _write_image(input_dir / "a.png")
+    _write_image(input_dir / "b.png")
+    # 输出路径被同名目录占用，压缩保存时会失败
+    (output_dir / "b.png").mkdir(parents=True)
+
+    results = process_directory(str(input_dir), str(output_dir), "x", compress=True)
+
+    status = {r["file"]: r["status"] for r in results}
+    assert status == {"a.png": "processed", "b.png": "failed"}
+    with open(os.path.join(output_dir, MANIFEST_NAME), encoding="utf-8") as f:
+        assert list(json.load(f)) == ["a.png"]
+
+
+def test_variant_colliding_with_main_output_is_rejected(tmp_path):
+    output_path = str(tmp_path / "out.png")
+    with pytest.raises(ValueError):
+        variant_paths(output_path, [{"format": "PNG", "max_size": None}])
+    assert variant_paths(output_path, [{"format": "PNG", "max_size": 320}]) == [
+        str(tmp_path / "out_320.png")
+    ]
+
+
+def test_directory_mode_regenerates_deleted_variant(tmp_path):
+    input_dir = tmp_path / "in"
+    output_dir = tmp_path / "out"
+    input_dir.mkdir()
+    _write_image(input_dir / "a.png")
+    targets = [{"format": "WEBP", "max_size": 32, "quality": 80}]
+
+    results = process_directory(str(input_dir), str(output_dir), "x", targets=targets)
+    assert [r["status"] for r in results] == ["processed"]
+    results = process_directory(str(input_dir), str(output_dir), "x", targets=targets)
+    assert [r["status"] for r in results] == ["skipped"]
+
+    os.remove(output_dir / "a_32.webp")
+    results = process_directory(str(input_dir), str(output_dir), "x", targets=targets)
+    assert [r["status"] for r in results] == ["processed"]
+    assert (output_dir / "a_32.webp").exists()
+
+
+def test_palette_strategy_keeps_pure_white_and_black():
+    image = Image.new("RGB", (4, 2), (255, 255, 255))
+    image.putpixel((0, 0), (0, 0, 0))
+    quantized = quantize_image(image, strategy="palette").convert("RGB")
+    assert quantized.getpixel((0, 0)) == (0, 0, 0)
+    assert quantized.getpixel((3, 1)) == (255, 255, 255)
+
+
+_original_watermark_file = watermark_generator._watermark_file
+
+
+def _crash_on_b(task):
+    if task[0] == "b.png":
+        os._exit(1)
+    return _original_watermark_file(task)
+
+
+def test_directory_mode_reports_files_lost_to_a_crashed_worker(tmp_path, monkeypatch):
+    input_dir = tmp_path / "in"
+    output_dir = tmp_path / "out"
+    input_dir.mkdir()
+    for name in ("a.png", "b.png", "c.png"):
+        _write_image(input_dir / name)
+    monkeypatch.setattr(watermark_generator, "_watermark_file", _crash_on_b)
+
+    results = process_directory(str(input_dir), str(output_dir), "x", jobs=2)
+
+    status = {r["file"]: r["status"] for r in results}
+    assert sorted(status) == ["a.png", "b.png", "c.png"]
+    assert status["b.png"] == "failed"
+    assert os.path.exists(output_dir / MANIFEST_NAME)